@@ -1,4 +1,3 @@
-import copy
 from src.simulator import Simulator_Plebiscito
 from src.config import Utility, DebugLevel, SchedulingAlgorithm, ApplicationGraphType
 from src.dataset_builder import generate_dataset
@@ -28,37 +27,9 @@ if __name__ == '__main__':
                         split=True,
                         app_type=ApplicationGraphType.LINEAR,)
     
-    simulator_2 = copy.deepcopy(simulator_0)
-    simulator_2.filename = "2_" + "_".join(simulator_0.filename.split("_")[1:])
-    
-    simulator_4 = copy.deepcopy(simulator_0)
-    simulator_4.filename = "4_" + "_".join(simulator_0.filename.split("_")[1:])
-    
-    simulator_6 = copy.deepcopy(simulator_0)
-    simulator_6.filename = "6_" + "_".join(simulator_0.filename.split("_")[1:])
-    
-    simulator_8 = copy.deepcopy(simulator_0)
-    simulator_8.filename = "8_" + "_".join(simulator_0.filename.split("_")[1:])
-
-    simulator_0.set_outlier_number(0)
-    simulator_0.startup_nodes()
-    simulator_0.run()
-    
-    simulator_2.set_outlier_number(2)
-    simulator_2.startup_nodes()
-    simulator_2.run()
-    
-    simulator_4.set_outlier_number(4)
-    simulator_4.startup_nodes()
-    simulator_4.run()
-    
-    simulator_6.set_outlier_number(6)
-    simulator_6.startup_nodes()
-    simulator_6.run()
-    
-    simulator_8.set_outlier_number(8)
-    simulator_8.startup_nodes()
-    simulator_8.run()
+    # the outlier configurations run at the same time, sharing the dataset and the topology; the
+    # one with no outliers runs in this process, so that the baselines use its nodes
+    simulator_0.run_variants([{"outliers": outliers} for outliers in [0, 2, 4, 6, 8]], keep=0)
     
     nodes = simulator_0.get_nodes()
     plot_consumption(nodes)
@@ -0,0 +1,60 @@
+'''
+This module implements the incremental check of the agreement reached by the nodes on each job
+'''
+
+import numpy as np
+
+from src.shared_state import SharedNodeState
+
+# agreement status of a job
+UNKNOWN = 0     # at least a node doesn't know the job
+BROKEN = 1      # the nodes don't agree on the auction vector
+UNASSIGNED = 2  # the nodes agree that no layer has a winner
+PARTIAL = 3     # the nodes agree, but some layers have no winner
+ASSIGNED = 4    # the nodes agree and every layer has a winner
+
+
+class AgreementTracker:
+    """
+    Keeps the agreement status of every job published in a SharedNodeState. The nodes mark a job
+    as dirty whenever they publish a different auction vector for it, so only the status of the
+    dirty jobs is recomputed when a batch of jobs is checked.
+    """
+    def __init__(self, state: SharedNodeState):
+        self.state = state
+        self.status_of = np.full(len(state.dirty), UNKNOWN, dtype=np.int8)
+
+    def rows(self, job_ids):
+        return np.array([self.state.job_index[j] for j in job_ids], dtype=np.intp)
+
+    def status(self, job_ids):
+        """
+        Returns:
+            np.ndarray: the agreement status of each job in `job_ids`.
+        """
+        rows = self.rows(job_ids)
+        stale = np.unique(rows[self.state.dirty[rows] != 0])
+        if len(stale) > 0:
+            self.__update(stale)
+            self.state.dirty[stale] = 0
+        return self.status_of[rows]
+
+    def allocation(self, job_id):
+        """
+        Returns the auction vector agreed by the nodes (the one known by the first node).
+        """
+        row = self.state.job_index[job_id]
+        return self.state.auction_id[0, row, :self.state.n_layers[0, row]]
+
+    def __update(self, rows):
+        auction_id = self.state.auction_id[:, rows, :]
+        n_layers = self.state.n_layers[:, rows]
+
+        known = np.all(n_layers > 0, axis=0)
+        equal = np.all(n_layers == n_layers[0], axis=0) & np.all(auction_id == auction_id[0], axis=(0, 2))
+        assigned_layers = np.count_nonzero(auction_id[0] != -np.inf, axis=1)
+
+        self.status_of[rows] = np.select(
+            [~known, ~equal, assigned_layers == 0, assigned_layers < n_layers[0]],
+            [UNKNOWN, BROKEN, UNASSIGNED, PARTIAL],
+            ASSIGNED)
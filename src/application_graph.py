@@ -0,0 +1,52 @@
+'''
+This module implements the sparse application graph of a job
+'''
+
+import numpy as np
+
+
+class ApplicationGraph:
+    """
+    Graph of the data exchanged by the layers of a job, stored as a list of undirected edges
+    (src < dst) with the bandwidth required by each of them. Only the pairs of layers that
+    exchange data are stored, so the size of the graph grows with the number of edges instead
+    of the square of the number of layers.
+
+    `layer_bw` holds the total bandwidth of the edges of each layer. The arrays are read-only,
+    as the same graph is shared by all the messages of the job.
+    """
+    def __init__(self, n_layers, src, dst, bw):
+        self.n_layers = n_layers
+        self.src = np.asarray(src, dtype=np.int32)
+        self.dst = np.asarray(dst, dtype=np.int32)
+        self.bw = np.asarray(bw, dtype=np.float64)
+
+        self.layer_bw = np.bincount(self.src, weights=self.bw, minlength=n_layers) + \
+            np.bincount(self.dst, weights=self.bw, minlength=n_layers)
+
+        for a in (self.src, self.dst, self.bw, self.layer_bw):
+            a.flags.writeable = False
+
+    def __len__(self):
+        return len(self.bw)
+
+    def __reduce__(self):
+        # plain tuples are pickled far more compactly than small NumPy arrays
+        return (ApplicationGraph, (self.n_layers, tuple(self.src.tolist()), tuple(self.dst.tolist()), tuple(self.bw.tolist())))
+
+    def cut_bandwidth(self, hosted):
+        """
+        Returns the bandwidth required by the edges between the layers in `hosted` (boolean
+        mask of the layers) and the other layers.
+        """
+        hosted = np.asarray(hosted, dtype=bool)
+        return float(self.bw[hosted[self.src] != hosted[self.dst]].sum())
+
+    def to_dense(self):
+        """
+        Returns the graph as a (symmetric) matrix of size n_layers x n_layers.
+        """
+        graph = np.zeros((self.n_layers, self.n_layers))
+        graph[self.src, self.dst] = self.bw
+        graph[self.dst, self.src] = self.bw
+        return graph
@@ -0,0 +1,93 @@
+'''
+This module implements the delta encoding of the bid messages exchanged by the nodes
+'''
+
+import numpy as np
+
+from src.bid_table import BID_FIELDS
+
+# static fields of a job, sent only by the client
+DESCRIPTION_FIELDS = ("user", "NN_gpu", "NN_cpu", "NN_data_size", "N_layer", "N_layer_min", "N_layer_max", "N_layer_bundle", "gpu_type")
+
+
+def encode_delta(job_id, edge_id, previous, current):
+    """
+    Builds the message that carries only the layers of the auction vector of a job that
+    changed since the last message sent by the node.
+
+    Args:
+        job_id (int): id of the job.
+        edge_id (int): id of the sending node.
+        previous (dict): auction vector sent with the last message (None if it is the first one).
+        current (dict): auction vector to be sent.
+
+    Returns:
+        dict: the message.
+    """
+    if previous is None:
+        layers = np.arange(len(current["auction_id"]))
+    else:
+        changed = np.zeros(len(current["auction_id"]), dtype=bool)
+        for field in BID_FIELDS:
+            changed |= previous[field] != current[field]
+        layers = np.flatnonzero(changed)
+
+    # plain tuples are pickled far more compactly than small NumPy arrays
+    msg = {"job_id": job_id, "edge_id": edge_id, "layers": tuple(layers.tolist())}
+    for field in BID_FIELDS:
+        msg[field] = tuple(current[field][layers].tolist())
+    return msg
+
+
+class BidMessageDecoder:
+    """
+    Rebuilds the complete messages received by a node. The description of every job is
+    registered when the message of the client is received, while the auction vector sent by
+    each neighbor is rebuilt by applying the deltas to the last vector received from it.
+
+    The messages are delivered in order between every pair of nodes, but a neighbor can
+    forward a job before the client message reaches the node: such messages are kept
+    pending until the description of the job is registered.
+    """
+    def __init__(self):
+        self.descriptions = {}
+        self.views = {}
+        self.pending = {}
+
+    def register(self, item):
+        self.descriptions[item["job_id"]] = {f: item[f] for f in DESCRIPTION_FIELDS}
+
+    def decode(self, msg):
+        """
+        Returns:
+            dict: the complete message, or None if the description of the job is not known yet.
+        """
+        job_id = msg["job_id"]
+        if job_id not in self.descriptions:
+            self.pending.setdefault(job_id, []).append(msg)
+            return None
+
+        description = self.descriptions[job_id]
+        views = self.views.setdefault(job_id, {})
+        if msg["edge_id"] not in views:
+            views[msg["edge_id"]] = {f: np.full(description["N_layer"], -np.inf) for f in BID_FIELDS}
+
+        view = views[msg["edge_id"]]
+        item = {"job_id": job_id, "edge_id": msg["edge_id"]}
+        item.update(description)
+        for field in BID_FIELDS:
+            view[field][list(msg["layers"])] = msg[field]
+            item[field] = view[field].copy()
+        return item
+
+    def pop_pending(self, job_id):
+        return self.pending.pop(job_id, [])
+
+    def forget(self, job_id):
+        """
+        Drops the description of a job and the auction vectors received for it. The neighbors
+        must drop the last vectors sent for the job at the same time.
+        """
+        self.descriptions.pop(job_id, None)
+        self.views.pop(job_id, None)
+        self.pending.pop(job_id, None)
@@ -0,0 +1,148 @@
+'''
+This module implements the structure-of-arrays store of the bids of a node
+'''
+
+import numpy as np
+
+BID_FIELDS = ("auction_id", "bid", "timestamp")
+
+
+class BidTable:
+    """
+    Stores the auction vector of every job known by a node in NumPy arrays indexed by
+    (job slot, layer). `auction_id` holds the id of the node that won each layer, `bid` the
+    winning bid and `timestamp` the time of the bid (in seconds). Layers with no winner
+    have all the fields set to -inf.
+
+    Bidding and deconfliction work on snapshots (dicts of array copies) of a single job,
+    that are written back with `restore` once the outcome is known.
+    """
+    def __init__(self, max_layers=5, capacity=64):
+        self.auction_id = np.full((capacity, max_layers), -np.inf)
+        self.bid = np.full((capacity, max_layers), -np.inf)
+        self.timestamp = np.full((capacity, max_layers), -np.inf)
+        self.n_layers = np.zeros(capacity, dtype=np.int32)
+
+        self.slots = {}
+        self.free_slots = list(range(capacity-1, -1, -1))
+
+    def __contains__(self, job_id):
+        return job_id in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    def keys(self):
+        return self.slots.keys()
+
+    def add(self, job_id, n_layers, timestamp=-np.inf):
+        """
+        Allocates the slot of a new job, with no winner for any layer.
+        """
+        if n_layers > self.auction_id.shape[1]:
+            self.__grow(self.auction_id.shape[0], n_layers)
+        if len(self.free_slots) == 0:
+            self.__grow(2 * self.auction_id.shape[0], self.auction_id.shape[1])
+
+        slot = self.free_slots.pop()
+        self.slots[job_id] = slot
+        self.n_layers[slot] = n_layers
+        self.auction_id[slot] = -np.inf
+        self.bid[slot] = -np.inf
+        self.timestamp[slot] = -np.inf
+        self.timestamp[slot, :n_layers] = timestamp
+        return slot
+
+    def remove(self, job_id):
+        slot = self.slots.pop(job_id)
+        self.n_layers[slot] = 0
+        self.free_slots.append(slot)
+
+    def auction_id_of(self, job_id):
+        slot = self.slots[job_id]
+        return self.auction_id[slot, :self.n_layers[slot]]
+
+    def bid_of(self, job_id):
+        slot = self.slots[job_id]
+        return self.bid[slot, :self.n_layers[slot]]
+
+    def timestamp_of(self, job_id):
+        slot = self.slots[job_id]
+        return self.timestamp[slot, :self.n_layers[slot]]
+
+    def snapshot(self, job_id):
+        """
+        Returns a copy of the auction vector of the job that can be freely modified.
+        """
+        slot = self.slots[job_id]
+        n = self.n_layers[slot]
+        return {
+            "auction_id": self.auction_id[slot, :n].copy(),
+            "bid": self.bid[slot, :n].copy(),
+            "timestamp": self.timestamp[slot, :n].copy(),
+        }
+
+    def restore(self, job_id, snapshot):
+        """
+        Overwrites the auction vector of the job with the content of `snapshot`.
+        """
+        slot = self.slots[job_id]
+        n = self.n_layers[slot]
+        self.auction_id[slot, :n] = snapshot["auction_id"]
+        self.bid[slot, :n] = snapshot["bid"]
+        self.timestamp[slot, :n] = snapshot["timestamp"]
+
+    def equals(self, job_id, other):
+        """
+        Checks whether the auction vector of the job is the same as the one in `other`
+        (a snapshot or a message).
+        """
+        slot = self.slots[job_id]
+        n = self.n_layers[slot]
+        return np.array_equal(self.auction_id[slot, :n], other["auction_id"]) and \
+            np.array_equal(self.bid[slot, :n], other["bid"]) and \
+            np.array_equal(self.timestamp[slot, :n], other["timestamp"])
+
+    def count_assigned(self, job_id):
+        return int(np.count_nonzero(self.auction_id_of(job_id) != -np.inf))
+
+    def copy(self):
+        ret = BidTable(self.auction_id.shape[1], 0)
+        ret.auction_id = self.auction_id.copy()
+        ret.bid = self.bid.copy()
+        ret.timestamp = self.timestamp.copy()
+        ret.n_layers = self.n_layers.copy()
+        ret.slots = dict(self.slots)
+        ret.free_slots = list(self.free_slots)
+        return ret
+
+    @staticmethod
+    def copy_snapshot(snapshot):
+        return {k: snapshot[k].copy() for k in BID_FIELDS}
+
+    def __grow(self, capacity, max_layers):
+        old_capacity, old_layers = self.auction_id.shape
+
+        for field in BID_FIELDS:
+            new = np.full((capacity, max_layers), -np.inf)
+            new[:old_capacity, :old_layers] = getattr(self, field)
+            setattr(self, field, new)
+
+        n_layers = np.zeros(capacity, dtype=np.int32)
+        n_layers[:old_capacity] = self.n_layers
+        self.n_layers = n_layers
+
+        self.free_slots = list(range(capacity-1, old_capacity-1, -1)) + self.free_slots
+
+
+def to_node_id(value):
+    """
+    Converts a value of an auction vector to a node id (or -inf if the layer has no winner).
+    """
+    if value == -np.inf:
+        return float('-inf')
+    return int(value)
+
+
+def to_allocation(auction_id):
+    return [to_node_id(a) for a in auction_id]
@@ -12,6 +12,7 @@ class Utility(Enum):
     SGF = 7
     UTIL = 8
     RANDOM = 9
+    ALPHA_BW_CPU = 10
     
 class DebugLevel(Enum):
     TRACE = 5
@@ -21,6 +22,16 @@ class DebugLevel(Enum):
 class SchedulingAlgorithm(Enum):
     FIFO = 1
     SDF = 2 # shortest duration first
+    
+class SimulationEngine(Enum):
+    MULTIPROCESS = 1 # one process per node, messages exchanged through queues
+    DISCRETE_EVENT = 2 # all the nodes in the simulator process, on a deterministic event queue
+
+class JobState(Enum):
+    ACTIVE = 1 # the node is bidding on the job
+    CONVERGED = 2 # no layer without a winner at the end of a bidding round
+    COMPLETED = 3 # the job has been executed and its resources released
+    EVICTED = 4 # only the summary of the job is kept by the node
 
 # create an enum to represent the possible types of GPUS
 # the idea is to represent the types of GPU in ascending order of performance
@@ -46,12 +57,14 @@ class NodeSupport:
         Returns the GPUType enum corresponding to the string `gpu_type`.
 
         Args:
-            gpu_type (str): The GPU type.
+            gpu_type (str | NodeType): The GPU type.
 
         Returns:
             GPUType: The GPUType enum corresponding to `gpu_type`.
         """
-        if gpu_type == "SERVER":
+        if isinstance(gpu_type, NodeType):
+            return gpu_type
+        elif gpu_type == "SERVER":
             return NodeType.SERVER
         elif gpu_type == "DESKTOP":
             return NodeType.DESKTOP
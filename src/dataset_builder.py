@@ -1,4 +1,5 @@
 import csv
+import hashlib
 import pandas as pd
 import numpy as np
 import os
@@ -7,19 +8,103 @@ import math
 
 path = os.getcwd()
 dataset = path + '/df_dataset.csv'
+cache_dir = path + '/.dataset_cache'
 
-def generate_dataset(entries_num = 100):
+# to be increased whenever the processing of the trace changes, to invalidate the cached datasets
+CACHE_VERSION = 1
+
+def generate_dataset(entries_num = 100, use_cache=True):
     """
-    Generate a new dataset with the specified number of entries.
+    Generate a new dataset with the specified number of entries. The processed dataset is cached
+    in binary form, keyed on the content of the trace (see trace_digest) and on the parameters 
+    of the generation, so that the trace is parsed only the first time.
     
     Args:
     - entries_num (int): The number of entries to generate.
+    - use_cache (bool): Whether to use (and store) the cached dataset.
     
     Returns:
     - pandas.DataFrame: A new dataset with the specified number of entries.
     """
+    if use_cache:
+        cache_file = os.path.join(cache_dir, cache_key(dataset, entries_num) + '.npz')
+        if os.path.exists(cache_file):
+            return load_cached_dataset(cache_file)
+    
     jobs = init_go(num_jobs=entries_num)
     df = pd.DataFrame(jobs)
+    
+    if use_cache:
+        save_cached_dataset(cache_file, df)
+    return df
+
+def cache_key(csv_file, entries_num):
+    return hashlib.sha1(repr((trace_digest(csv_file), CACHE_VERSION, entries_num)).encode()).hexdigest()
+
+def trace_digest(csv_file):
+    """
+    Returns the SHA-1 of the content of the trace. The digest is stored in the cache together
+    with the path, size and modification time of the trace, and the trace is hashed again only
+    when one of them changes.
+    """
+    csv_file = os.path.abspath(csv_file)
+    stat = os.stat(csv_file)
+    stamp = f"{csv_file}:{stat.st_size}:{stat.st_mtime_ns}"
+    stamp_file = os.path.join(cache_dir, hashlib.sha1(csv_file.encode()).hexdigest() + '.digest')
+    
+    try:
+        with open(stamp_file, 'r') as fd:
+            saved_stamp, digest = fd.read().split('\n')[:2]
+        if saved_stamp == stamp:
+            return digest
+    except (OSError, ValueError):
+        pass
+    
+    h = hashlib.sha1()
+    with open(csv_file, 'rb') as fd:
+        for block in iter(lambda: fd.read(1 << 20), b''):
+            h.update(block)
+    digest = h.hexdigest()
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = stamp_file + f".{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as fd:
+        fd.write(stamp + '\n' + digest + '\n')
+    os.replace(tmp_file, stamp_file)
+    return digest
+
+def save_cached_dataset(cache_file, df):
+    """
+    Stores the dataset column by column: the numeric and string columns as plain arrays, the 
+    other ones (lists, None) as object arrays. The state of the random generator left by the 
+    processing of the trace is stored too, and restored when the dataset is loaded.
+    """
+    columns = {}
+    for i, c in enumerate(df.columns):
+        values = df[c].to_numpy()
+        if values.dtype == object:
+            if all(isinstance(v, str) for v in values):
+                values = values.astype(str)
+            else:
+                # e.g., lists: fill element by element, not to build a 2D array
+                array = np.empty(len(values), dtype=object)
+                array[:] = list(values)
+                values = array
+        columns[f"col_{i}"] = values
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_file = cache_file + f".{os.getpid()}.tmp.npz"
+    random_state = np.empty(1, dtype=object)
+    random_state[0] = random.getstate()
+    np.savez(tmp_file, names=np.array(df.columns, dtype=str), random_state=random_state, **columns)
+    # atomic, in case more processes generate the same dataset at the same time
+    os.replace(tmp_file, cache_file)
+
+def load_cached_dataset(cache_file):
+    with np.load(cache_file, allow_pickle=True) as data:
+        names = [str(name) for name in data["names"]]
+        df = pd.DataFrame({name: data[f"col_{i}"] for i, name in enumerate(names)})
+        random.setstate(data["random_state"][0])
     return df
 
 # function from Alibaba's trace
@@ -121,8 +206,9 @@ def add_job(csv_file, describe_dict, limit=None):
         keys = reader.fieldnames
         for i, row in enumerate(reader):
             _add_job(job_list, row, describe_dict)
-            # if limit is not None and i >= 1000:
-            #     break
+            # the jobs after the first `limit` ones are discarded anyway
+            if limit is not None and len(job_list) >= limit:
+                break
     return job_list
 
 # function from Alibaba's trace
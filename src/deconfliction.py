@@ -0,0 +1,109 @@
+'''
+This module implements the deconfliction rules applied by a node when it receives the
+auction vector of a job from one of its neighbors
+'''
+
+import numpy as np
+
+
+def deconflict(i, k, z_kj, y_kj, t_kj, z_ij, y_ij, t_ij, bid_time):
+    """
+    Applies the deconfliction rule table to the layers of a job, one layer at a time.
+
+    Args:
+        i (int): id of the receiving node.
+        k (int): id of the sending node.
+        z_kj, y_kj, t_kj (np.ndarray): winners, bids and timestamps received from k.
+        z_ij, y_ij, t_ij (np.ndarray): winners, bids and timestamps known by i.
+        bid_time (float): time at which i renews the layers it keeps winning.
+
+    Returns:
+        tuple: merged winners, bids and timestamps, followed by the masks of the layers
+            that must be rebroadcast, the layers that must be reset and the layers in
+            which i has been outbid.
+    """
+    n = len(z_kj)
+    z_kj = np.asarray(z_kj, dtype=float).tolist()
+    y_kj = np.asarray(y_kj, dtype=float).tolist()
+    t_kj = np.asarray(t_kj, dtype=float).tolist()
+    auction_id = np.asarray(z_ij, dtype=float).tolist()
+    bid = np.asarray(y_ij, dtype=float).tolist()
+    timestamp = np.asarray(t_ij, dtype=float).tolist()
+    rebroadcast = [False] * n
+    reset = [False] * n
+    outbid = [False] * n
+    none = float('-inf')
+
+    for index in range(n):
+        zk, zi = z_kj[index], auction_id[index]
+        yk, yi = y_kj[index], bid[index]
+        tk, ti = t_kj[index], timestamp[index]
+        update = False
+
+        if zk == k:
+            if zi == i:
+                rebroadcast[index] = True
+                if yk > yi or (yk == yi and zk < zi):
+                    outbid[index] = True
+                    update = True
+                else:
+                    timestamp[index] = bid_time
+            elif zi == k:
+                if tk > ti:
+                    update = True
+                    rebroadcast[index] = True
+            elif zi == none:
+                update = True
+                rebroadcast[index] = True
+            else:
+                if (yk > yi and tk >= ti) or (yk > yi and tk < ti):
+                    update = True
+                rebroadcast[index] = True
+
+        elif zk == i:
+            if zi == i and tk > ti:
+                update = True
+            elif zi == k:
+                reset[index] = True
+            rebroadcast[index] = True
+
+        elif zk == none:
+            if zi == i:
+                rebroadcast[index] = True
+            elif zi == k:
+                update = True
+                rebroadcast[index] = True
+            elif zi != none and tk > ti:
+                update = True
+                rebroadcast[index] = True
+
+        else:
+            if zi == i:
+                rebroadcast[index] = True
+                if yk > yi or (yk == yi and zk < zi):
+                    outbid[index] = True
+                    update = True
+                else:
+                    timestamp[index] = bid_time
+            elif zi == k:
+                if yk > yi or tk >= ti:
+                    update = True
+                rebroadcast[index] = True
+            elif zi == zk:
+                if tk > ti:
+                    update = True
+            elif zi == none:
+                update = True
+                rebroadcast[index] = True
+            else:
+                if (yk >= yi and tk >= ti) or (yk < yi and tk > ti):
+                    update = True
+                rebroadcast[index] = True
+
+        if update:
+            auction_id[index] = zk
+            bid[index] = yk
+            timestamp[index] = tk
+
+    return np.array(auction_id, dtype=float), np.array(bid, dtype=float), np.array(timestamp, dtype=float), \
+        np.array(rebroadcast, dtype=bool), np.array(reset, dtype=bool), np.array(outbid, dtype=bool)
@@ -0,0 +1,98 @@
+'''
+This module implements a single-process discrete-event engine that runs all the nodes
+in the simulator process, without IPC and without wall-clock timeouts
+'''
+
+import heapq
+
+
+class NodeInbox:
+    """
+    Queue-like endpoint of a node. Messages put on the inbox are scheduled on the engine
+    event queue instead of being sent to another process.
+    """
+    def __init__(self, engine, node_id):
+        self.engine = engine
+        self.node_id = node_id
+
+    def put(self, msg):
+        self.engine.schedule(self.node_id, msg)
+
+    def qsize(self):
+        return self.engine.pending[self.node_id]
+
+    def task_done(self):
+        pass
+
+
+class DiscreteEventEngine:
+    """
+    Delivers the messages exchanged by the nodes in a deterministic order. Every message is
+    delivered `latency` time units after the event that generated it, and events delivered
+    at the same time are processed in the order in which they have been generated.
+
+    The engine also provides a logical clock to the nodes, so that the bid timestamps
+    (and therefore the outcome of the simulation) do not depend on the wall-clock time.
+    """
+    def __init__(self, nodes, latency=1):
+        self.nodes = nodes
+        self.latency = latency
+        self.time = 0
+        self.seq = 0
+        self.current_event = 0
+        self.events = []
+        self.processed_events = 0
+
+        self.pending = [0 for _ in range(len(nodes))]
+        self.inboxes = [NodeInbox(self, i) for i in range(len(nodes))]
+        self.ret_vals = [{} for _ in range(len(nodes))]
+
+        for n in nodes:
+            n.q = self.inboxes
+            n.clock = self.clock
+            n.threaded_bid_rounds = False
+            n.snapshot_reports = False
+            n.report_state(self.ret_vals[n.id])
+
+    def clock(self):
+        # every event has a distinct and monotonically increasing timestamp
+        return float(self.current_event)
+
+    def schedule(self, node_id, msg):
+        self.seq += 1
+        self.pending[node_id] += 1
+        heapq.heappush(self.events, (self.time + self.latency, self.seq, node_id, msg))
+
+    def step(self):
+        """
+        Delivers the next message to its destination node.
+
+        Returns:
+            bool: False if there are no messages left to deliver.
+        """
+        if len(self.events) == 0:
+            return False
+
+        self.time, self.current_event, node_id, msg = heapq.heappop(self.events)
+        self.pending[node_id] -= 1
+        self.processed_events += 1
+
+        # the receiving node gets its own copy of the message, as it would through a queue
+        self.nodes[node_id].handle_message(dict(msg), self.ret_vals[node_id])
+        return True
+
+    def run_until_idle(self):
+        """
+        Processes messages until no message is in flight and no node has to start a new
+        bidding round, then reports the state of every node (i.e., the end of a bidding round).
+        """
+        while True:
+            while self.step():
+                pass
+
+            progressed = [n.step_bid_rounds() for n in self.nodes]
+            if not any(progressed):
+                break
+
+        for n in self.nodes:
+            n.end_bid_round(self.ret_vals[n.id])
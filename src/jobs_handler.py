@@ -1,9 +1,11 @@
+import heapq
 import random
 import sys
 import time
 import numpy as np
 import pandas as pd
 from src.config import SchedulingAlgorithm, ApplicationGraphType
+from src.application_graph import ApplicationGraph
 
 def assign_job_start_time(dataset: pd.DataFrame, time_instant):
     dataset.replace(-1, time_instant, inplace=True)
@@ -24,6 +26,60 @@ def extract_completed_jobs(dataset: pd.DataFrame, time_instant):
 def select_jobs(dataset, time_instant):
     return dataset[dataset['submit_time'] == time_instant]
 
+class JobStore:
+    """
+    Dataset sorted by submit time, with a cursor on the first job not submitted yet. The jobs
+    are selected in order of time instant, so each call only looks at the jobs submitted since
+    the previous one instead of scanning the whole dataset as `select_jobs` does.
+    """
+    def __init__(self, dataset: pd.DataFrame):
+        # the sort is stable, so the jobs submitted at the same time keep the dataset order
+        self.dataset = dataset.sort_values(by=["submit_time"], kind="stable")
+        self.submit_time = self.dataset["submit_time"].to_numpy()
+        self.cursor = 0
+        
+    def __len__(self):
+        return len(self.dataset)
+        
+    def select_jobs(self, time_instant):
+        """
+        Returns the jobs submitted at `time_instant`. The jobs submitted before it and never 
+        selected are skipped, as with `select_jobs`.
+        """
+        start = self.cursor + np.searchsorted(self.submit_time[self.cursor:], time_instant, side="left")
+        end = self.cursor + np.searchsorted(self.submit_time[self.cursor:], time_instant, side="right")
+        self.cursor = end
+        return self.dataset.iloc[start:end]
+
+class RunningJobs:
+    """
+    Running jobs, kept in a heap ordered by completion time (exec_time + duration), so that
+    the completed jobs are extracted without scanning all the running ones.
+    """
+    def __init__(self):
+        self.heap = []
+        self.seq = 0
+        
+    def __len__(self):
+        return len(self.heap)
+    
+    def add(self, jobs: pd.DataFrame):
+        for _, j in jobs.iterrows():
+            heapq.heappush(self.heap, (j["exec_time"] + j["duration"], self.seq, j))
+            self.seq += 1
+            
+    def extract_completed_jobs(self, time_instant):
+        """
+        Removes and returns the jobs completed before `time_instant`, in the order in which
+        they have been added (as `extract_completed_jobs` does).
+        """
+        completed = []
+        while len(self.heap) > 0 and self.heap[0][0] < time_instant:
+            completed.append(heapq.heappop(self.heap))
+            
+        completed.sort(key=lambda c: c[1])
+        return pd.DataFrame([c[2] for c in completed])
+
 def create_job_batch(dataset, batch_size):
     ret = dataset.head(batch_size)
     dataset.drop(index=dataset.index[:batch_size], axis=0, inplace=True)
@@ -35,13 +91,27 @@ def schedule_jobs(jobs: pd.DataFrame, scheduling_algorithm: SchedulingAlgorithm)
     elif scheduling_algorithm == SchedulingAlgorithm.SDF:
         return jobs.sort_values(by=["duration"])
 
-def dispatch_job(dataset: pd.DataFrame, queues, use_net_topology=False, split=True, app_type=ApplicationGraphType.LINEAR):        
-    if use_net_topology:
+def dispatch_job(dataset: pd.DataFrame, queues, use_net_topology=False, split=True, app_type=ApplicationGraphType.LINEAR, timeout=None, termination=None, max_in_flight=0):        
+    """
+    Submits the jobs in `dataset` to all the nodes. 
+    
+    If a termination detector is provided, every job is submitted as soon as at most `max_in_flight` 
+    messages are still waiting to be processed by the nodes (without waiting if `max_in_flight` is 0).
+    Otherwise, a fixed delay (`timeout`) is waited after each job.
+    """
+    if termination is not None:
+        timeout = 0
+    elif timeout is not None:
+        pass
+    elif use_net_topology:
         timeout = 1 # don't change it
     else:
         timeout = 0.05
 
     for _, job in dataset.iterrows():
+        if termination is not None and max_in_flight > 0:
+            termination.wait_in_flight(max_in_flight)
+            
         data = message_data(
                     job['job_id'],
                     job['user'],
@@ -58,52 +128,99 @@ def dispatch_job(dataset: pd.DataFrame, queues, use_net_topology=False, split=Tr
         for q in queues:
             q.put(data)
 
-        time.sleep(timeout)
+        if timeout > 0:
+            time.sleep(timeout)
 
 def get_simulation_end_time_instant(dataset):
     return dataset['submit_time'].max() + dataset['duration'].max()
 
-def generate_application_graph(layer_number, app_type, bandwidth):
-    graph = np.zeros((layer_number, layer_number))
-    
-    for i in range(layer_number):
-        for j in range(i):
-            if app_type == ApplicationGraphType.LINEAR:
-                if j == i-1:
-                    #b = random.uniform(0.5, 1.5)*bandwidth
-                    b = bandwidth
-                    graph[i][j] = b
-                    graph[j][i] = b
-            else:
-                prob = 0
-                if app_type == ApplicationGraphType.GRAPH20:
-                    prob = 0.2
-                elif app_type == ApplicationGraphType.GRAPH40:
-                    prob = 0.4
-                elif app_type == ApplicationGraphType.GRAPH60:
-                    prob = 0.6
-                
-                #b = np.random.choice([0, 1], p=[1-prob, prob])*random.uniform(0.5, 1.5)*bandwidth
-                b = np.random.choice([0, 1], p=[1-prob, prob])*bandwidth
-                graph[i][j] = b
-                graph[j][i] = b
-                
-    return graph        
-
-def message_data(job_id, user, num_gpu, num_cpu, duration, bandwidth, gpu_type, deallocate=False, split=True, app_type=ApplicationGraphType.LINEAR):
-    
-    random.seed(job_id)
-    np.random.seed(int(job_id))
+def generate_application_graph(layer_number, app_type, bandwidth, rng=np.random):
+    """
+    Returns the ApplicationGraph of a job with `layer_number` layers. With a LINEAR graph every
+    layer is connected to the next one, while with GRAPH20/40/60 every pair of layers is 
+    connected with probability 0.2/0.4/0.6.
+    """
+    if app_type == ApplicationGraphType.LINEAR:
+        src = np.arange(layer_number - 1)
+        dst = src + 1
+        #b = random.uniform(0.5, 1.5)*bandwidth
+        return ApplicationGraph(layer_number, src, dst, np.full(len(src), float(bandwidth)))
+    
+    prob = 0
+    if app_type == ApplicationGraphType.GRAPH20:
+        prob = 0.2
+    elif app_type == ApplicationGraphType.GRAPH40:
+        prob = 0.4
+    elif app_type == ApplicationGraphType.GRAPH60:
+        prob = 0.6
+    
+    # one draw per pair of layers (i, j), j < i, in the order of the rows
+    dst, src = np.tril_indices(layer_number, k=-1)
+    if len(src) == 0:
+        return ApplicationGraph(layer_number, src, dst, np.zeros(0))
+    
+    #b = np.random.choice([0, 1], p=[1-prob, prob])*random.uniform(0.5, 1.5)*bandwidth
+    connected = rng.choice([0, 1], p=[1-prob, prob], size=len(src)) == 1
+    return ApplicationGraph(layer_number, src[connected], dst[connected], np.full(np.count_nonzero(connected), float(bandwidth)))
+
+# layer decompositions already computed, by (job_id, num_gpu, num_cpu, split, app_type)
+decompositions = {}
+
+def job_decomposition(job_id, num_gpu, num_cpu, split=True, app_type=ApplicationGraphType.LINEAR):
+    """
+    Returns the decomposition of a job in layers: the number of layers, the GPUs and CPUs of each
+    layer and the (sparse) application graph.
+    
+    The decomposition is computed once and then shared by all the messages of the job, by the
+    simulator and by the baselines. It uses random generators seeded with the job id, so it is
+    the same in every process and the global random state is not touched. The arrays are
+    read-only.
+    """
+    key = (job_id, num_gpu, num_cpu, split, app_type)
+    d = decompositions.get(key)
+    if d is not None:
+        return d
+    
+    # same sequences as random.seed(job_id) and np.random.seed(int(job_id))
+    py_rng = random.Random(job_id)
+    np_rng = np.random.RandomState(int(job_id))
     
     if split:
-        layer_number = random.choice([1, 2, 3, 4, 5])
+        layer_number = py_rng.choice([1, 2, 3, 4, 5])
     else:
         layer_number = 1
 
     # use numpy to create an array of random numbers with length equal to the number of layers. As a constraint, the sum of the array must be equal to the number of GPUs
-    NN_gpu = np.random.dirichlet(np.ones(layer_number), size=1)[0] * num_gpu
-    NN_cpu = np.random.dirichlet(np.ones(layer_number), size=1)[0] * num_cpu
-    NN_data_size = generate_application_graph(layer_number, app_type, 1000000)
+    NN_gpu = np_rng.dirichlet(np.ones(layer_number), size=1)[0] * num_gpu
+    NN_cpu = np_rng.dirichlet(np.ones(layer_number), size=1)[0] * num_cpu
+    NN_data_size = generate_application_graph(layer_number, app_type, 1000000, rng=np_rng)
+    
+    for a in (NN_gpu, NN_cpu):
+        a.flags.writeable = False
+    
+    d = {
+        "N_layer": layer_number,
+        "NN_gpu": NN_gpu,
+        "NN_cpu": NN_cpu,
+        "NN_data_size": NN_data_size,
+    }
+    decompositions[key] = d
+    return d
+
+def precompute_decompositions(dataset: pd.DataFrame, split=True, app_type=ApplicationGraphType.LINEAR):
+    """
+    Computes the decomposition of all the jobs in `dataset` in a single pass. Returns the
+    maximum number of layers of a job (0 if the dataset is empty).
+    """
+    max_layers = 0
+    for job_id, num_gpu, num_cpu in zip(dataset['job_id'], dataset['num_gpu'], dataset['num_cpu']):
+        max_layers = max(max_layers, job_decomposition(job_id, num_gpu, num_cpu, split=split, app_type=app_type)["N_layer"])
+    return max_layers
+
+def message_data(job_id, user, num_gpu, num_cpu, duration, bandwidth, gpu_type, deallocate=False, split=True, app_type=ApplicationGraphType.LINEAR, completed=False):
+    
+    decomposition = job_decomposition(job_id, num_gpu, num_cpu, split=split, app_type=app_type)
+    layer_number = decomposition["N_layer"]
 
     if split:
         max_layer_bid = layer_number
@@ -120,14 +237,14 @@ def message_data(job_id, user, num_gpu, num_cpu, duration, bandwidth, gpu_type,
         "num_gpu": int(),
         "num_cpu": int(),
         "duration": int(),
-        "N_layer": len(NN_gpu),
+        "N_layer": layer_number,
         "N_layer_min": min_layer_bid, # Do not change!! This could be either 1 or = to N_layer_max
         "N_layer_max": max_layer_bid,
         "N_layer_bundle": bundle_size, 
         "edge_id":int(),
-        "NN_gpu": NN_gpu,
-        "NN_cpu": NN_cpu,
-        "NN_data_size": NN_data_size,
+        "NN_gpu": decomposition["NN_gpu"],
+        "NN_cpu": decomposition["NN_cpu"],
+        "NN_data_size": decomposition["NN_data_size"],
         "gpu_type": gpu_type,
         }
 
@@ -141,5 +258,8 @@ def message_data(job_id, user, num_gpu, num_cpu, duration, bandwidth, gpu_type,
     
     if deallocate:
         data["unallocate"] = True
+        # the job has been executed, so the nodes can drop its state
+        if completed:
+            data["completed"] = True
 
     return data
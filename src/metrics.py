@@ -0,0 +1,165 @@
+'''
+This module implements the sink of the metrics collected by the simulator at each time instant
+'''
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.config import NodeType
+
+# metrics of the whole simulation, stored with node_id = -1
+GLOBAL_METRICS = ["n_nodes", "n_req", "exec_time", "alpha", "count_assigned", "count_unassigned", "time_instant"]
+# metrics of each node
+NODE_METRICS = ["initial_gpu", "updated_gpu", "used_gpu", "initial_cpu", "updated_cpu", "used_cpu",
+                "initial_bw", "updated_bw", "used_bw", "cpu_consumption", "gpu_consumption"]
+METRICS = GLOBAL_METRICS + NODE_METRICS
+
+# metrics written as integers in the CSV export
+INTEGER_METRICS = ["n_nodes", "n_req", "count_assigned", "count_unassigned", "time_instant"]
+
+
+class MetricsSink:
+    """
+    Collects the metrics in long form, i.e., one (sample, time_instant, node_id, metric, value)
+    record per value, and buffers them in memory. Every `chunk_size` records the buffer is
+    flushed to a new NPZ file in the `<filename>_metrics` directory.
+
+    The type of GPU of each node is static, so it is stored once per chunk instead of once
+    per sample.
+    """
+    def __init__(self, filename, n_nodes, chunk_size=65536):
+        self.filename = str(filename)
+        self.dirname = metrics_dir(filename)
+        self.n_nodes = n_nodes
+        self.chunk_size = chunk_size
+        self.gpu_type = ["" for _ in range(n_nodes)]
+
+        self.sample = 0
+        self.chunk = 0
+        self.buffer = []
+        self.buffered = 0
+
+        # drop the results of previous runs with the same name
+        if os.path.exists(self.dirname):
+            for f in glob.glob(os.path.join(self.dirname, "*.npz")):
+                os.remove(f)
+        else:
+            os.makedirs(self.dirname)
+
+    def record(self, time_instant, global_values, node_values, gpu_type):
+        """
+        Stores a sample of the metrics.
+
+        Args:
+            time_instant (int): time instant of the sample.
+            global_values (dict): value of each metric in GLOBAL_METRICS.
+            node_values (dict): list of the values of each node, for each metric in NODE_METRICS.
+            gpu_type (list): type of GPU of each node (NodeType or name).
+        """
+        self.gpu_type = [t.name if isinstance(t, NodeType) else str(t) for t in gpu_type]
+
+        n_global = len(GLOBAL_METRICS)
+        n_records = n_global + len(NODE_METRICS) * self.n_nodes
+
+        value = np.empty(n_records)
+        value[:n_global] = [global_values[m] for m in GLOBAL_METRICS]
+        value[n_global:] = np.array([node_values[m] for m in NODE_METRICS], dtype=float).ravel()
+
+        node_id = np.empty(n_records, dtype=np.int32)
+        node_id[:n_global] = -1
+        node_id[n_global:] = np.tile(np.arange(self.n_nodes, dtype=np.int32), len(NODE_METRICS))
+
+        metric = np.empty(n_records, dtype=np.int16)
+        metric[:n_global] = np.arange(n_global)
+        metric[n_global:] = np.repeat(np.arange(n_global, len(METRICS), dtype=np.int16), self.n_nodes)
+
+        self.buffer.append((np.full(n_records, self.sample, dtype=np.int32),
+                            np.full(n_records, time_instant, dtype=np.int32),
+                            node_id, metric, value))
+        self.buffered += n_records
+        self.sample += 1
+
+        if self.buffered >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffered == 0:
+            return
+
+        sample, time_instant, node_id, metric, value = (np.concatenate(c) for c in zip(*self.buffer))
+        np.savez(os.path.join(self.dirname, f"{self.chunk:05d}.npz"),
+                 sample=sample, time_instant=time_instant, node_id=node_id, metric=metric, value=value,
+                 metric_names=np.array(METRICS), gpu_type=np.array(self.gpu_type))
+
+        self.chunk += 1
+        self.buffer = []
+        self.buffered = 0
+
+    def close(self):
+        """
+        Flushes the buffered metrics and exports them in the `<filename>.csv` file.
+        """
+        self.flush()
+        export_csv(self.filename)
+
+
+def metrics_dir(filename):
+    return str(filename) + "_metrics"
+
+
+def load_metrics(filename):
+    """
+    Loads all the metrics stored by a MetricsSink.
+
+    Returns:
+        tuple: the metrics in long form (pd.DataFrame) and the type of GPU of each node (list).
+    """
+    columns = {"sample": [], "time_instant": [], "node_id": [], "metric": [], "value": []}
+    gpu_type = []
+    metric_names = METRICS
+
+    for f in sorted(glob.glob(os.path.join(metrics_dir(filename), "*.npz"))):
+        with np.load(f) as chunk:
+            for c in columns:
+                columns[c].append(chunk[c])
+            gpu_type = list(chunk["gpu_type"])
+            metric_names = list(chunk["metric_names"])
+
+    df = pd.DataFrame({c: np.concatenate(v) if len(v) > 0 else np.zeros(0) for c, v in columns.items()})
+    df["metric"] = pd.Categorical.from_codes(df["metric"].astype(np.int16), categories=metric_names)
+    return df, gpu_type
+
+
+def node_metric(df, metric):
+    """
+    Returns the values of a node metric, with one row per sample and one column per node.
+    """
+    values = df[df["metric"] == metric]
+    return values.pivot(index="sample", columns="node_id", values="value")
+
+
+def export_csv(filename):
+    """
+    Writes the metrics stored by a MetricsSink in the `<filename>.csv` file, with one row per sample
+    and the `node_<i>_<metric>` columns.
+    """
+    df, gpu_type = load_metrics(filename)
+    if len(df) == 0:
+        return
+
+    wide = df[df["node_id"] == -1].pivot(index="sample", columns="metric", values="value")
+    columns = {m: wide[m] for m in GLOBAL_METRICS}
+    for m in INTEGER_METRICS:
+        columns[m] = columns[m].astype(int)
+
+    values = {m: node_metric(df, m) for m in NODE_METRICS}
+    for i in range(len(gpu_type)):
+        for m in NODE_METRICS:
+            columns[f"node_{i}_{m}"] = values[m][i]
+            if m == "used_bw":
+                columns[f"node_{i}_gpu_type"] = pd.Series(gpu_type[i], index=wide.index)
+
+    pd.DataFrame(columns).to_csv(str(filename) + ".csv", index=False)
@@ -1,13 +1,17 @@
 from csv import DictWriter
+import copy
 import os
 import random
 import threading
+import multiprocessing
+from multiprocessing import shared_memory
 import sys
 # import pygraphviz as pgv
 import sys
-from collections import deque
 from enum import Enum
 
+import numpy as np
+
 # class syntax
 network_aware = True
 
@@ -16,86 +20,63 @@ class TopologyType(Enum):
     FAT_TREE = 2
 
 
-def dijkstra(adj_matrix, start_node, end_node):
-    num_nodes = len(adj_matrix)
-    visited = [False] * num_nodes  # Track visited nodes
-    # Initialize distances with a large value
-    distances = [sys.maxsize] * num_nodes
-    distances[start_node] = 0  # Set distance of the start node to 0
-
-    # Find the shortest path for all nodes
-    for _ in range(num_nodes):
-        min_distance = sys.maxsize
-        min_node = -1
-
-        # Find the node with the smallest distance from the set of unvisited nodes
-        for node in range(num_nodes):
-            if not visited[node] and distances[node] < min_distance:
-                min_distance = distances[node]
-                min_node = node
-
-        visited[min_node] = True
-
-        # Update distances for the adjacent nodes
-        for node in range(num_nodes):
-            if (
-                not visited[node]
-                and adj_matrix[min_node][node] == 1
-                and distances[min_node] + 1 < distances[node]
-            ):
-                distances[node] = distances[min_node] + 1
-
-    # Backtrack to find the shortest path
-    if distances[end_node] == sys.maxsize:
-        # No path exists
-        return None, None
-
-    path = deque()
-    current_node = end_node
-    path.appendleft(current_node)
-
-    while current_node != start_node:
-        for node in range(num_nodes):
-            if (
-                adj_matrix[node][current_node] == 1
-                and distances[node] + 1 == distances[current_node]
-            ):
-                current_node = node
-                path.appendleft(current_node)
-                break
-
-    return list(path), distances[end_node]
+def all_pairs_bfs(adj_matrix):
+    """
+    Computes the hop distance between every pair of nodes of an unweighted graph, running the 
+    BFS from all the sources at once (one matrix product per level).
 
+    Returns:
+        np.ndarray: the distance matrix (-1 if there's no path).
+    """
+    adjacency = np.asarray(adj_matrix, dtype=np.float32)
+    num_nodes = len(adjacency)
 
-class NetworkTopology:
-    class Edge:
-        def __init__(self, id, bw):
-            self.__id = id
-            self.__bw = bw
-            self.__initial_bw = bw
+    distances = np.full((num_nodes, num_nodes), -1, dtype=np.int32)
+    np.fill_diagonal(distances, 0)
+    frontier = np.eye(num_nodes, dtype=bool)
+    visited = frontier.copy()
 
-        def get_id(self):
-            return str(self.__id)
+    level = 0
+    while frontier.any():
+        level += 1
+        frontier = ((frontier.astype(np.float32) @ adjacency) > 0) & ~visited
+        distances[frontier] = level
+        visited |= frontier
 
-        def get_bw(self):
-            return self.__bw
-        
-        def get_initial(self):
-            return self.__initial_bw
+    return distances
 
-        def consume_bw(self, bw):
-            self.__bw -= bw
 
-        def release_bw(self, bw):
-            self.__bw += bw
+def shortest_path_tree(links, distances, start_node):
+    """
+    Returns the parent of every node in the shortest path from `start_node` (-1 for `start_node`
+    and the unreachable nodes). Among the possible parents, the one with the lowest id is 
+    chosen, so that the paths do not depend on the order in which the links are visited.
 
-        def get_resource_usage(self):
-            return ((self.__initial_bw - self.__bw)/self.__initial_bw)*100
+    Args:
+        links (tuple): the (node, neighbor) arrays of the links, sorted by node and neighbor.
+    """
+    node, neighbor = links
+    d = distances[start_node]
+    candidates = np.flatnonzero((d[neighbor] == d[node] - 1) & (d[neighbor] >= 0))
 
-        def __str__(self) -> str:
-            return "Edge_" + str(self.__id)
+    parent = np.full(len(d), -1, dtype=np.intp)
+    nodes, first = np.unique(node[candidates], return_index=True)
+    parent[nodes] = neighbor[candidates[first]]
+    return parent
 
-    def __init__(self, n_nodes, min_bw, max_bw, group_number=3, seed=None, topology_type=TopologyType.RING):
+
+class NetworkTopology:
+    """
+    Network connecting the nodes and the client. The paths are static, while the residual 
+    bandwidth of the edges and the number of reservations made for each job are kept in a block
+    of memory: with `shared=True` the block is allocated in shared memory and the reservations
+    are made under a process-shared lock, so that every node process can use its own copy of 
+    the topology instead of going through a manager.
+    """
+    # attributes backed by the memory block
+    __BLOCK = ("_NetworkTopology__bw", "_NetworkTopology__node_operations", "_NetworkTopology__client_operations")
+
+    def __init__(self, n_nodes, min_bw, max_bw, group_number=3, seed=None, topology_type=TopologyType.RING, job_ids=(), shared=False):
         if seed is not None:
             random.seed(seed)
 
@@ -103,12 +84,63 @@ class NetworkTopology:
         self.__n_nodes = n_nodes
         self.__min_bw = min_bw
         self.__max_bw = max_bw
-        self.__lock = threading.Lock()
+        self.__lock = multiprocessing.Lock() if shared else threading.Lock()
         self.__topology_type = topology_type
-        self.__node_operations = {}
-        self.__client_operations = {}
+        self.__job_index = {job_id: row for row, job_id in enumerate(job_ids)}
 
         self.__generate_topology()
+        self.__allocate_block(shared)
+
+    def __allocate_block(self, shared):
+        n_jobs = max(len(self.__job_index), 1)
+        self.__size = (len(self.__initial_bw) + 2 * n_jobs) * 8
+
+        if shared:
+            self.__shm = shared_memory.SharedMemory(create=True, size=self.__size)
+            self.__buf = None
+        else:
+            self.__shm = None
+            self.__buf = bytearray(self.__size)
+        self.__attach()
+        self.__bw[:] = self.__initial_bw
+        self.__node_operations[:] = 0
+        self.__client_operations[:] = 0
+
+    def __attach(self):
+        buf = self.__shm.buf if self.__shm is not None else self.__buf
+        n_edges = len(self.__initial_bw)
+        n_jobs = (self.__size // 8 - n_edges) // 2
+        # number of reservations between nodes and between a node and the client of each job
+        self.__bw = np.ndarray((n_edges,), dtype=np.float64, buffer=buf)
+        self.__node_operations = np.ndarray((n_jobs,), dtype=np.int64, buffer=buf, offset=n_edges * 8)
+        self.__client_operations = np.ndarray((n_jobs,), dtype=np.int64, buffer=buf, offset=(n_edges + n_jobs) * 8)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in NetworkTopology.__BLOCK:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__attach()
+
+    def clone(self, shared=False):
+        """
+        Returns a copy of the topology with the same (static) paths, but its own bandwidth state, 
+        set to the initial values.
+        """
+        topology = copy.copy(self)
+        topology.__lock = multiprocessing.Lock() if shared else threading.Lock()
+        topology.__allocate_block(shared)
+        return topology
+
+    def close(self):
+        for name in NetworkTopology.__BLOCK:
+            delattr(self, name)
+        if self.__shm is not None:
+            self.__shm.close()
+            self.__shm.unlink()
 
     def __generate_topology(self):
         if self.__n_nodes < self.__group_number:
@@ -121,7 +153,7 @@ class NetworkTopology:
                 "Number of groups in the network topology must be >= than 2. Exiting...")
             sys.exit(1)
 
-        self.__edges = {}
+        self.__edge_bw = []
 
         if self.__topology_type == TopologyType.RING:
             self.__generate_ring_topology()
@@ -131,51 +163,62 @@ class NetworkTopology:
             print("Invalid topology type: ", self.__topology_type)
             sys.exit(1)
 
-        self.__path = [[] for _ in range(self.__n_nodes+1)]
-        for i in range(self.__n_nodes+1):
-            for j in range(self.__n_nodes+1):
-                self.__path[i].append([])
+        # the last entry is a sentinel for the padding of the paths, so that the bandwidth of 
+        # a path is the minimum over its padded row
+        self.__initial_bw = np.array(self.__edge_bw + [float('inf')])
+        self.__n_edges = len(self.__edge_bw)
+        del self.__edge_bw
 
-        for i in range(self.__n_nodes):
-            for j in range(self.__n_nodes-(self.__n_nodes-i)):
-                if i != j:
-                    shortest_path, _ = dijkstra(self.__connected, i, j)
-                    # print(f"From {i} to {j}: ", end='')
-                    for k in range(len(shortest_path)-1):
-                        # print(f"Edge: {self.__edge_id[shortest_path[k]][shortest_path[k+1]]} ", end='')
-                        self.__path[i][j].append(
-                            self.__edge_id[shortest_path[k]][shortest_path[k+1]])
-                        self.__path[j][i].append(
-                            self.__edge_id[shortest_path[k]][shortest_path[k+1]])
-                    # print()
-
-        for j in range(self.__n_nodes):
-            shortest_path, _ = dijkstra(
-                self.__connected, len(self.__connected)-1, j)
-            # print(f"From Client to {j}: ", end='')
-            for k in range(len(shortest_path)-1):
-                # print(f"Edge: {self.__edge_id[shortest_path[k]][shortest_path[k+1]]} ", end='')
-                self.__path[len(
-                    self.__path)-1][j].append(self.__edge_id[shortest_path[k]][shortest_path[k+1]])
-                self.__path[j][len(
-                    self.__path)-1].append(self.__edge_id[shortest_path[k]][shortest_path[k+1]])
-            # print()
+        self.__compute_paths()
 
         #self.__export_as_dot()
 
+    def __compute_paths(self):
+        """
+        Computes the shortest path between every pair of nodes and between each node and the 
+        client. The path between i and j (the client has id n_nodes) is stored as the array of 
+        edge ids `self.__paths[i, j]`, padded with -1 (the sentinel of the bandwidth array).
+        """
+        distances = all_pairs_bfs(self.__connected)
+        links = np.nonzero(self.__connected)
+        client = len(self.__connected) - 1
+
+        n = self.__n_nodes
+        max_len = max(int(distances[:n+1, :n].max()), int(distances[client, :n].max()), 1)
+        self.__paths = np.full((n+1, n+1, max_len), -1, dtype=np.int32)
+
+        # as before, the path between two nodes is the one found from the node with the higher id
+        for i in range(n):
+            self.__store_paths(links, distances, i, i, np.arange(i))
+        self.__store_paths(links, distances, client, n, np.arange(n))
+
+    def __store_paths(self, links, distances, start_node, start_id, targets):
+        if len(targets) == 0:
+            return
+
+        parent = shortest_path_tree(links, distances, start_node)
+        depth = distances[start_node, targets]
+        edges = np.full((len(targets), self.__paths.shape[2]), -1, dtype=np.int32)
+
+        # walk back from the targets to the start node, filling the paths from their end
+        current = targets.copy()
+        for k in range(int(depth.max())):
+            active = np.flatnonzero(depth > k)
+            prev = parent[current[active]]
+            edges[active, depth[active]-1-k] = self.__edge_id[prev, current[active]]
+            current[active] = prev
+
+        self.__paths[start_id, targets] = edges
+        self.__paths[targets, start_id] = edges
+
+    def __add_edge(self, bw):
+        self.__edge_bw.append(bw)
+        return len(self.__edge_bw) - 1
+
     def __generate_fat_tree_topolgy(self):
-        self.__edge_id = [[]
-                          for _ in range(self.__n_nodes+self.__group_number+3)]
-        for i in range(self.__n_nodes+self.__group_number+3):
-            for j in range(self.__n_nodes+self.__group_number+3):
-                self.__edge_id[i].append([])
-
-        self.__connected = [[]
-                            for _ in range(self.__n_nodes+self.__group_number+3)]
-        for i in range(self.__n_nodes+self.__group_number+3):
-            for j in range(self.__n_nodes+self.__group_number+3):
-                self.__connected[i].append([])
-                self.__connected[i][j] = 0
+        n_vertices = self.__n_nodes+self.__group_number+3
+        self.__edge_id = np.full((n_vertices, n_vertices), -1, dtype=np.int32)
+        self.__connected = np.zeros((n_vertices, n_vertices), dtype=np.int8)
 
         node_group = []
         id = 0
@@ -184,16 +227,12 @@ class NetworkTopology:
             id = (id+1) % self.__group_number
 
         # edge dai nodi agli switch
-        index = 0
         self.__direct_edge_id = {}
         for i in range(self.__n_nodes):
-            e = NetworkTopology.Edge(
-                index, random.uniform(self.__min_bw, self.__max_bw))
-            self.__edges[e.get_id()] = e
-            self.__direct_edge_id[i] = e.get_id()
-            index += 1
-            self.__edge_id[i][self.__n_nodes + node_group[i]] = e.get_id()
-            self.__edge_id[self.__n_nodes + node_group[i]][i] = e.get_id()
+            e = self.__add_edge(random.uniform(self.__min_bw, self.__max_bw))
+            self.__direct_edge_id[i] = e
+            self.__edge_id[i][self.__n_nodes + node_group[i]] = e
+            self.__edge_id[self.__n_nodes + node_group[i]][i] = e
             self.__connected[i][self.__n_nodes + node_group[i]] = 1
             self.__connected[self.__n_nodes + node_group[i]][i] = 1
 
@@ -203,58 +242,41 @@ class NetworkTopology:
             next_id = self.__n_nodes + self.__group_number + id
             id = (id+1) % 2
 
-            e = NetworkTopology.Edge(
-                index, random.uniform(self.__min_bw, self.__max_bw))
-            self.__edges[e.get_id()] = e
-            index += 1
+            e = self.__add_edge(random.uniform(self.__min_bw, self.__max_bw))
 
-            self.__edge_id[self.__n_nodes+i][next_id] = e.get_id()
-            self.__edge_id[next_id][self.__n_nodes+i] = e.get_id()
+            self.__edge_id[self.__n_nodes+i][next_id] = e
+            self.__edge_id[next_id][self.__n_nodes+i] = e
             self.__connected[self.__n_nodes+i][next_id] = 1
             self.__connected[next_id][self.__n_nodes+i] = 1
 
         # edge tra i due switch di backbone
-        e = NetworkTopology.Edge(
-            index, random.uniform(self.__min_bw, self.__max_bw))
-        self.__edges[e.get_id()] = e
-        index += 1
+        e = self.__add_edge(random.uniform(self.__min_bw, self.__max_bw))
 
         self.__edge_id[self.__n_nodes+self.__group_number][self.__n_nodes +
-                                                           self.__group_number+1] = e.get_id()
+                                                           self.__group_number+1] = e
         self.__edge_id[self.__n_nodes+self.__group_number +
-                       1][self.__n_nodes+self.__group_number] = e.get_id()
+                       1][self.__n_nodes+self.__group_number] = e
         self.__connected[self.__n_nodes +
                          self.__group_number][self.__n_nodes+self.__group_number+1] = 1
         self.__connected[self.__n_nodes+self.__group_number +
                          1][self.__n_nodes+self.__group_number] = 1
 
         # client
-        e = NetworkTopology.Edge(index, float('inf'))
-        self.__edges[e.get_id()] = e
-        index += 1
+        e = self.__add_edge(float('inf'))
 
         self.__edge_id[self.__n_nodes+self.__group_number][self.__n_nodes +
-                                                           self.__group_number+2] = e.get_id()
+                                                           self.__group_number+2] = e
         self.__edge_id[self.__n_nodes+self.__group_number +
-                       2][self.__n_nodes+self.__group_number] = e.get_id()
+                       2][self.__n_nodes+self.__group_number] = e
         self.__connected[self.__n_nodes +
                          self.__group_number][self.__n_nodes+self.__group_number+2] = 1
         self.__connected[self.__n_nodes+self.__group_number +
                          2][self.__n_nodes+self.__group_number] = 1
 
     def __generate_ring_topology(self):
-        self.__edge_id = [[]
-                          for _ in range(self.__n_nodes+self.__group_number+1)]
-        for i in range(self.__n_nodes+self.__group_number+1):
-            for j in range(self.__n_nodes+self.__group_number+1):
-                self.__edge_id[i].append([])
-
-        self.__connected = [[]
-                            for _ in range(self.__n_nodes+self.__group_number+1)]
-        for i in range(self.__n_nodes+self.__group_number+1):
-            for j in range(self.__n_nodes+self.__group_number+1):
-                self.__connected[i].append([])
-                self.__connected[i][j] = 0
+        n_vertices = self.__n_nodes+self.__group_number+1
+        self.__edge_id = np.full((n_vertices, n_vertices), -1, dtype=np.int32)
+        self.__connected = np.zeros((n_vertices, n_vertices), dtype=np.int8)
 
         node_group = []
         id = 0
@@ -264,15 +286,11 @@ class NetworkTopology:
 
         self.__direct_edge_id = {}
         # edge dai nodi agli switch
-        index = 0
         for i in range(self.__n_nodes):
-            e = NetworkTopology.Edge(
-                index, random.uniform(self.__min_bw, self.__max_bw))
-            self.__edges[e.get_id()] = e
-            self.__direct_edge_id[i] = e.get_id()
-            index += 1
-            self.__edge_id[i][self.__n_nodes + node_group[i]] = e.get_id()
-            self.__edge_id[self.__n_nodes + node_group[i]][i] = e.get_id()
+            e = self.__add_edge(random.uniform(self.__min_bw, self.__max_bw))
+            self.__direct_edge_id[i] = e
+            self.__edge_id[i][self.__n_nodes + node_group[i]] = e
+            self.__edge_id[self.__n_nodes + node_group[i]][i] = e
             self.__connected[i][self.__n_nodes + node_group[i]] = 1
             self.__connected[self.__n_nodes + node_group[i]][i] = 1
 
@@ -281,32 +299,24 @@ class NetworkTopology:
             next_id = self.__n_nodes + (i+1) % self.__group_number
             prev_id = self.__n_nodes + self.__group_number - \
                 1 if i == 0 else self.__n_nodes + i-1
-            e1 = NetworkTopology.Edge(
-                index, random.uniform(self.__min_bw, self.__max_bw))
-            self.__edges[e1.get_id()] = e1
-            index += 1
-            e2 = NetworkTopology.Edge(
-                index, random.uniform(self.__min_bw, self.__max_bw))
-            self.__edges[e2.get_id()] = e2
-            index += 1
-            self.__edge_id[self.__n_nodes+i][prev_id] = e1.get_id()
-            self.__edge_id[self.__n_nodes+i][next_id] = e2.get_id()
-            self.__edge_id[prev_id][self.__n_nodes+i] = e1.get_id()
-            self.__edge_id[next_id][self.__n_nodes+i] = e2.get_id()
+            e1 = self.__add_edge(random.uniform(self.__min_bw, self.__max_bw))
+            e2 = self.__add_edge(random.uniform(self.__min_bw, self.__max_bw))
+            self.__edge_id[self.__n_nodes+i][prev_id] = e1
+            self.__edge_id[self.__n_nodes+i][next_id] = e2
+            self.__edge_id[prev_id][self.__n_nodes+i] = e1
+            self.__edge_id[next_id][self.__n_nodes+i] = e2
             self.__connected[self.__n_nodes+i][prev_id] = 1
             self.__connected[self.__n_nodes+i][next_id] = 1
             self.__connected[prev_id][self.__n_nodes+i] = 1
             self.__connected[next_id][self.__n_nodes+i] = 1
 
         # client
-        e = NetworkTopology.Edge(index, float('inf'))
-        self.__edges[e.get_id()] = e
-        index += 1
+        e = self.__add_edge(float('inf'))
 
         self.__edge_id[self.__n_nodes+self.__group_number][self.__n_nodes +
-                                                           self.__group_number-1] = e.get_id()
+                                                           self.__group_number-1] = e
         self.__edge_id[self.__n_nodes+self.__group_number -
-                       1][self.__n_nodes+self.__group_number] = e.get_id()
+                       1][self.__n_nodes+self.__group_number] = e
         self.__connected[self.__n_nodes +
                          self.__group_number][self.__n_nodes+self.__group_number-1] = 1
         self.__connected[self.__n_nodes+self.__group_number -
@@ -328,134 +338,138 @@ class NetworkTopology:
             # Note: could be changed with the average
             if id1 == float('-inf') or id2 == float('-inf'):
                 index = id1 if id1 != float('-inf') else id2
-                min_bw = float('inf')
-                for i in range(self.__n_nodes):
-                    if i != index:
-                        edges = self.__path[index][i]
-                        for e_id in edges:
-                            if self.__edges[e_id].get_bw() < min_bw:
-                                min_bw = self.__edges[e_id].get_bw()
-            else:
-                edges = self.__path[id1][id2]
-                min_bw = float('inf')
-                for e_id in edges:
-                    if self.__edges[e_id].get_bw() < min_bw:
-                        min_bw = self.__edges[e_id].get_bw()
-            return min_bw
+                return float(self.__bw[self.__paths[index, :self.__n_nodes]].min())
+            return float(self.__bw[self.__paths[id1, id2]].min())
+
+    def get_available_bandwidth_between_pairs(self, src, dst):
+        """
+        Returns the available bandwidth on the path between each pair of nodes (src[k], dst[k]), 
+        i.e., the minimum residual bandwidth of the edges of the path (inf if src[k] == dst[k]).
+        """
+        if not network_aware:
+            return self.__bw[[self.__direct_edge_id[i] for i in src]]
+
+        with self.__lock:
+            return self.__bw[self.__paths[src, dst]].min(axis=-1)
+
+    def get_available_bandwidth_from_node(self, id1):
+        """
+        Returns the available bandwidth between the node and every node of the topology (inf 
+        for the node itself).
+        """
+        if not network_aware:
+            return np.full(self.__n_nodes, self.get_node_direct_link_bw(id1))
+
+        with self.__lock:
+            return self.__bw[self.__paths[id1, :self.__n_nodes]].min(axis=-1)
 
     def consume_bandwidth_between_nodes(self, id1, id2, bw, job_id):
         # print(f"Consuming bw between {id1} and {id2} -- Job {job_id}", flush=True)
+        return self.consume_bandwidth_between_pairs([id1], [id2], bw, job_id)
 
+    def consume_bandwidth_between_pairs(self, src, dst, bw, job_id):
+        """
+        Reserves `bw` (a value or one value per pair) on the path between each pair of nodes 
+        (src[k], dst[k]). Either all the reservations succeed or none is made.
+
+        Returns:
+            bool: True if the bandwidth has been reserved.
+        """
         with self.__lock:
-            if job_id not in self.__node_operations:
-                self.__node_operations[job_id] = {}
-            if id1 == id2:
-                return True                
-            edges = self.__path[id1][id2]
-            
-            if network_aware:
-                for e_id in edges:
-                    if self.__edges[e_id].get_bw() < bw:
-                        return False
-            
-            for e_id in edges:
-                self.__edges[e_id].consume_bw(bw)
-            
-            key = str(min(id1, id2)) + "_" + str(max(id1, id2))
-            if key not in self.__node_operations[job_id]:
-                self.__node_operations[job_id][key] = 1
-            else:
-                self.__node_operations[job_id][key] += 1
+            if not self.__reserve(self.__paths[src, dst], bw):
+                return False
+
+            self.__node_operations[self.__job_index[job_id]] += sum(1 for id1, id2 in zip(src, dst) if id1 != id2)
             return True
 
     def release_bandwidth_between_nodes(self, id1, id2, bw, job_id):
         # print(f"Releasing bw between {id1} and {id2} -- Job {job_id}", flush=True)
-        if id1 == id2:
-            return
+        self.release_bandwidth_between_pairs([id1], [id2], bw, job_id)
 
+    def release_bandwidth_between_pairs(self, src, dst, bw, job_id):
+        """
+        Releases `bw` (a value or one value per pair) on the path between each pair of nodes 
+        (src[k], dst[k]).
+        """
         with self.__lock:
-            key = str(min(id1, id2)) + "_" + str(max(id1, id2))
-            self.__node_operations[job_id][key] -= 1
-            edges = self.__path[id1][id2]
-            for e_id in edges:
-                self.__edges[e_id].release_bw(bw)
+            self.__node_operations[self.__job_index[job_id]] -= sum(1 for id1, id2 in zip(src, dst) if id1 != id2)
+            self.__release(self.__paths[src, dst], bw)
 
     def get_available_bandwidth_with_client(self, id1):
         if not network_aware:
             return self.get_node_direct_link_bw(id1)
 
         with self.__lock:
-            edges = self.__path[len(self.__path)-1][id1]
-            min_bw = float('inf')
-            for e_id in edges:
-                if self.__edges[e_id].get_bw() < min_bw:
-                    min_bw = self.__edges[e_id].get_bw()
-            return min_bw
+            return float(self.__bw[self.__paths[self.__n_nodes, id1]].min())
 
     def consume_bandwidth_node_and_client(self, id1, bw, job_id):
         # print(f"Consuming bw between {id1} and Client -- Job {job_id}", flush=True)
         with self.__lock:
-            if job_id not in self.__client_operations:
-                self.__client_operations[job_id] = {}
-                
-            edges = self.__path[len(self.__path)-1][id1]
-
-            if network_aware:
-                for e_id in edges:
-                    if self.__edges[e_id].get_bw() < bw:
-                        return False
-            for e_id in edges:
-                self.__edges[e_id].consume_bw(bw)
-                
-            if str(id1) not in self.__client_operations[job_id]:
-                self.__client_operations[job_id][str(id1)] = 1
-            else:
-                self.__client_operations[job_id][str(id1)] += 1
+            if not self.__reserve(self.__paths[self.__n_nodes, [id1]], bw):
+                return False
+
+            self.__client_operations[self.__job_index[job_id]] += 1
             return True
 
     def release_bandwidth_node_and_client(self, id1, bw, job_id):
         # print(f"Releasing bw between {id1} and Client -- Job {job_id}", flush=True)
         with self.__lock:
-            self.__client_operations[job_id][str(id1)] -= 1
-            edges = self.__path[len(self.__path)-1][id1]
-            for e_id in edges:
-                self.__edges[e_id].release_bw(bw)
+            self.__client_operations[self.__job_index[job_id]] -= 1
+            self.__release(self.__paths[self.__n_nodes, [id1]], bw)
+
+    def __demand(self, paths, bw):
+        """
+        Returns the bandwidth requested on each edge by the reservation of `bw` on the given 
+        (padded) paths, and the mask of the edges involved.
+        """
+        demand = np.zeros(len(self.__bw))
+        np.add.at(demand, paths, np.broadcast_to(np.reshape(bw, (-1, 1)), paths.shape))
+        used = np.zeros(len(self.__bw), dtype=bool)
+        used[paths] = True
+        demand[-1] = 0
+        used[-1] = False
+        return demand, used
+
+    def __reserve(self, paths, bw):
+        demand, used = self.__demand(paths, bw)
+        if network_aware and np.any(self.__bw[used] < demand[used]):
+            return False
+        self.__bw[:-1] -= demand[:-1]
+        return True
+
+    def __release(self, paths, bw):
+        demand, _ = self.__demand(paths, bw)
+        self.__bw[:-1] += demand[:-1]
 
     def get_node_direct_link_bw(self, id):
         with self.__lock:
-            return self.__edges[self.__direct_edge_id[id]].get_bw()
+            return float(self.__bw[self.__direct_edge_id[id]])
         
     def check_network_consistency(self, bids):
         print("Performing consistency check on network topology...")
         
         for key, bid in bids.items():
             expected_node_allocation = 0
-            client_allocations = 0
             val = bid[0]
             for b in bid:
                 if val != b:
                     val = b
                     expected_node_allocation += 1 
             
-            if key in self.__node_operations:
-                for key2 in self.__node_operations[key]:
-                    if key in self.__node_operations:
-                        expected_node_allocation -= self.__node_operations[key][key2]
+            row = self.__job_index[key]
+            expected_node_allocation -= self.__node_operations[row]
+            client_allocations = self.__client_operations[row]
                 
             if expected_node_allocation != 0:
                 print("Too many bandwidth reservation requests between nodes")
                 print(f"There's a problem with job {key}")
-                print(self.__node_operations[key])
+                print(self.__node_operations[row])
                 sys.exit(1)
-            if key in self.__client_operations:    
-                for key2 in self.__client_operations[key]:
-                    if key in self.__client_operations:
-                        client_allocations += self.__client_operations[key][key2]
                 
             if client_allocations != 1:
                 print("Too many bandwidth reservation requests between node and client")
                 print(f"There's a problem with job {key}")
-                print(self.__client_operations[key])
+                print(self.__client_operations[row])
                 sys.exit(1)
             
         print("The network topology is consistent with the final allocation scheme")
@@ -476,11 +490,12 @@ class NetworkTopology:
         ret_dict = {}
         ret_dict["alpha"] = alpha
         
-        for key in self.__edges:
-            if self.__edges[key].get_initial() != float('inf'): 
-                ret_dict["Edge_" + str(key) + "_initial"] = round(self.__edges[key].get_initial())  
-                ret_dict["Edge_" + str(key) + "_final"] = round(self.__edges[key].get_bw())
-                ret_dict["Edge_" + str(key) + "_usage"] = round(self.__edges[key].get_resource_usage())   
+        for key in range(self.__n_edges):
+            initial = self.__initial_bw[key]
+            if initial != float('inf'): 
+                ret_dict["Edge_" + str(key) + "_initial"] = round(initial)  
+                ret_dict["Edge_" + str(key) + "_final"] = round(self.__bw[key])
+                ret_dict["Edge_" + str(key) + "_usage"] = round(((initial - self.__bw[key])/initial)*100)   
             
         self.__write_data(ret_dict.keys(), ret_dict, filename)     
             
@@ -2,29 +2,41 @@
 This module impelments the behavior of a node
 '''
 
+from collections import namedtuple
 from queue import Empty
 import random
 import time
-from src.config import Utility, NodeType, NodeSupport
+from src.config import Utility, NodeType, NodeSupport, JobState
 from src.network_topology import NetworkTopology
 from src.node_performance import NodePerformance
-from datetime import datetime, timedelta
 import copy
 import logging
-import math 
-import threading
 import math
+import threading
 from src.topology import topo as LogicalTopology
+from src.termination import TerminationDetector
+from src.bid_table import BidTable, to_node_id
+from src.deconfliction import deconflict
+from src.bid_message import BidMessageDecoder, encode_delta
+from src.utility import utility_score
+import numpy as np
 
 TRACE = 5    
 
+# timestamp offsets (in seconds) used for the layers with no winner
+ONE_DAY = 24 * 60 * 60
+ONE_HOUR = 60 * 60
+
+# what a node keeps of a job once it has been evicted
+JobSummary = namedtuple("JobSummary", ["allocation", "count", "consensus_count", "forward_count", "deconflictions", "arrival_time", "complete_timestamp", "completed"])
+
 class InternalError(Exception):
     "Raised when the input value is less than 18"
     pass
 
 class node:
 
-    def __init__(self, id, network_topology: NetworkTopology, gpu_type: NodeType, utility: Utility, alpha: float, enable_logging: bool, logical_topology: LogicalTopology, tot_nodes: int, progress_flag: bool, use_net_topology=False, decrement_factor=0.1):
+    def __init__(self, id, network_topology: NetworkTopology, gpu_type: NodeType, utility: Utility, alpha: float, enable_logging: bool, logical_topology: LogicalTopology, tot_nodes: int, progress_flag: bool, use_net_topology=False, decrement_factor=0.1, seed=0):
         self.id = id    # unique edge node id
         self.gpu_type = gpu_type
         self.utility = utility
@@ -39,12 +51,15 @@ class node:
         self.updated_gpu = self.initial_gpu
         self.updated_cpu = self.initial_cpu
         self.performance = NodePerformance(self.initial_cpu, self.initial_gpu, gpu_type, self.id)
+        # generator of the RANDOM utility, different for each node and each seed of the simulation
+        self.rng = random.Random(seed * tot_nodes + id)
 
         self.available_cpu_per_task = {}
         self.available_gpu_per_task = {}
         self.available_bw_per_task = {}
 
         self.last_sent_msg = {}
+        self.message_decoder = BidMessageDecoder()
         self.resource_remind = {}
 
         # it is not possible to have NN with more than 50 layers
@@ -55,6 +70,7 @@ class node:
         if use_net_topology:
             self.network_topology = network_topology
             self.initial_bw = network_topology.get_node_direct_link_bw(self.id)
+            self.updated_bw = self.initial_bw
             self.bw_with_nodes = {}
             self.bw_with_client = {}
         else:
@@ -87,8 +103,24 @@ class node:
         
         self.user_requests = []
         self.item={}
+        # bookkeeping information of each job. The auction vectors are stored in the bid table
         self.bids= {}
+        self.bid_table = BidTable()
         self.layer_bid_already = {}
+        # lifecycle of the jobs known by the node (see evict_job)
+        self.job_state = {}
+        self.job_summaries = {}
+        
+        # clock (in seconds) used to timestamp the bids. The discrete-event engine replaces it with a logical clock
+        self.clock = time.time
+        # when False, the bidding rounds are progressed by the discrete-event engine instead of a thread
+        self.threaded_bid_rounds = True
+        self.pending_bid_rounds = {}
+        # when False, the reported state is shared with the caller instead of being copied
+        self.snapshot_reports = True
+        self.termination = None
+        # when set, the node state is published in the SharedNodeState instead of ret_val
+        self.shared_state = None
 
     def get_avail_gpu(self):
         return self.updated_gpu
@@ -102,10 +134,9 @@ class node:
     def compute_curr_gpu_power_consumption(self):
         return self.power_function(self.initial_gpu - self.updated_gpu, "gpu")
         
-    def set_queues(self, q, use_queue):
+    def set_queues(self, q, termination: TerminationDetector):
         self.q = q
-        self.empty_queue = use_queue
-        self.empty_queue[self.id].set()
+        self.termination = termination
     
     def init_null(self):
         # print(self.item['duration'])
@@ -116,16 +147,10 @@ class node:
             "deconflictions":0,
             "job_id": self.item['job_id'], 
             "user": int(), 
-            "auction_id": list(), 
             "NN_gpu": self.item['NN_gpu'], 
             "NN_cpu": self.item['NN_cpu'], 
             "NN_data_size": self.item['NN_data_size'],
-            "bid": list(), 
-            "bid_gpu": list(), 
-            "bid_cpu": list(), 
-            "bid_bw": list(), 
-            "timestamp": list(),
-            "arrival_time":datetime.now(),
+            "arrival_time":self.clock(),
             "start_time": 0, #datetime.now(),
             "progress_time": 0, #datetime.now(),
             "complete":False,
@@ -149,18 +174,13 @@ class node:
         if not self.use_net_topology:
             self.available_bw_per_task[self.item['job_id']] = self.updated_bw
         else:
-            self.bw_with_nodes[self.item['job_id']] = {}
+            self.bw_with_nodes[self.item['job_id']] = None
             self.bw_with_client[self.item['job_id']] = self.network_topology.get_available_bandwidth_with_client(self.id)
         
         NN_len = len(self.item['NN_gpu'])
         
-        for _ in range(0, NN_len):
-            self.bids[self.item['job_id']]['bid'].append(float('-inf'))
-            self.bids[self.item['job_id']]['bid_gpu'].append(float('-inf'))
-            self.bids[self.item['job_id']]['bid_cpu'].append(float('-inf'))
-            self.bids[self.item['job_id']]['bid_bw'].append(float('-inf'))
-            self.bids[self.item['job_id']]['auction_id'].append(float('-inf'))
-            self.bids[self.item['job_id']]['timestamp'].append(datetime.now() - timedelta(days=1))
+        self.bid_table.add(self.item['job_id'], NN_len, self.clock() - ONE_DAY)
+        self.job_state[self.item['job_id']] = JobState.ACTIVE
 
     def util_rate(self):
         cpus_util = 1 - self.updated_cpu / self.initial_cpu
@@ -173,108 +193,42 @@ class node:
 
 
     def utility_function(self, avail_bw, avail_cpu, avail_gpu, bw_job=0, cpu_job=0, gpu_job=0):
-        def f(x, alpha, beta):
-            if beta == 0 and x == 0:
-                return 1
-            
-            # shouldn't happen
-            if beta == 0 and x != 0:
-                return 0
-            
-            # if beta != 0 and x == 0 is not necessary
-            return math.exp(-((alpha/100) * (x - beta))**2)
-            #return math.exp(-(alpha/100)*(x-beta)**2)
-
-        if (isinstance(avail_bw, float) and avail_bw == float('inf')):
-            avail_bw = self.initial_bw
-        
-        # we assume that every job/node has always at least one CPU
-        if self.utility == Utility.STEFANO:
-            x = 0
-            if self.item['NN_gpu'][0] == 0:
-                x = 0
-            else:
-                x = self.item['NN_cpu'][0]/self.item['NN_gpu'][0]
-                
-            beta = 0
-            if avail_gpu == 0:
-                beta = 0
-            else:
-                beta = avail_cpu/avail_gpu
-            if self.alpha == 0:
-                return f(x, 0.01, beta)
-            else:
-                return f(x, self.alpha, beta)
-        elif self.utility == Utility.ALPHA_GPU_CPU:
-            return (self.alpha*(avail_bw/self.initial_bw))+((1-self.alpha)*(avail_cpu/self.initial_cpu)) #BW vs CPU
-        elif self.utility == Utility.ALPHA_GPU_CPU:
-            return (self.alpha*(avail_gpu/self.initial_gpu))+((1-self.alpha)*(avail_cpu/self.initial_cpu)) #GPU vs CPU
-        elif self.utility == Utility.ALPHA_GPU_BW:
-            return (self.alpha*(avail_gpu/self.initial_gpu))+((1-self.alpha)*(avail_bw/self.initial_bw)) # GPU vs BW
-        elif self.utility == Utility.LGF:
-            corrective_factor = NodeSupport.get_GPU_corrective_factor(self.gpu_type, NodeSupport.get_node_type(self.item['gpu_type']), decrement=self.decrement_factor)
-            return avail_cpu * corrective_factor
-        elif self.utility == Utility.SGF:
-            corrective_factor = NodeSupport.get_GPU_corrective_factor(self.gpu_type, NodeSupport.get_node_type(self.item['gpu_type']), decrement=self.decrement_factor)
-            return (self.initial_gpu - avail_gpu) * corrective_factor
-        elif self.utility == Utility.UTIL:
-            return self.util_rate()
-
-        elif self.utility == Utility.POWER:
-            p_before = self.performance.compute_current_power_consumption_cpu(self.initial_cpu - avail_cpu)
-            p_after = self.performance.compute_current_power_consumption_cpu(self.initial_cpu - (avail_cpu - cpu_job))
-            return 1/(p_after - p_before)
-        elif self.utility == Utility.RANDOM:
-            return random.random()
+        """
+        Returns the score of a layer (see `utility_score`).
+        """
+        return utility_score(self, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job)
 
 
     def forward_to_neighbohors(self, custom_dict=None, resend_bid=False):
         if self.enable_logging:
             self.print_node_state('FORWARD', True)
             
-        msg = {
-            "job_id": self.item['job_id'], 
-            "user": self.item['user'],
-            "edge_id": self.id, 
-            "NN_gpu": self.item['NN_gpu'],
-            "NN_cpu": self.item['NN_cpu'],
-            "NN_data_size": self.item['NN_data_size'], 
-            "N_layer": self.item["N_layer"],
-            "N_layer_min": self.item["N_layer_min"],
-            "N_layer_max": self.item["N_layer_max"],
-            "N_layer_bundle": self.item["N_layer_bundle"],
-            "gpu_type": self.item["gpu_type"]
-        }
-        
         if custom_dict == None and not resend_bid:
-            msg["auction_id"] = copy.deepcopy(self.bids[self.item['job_id']]['auction_id'])
-            msg["bid"] = copy.deepcopy(self.bids[self.item['job_id']]['bid'])
-            msg["timestamp"] = copy.deepcopy(self.bids[self.item['job_id']]['timestamp'])
+            bids = self.bid_table.snapshot(self.item['job_id'])
         elif custom_dict != None and not resend_bid:
-            msg["auction_id"] = copy.deepcopy(custom_dict['auction_id'])
-            msg["bid"] = copy.deepcopy(custom_dict['bid'])
-            msg["timestamp"] = copy.deepcopy(custom_dict['timestamp'])
+            bids = BidTable.copy_snapshot(custom_dict)
         elif resend_bid:
             if "auction_id" not in self.item:
                 return
             else:
-                msg["auction_id"] = copy.deepcopy(self.item['auction_id'])
-                msg["bid"] = copy.deepcopy(self.item['bid'])
-                msg["timestamp"] = copy.deepcopy(self.item['timestamp'])
-                
-        if self.item['job_id'] not in self.last_sent_msg:
-            self.last_sent_msg[self.item['job_id']] = msg
-        elif (self.last_sent_msg[self.item['job_id']]["auction_id"] == msg["auction_id"] and \
-            self.last_sent_msg[self.item['job_id']]["timestamp"] == msg["timestamp"] and \
-            self.last_sent_msg[self.item['job_id']]["bid"] == msg["bid"]):
+                bids = BidTable.copy_snapshot(self.item)
+        
+        # the neighbors know the job description and the last bids sent by this node,
+        # so the message only carries the layers that changed
+        last_sent = self.last_sent_msg.get(self.item['job_id'])
+        if last_sent is not None and \
+            np.array_equal(last_sent["auction_id"], bids["auction_id"]) and \
+            np.array_equal(last_sent["timestamp"], bids["timestamp"]) and \
+            np.array_equal(last_sent["bid"], bids["bid"]):
             # msg already sent before
             return
         
+        msg = encode_delta(self.item['job_id'], self.id, last_sent, bids)
         for i in range(self.tot_nodes):
             if self.logical_topology.to()[i][self.id] and self.id != i:
                 self.q[i].put(msg)
         
-        self.last_sent_msg[self.item['job_id']] = msg
+        self.last_sent_msg[self.item['job_id']] = bids
 
 
 
@@ -292,45 +246,14 @@ class node:
                     #" initial BW:" + str(self.initial_bw) if hasattr(self, 'initial_bw') else str(0) +
                     #" available BW:" + str(self.updated_bw) if hasattr(self, 'updated_bw') else str(0)  +
                     # "\n" + str(self.layer_bid_already[self.item['job_id']]) +
-                    (("\n"+str(self.bids[self.item['job_id']]['auction_id']) if bid else "") +
+                    (("\n"+str(self.bid_table.auction_id_of(self.item['job_id'])) if bid else "") +
                     ("\n" + str(self.item.get('auction_id')) if bid and self.item.get('auction_id') is not None else "\n"))
                     )
     
-    def update_local_val(self, tmp, index, id, bid, timestamp, lst):
-        tmp['job_id'] = self.item['job_id']
-        tmp['auction_id'][index] = id
-        tmp['bid'][index] = bid
-        tmp['timestamp'][index] = timestamp
-        return index + 1
-
-    def update_local_val_new(self, tmp, index, id, bid, timestamp, lst):
-
-        indices = []
-
-        flag=True
-        for i, v in enumerate(lst['auction_id']):
-            if v == id:
-                indices.append(i)
-        if len(indices)>0:
-            for i in indices:
-                if timestamp >= lst['timestamp'][i]:
-                    flag=True
-                else:
-                    flag=False
-        if flag:
-            tmp['auction_id'][index] = id
-            tmp['bid'][index] = bid
-            tmp['timestamp'][index] = timestamp
-        else:
-            pass
-            # print('beccatoktm!')
-
-        return index + 1
-    
     def reset(self, index, dict, bid_time):
         dict['auction_id'][index] = float('-inf')
         dict['bid'][index]= float('-inf')
-        dict['timestamp'][index] = bid_time # - timedelta(days=1)
+        dict['timestamp'][index] = bid_time # - ONE_DAY
         return index + 1
     
     # NOTE: inprove in future iterations
@@ -338,92 +261,72 @@ class node:
         return cpu
     
     def bid_energy(self, enable_forward=True):
-        tmp_bid = copy.deepcopy(self.bids[self.item['job_id']])
-        bidtime = datetime.now()
+        tmp_bid = self.bid_table.snapshot(self.item['job_id'])
+        bidtime = self.clock()
         
-        possible_layer = []
         layer_acquired = 0
         gpu_ = 0
         cpu_ = 0
         
-        for i in range(len(self.layer_bid_already[self.item['job_id']])):
-            # include only those layers that have not been bid on yet and that can be executed on the node (i.e., the node has enough resources)
-            if not self.layer_bid_already[self.item['job_id']][i] \
-                and self.item['NN_cpu'][i] <= self.updated_cpu:# \
-                    #self.item['NN_cpu'][i] <= self.updated_cpu:# and self.item['NN_data_size'][i] <= self.updated_bw:
-                possible_layer.append(i)
+        NN_cpu = np.asarray(self.item['NN_cpu'])
+        NN_gpu = np.asarray(self.item['NN_gpu'])
         
-        while True:
-            min_req = float('inf')
-            target_layer = None
-            for l in possible_layer:
-                if self.item['NN_cpu'][l] < min_req:
-                    min_req = self.item['NN_cpu'][l]
-                    target_layer = l
-                    
-            if target_layer is None:        
-                if layer_acquired >= self.item["N_layer_min"] and layer_acquired <= self.item["N_layer_max"]:
-                    self.updated_cpu -= cpu_
-                    self.updated_gpu -= gpu_
-                    #self.updated_bw -= bw_
-                    
-                    self.bids[self.item['job_id']] = tmp_bid
-                    
-                    if enable_forward:
-                        self.forward_to_neighbohors()
-                    
-                    return True
-                else:
-                    return False
-            else:
-                if self.item['NN_cpu'][target_layer] <= self.updated_cpu - cpu_:
-                    bid = self.utility_function(self.updated_bw, self.updated_cpu, self.updated_gpu, self.item["NN_data_size"][target_layer], self.item["NN_cpu"][target_layer], self.item["NN_gpu"][target_layer])
-                    bid -= self.id * 0.000000001
-                    self.layer_bid_already[self.item['job_id']][target_layer] = True  
-                    possible_layer.remove(target_layer)   
+        # include only those layers that have not been bid on yet and that can be executed on the node (i.e., the node has enough resources)
+        possible_layer = np.flatnonzero(~np.array(self.layer_bid_already[self.item['job_id']], dtype=bool) & (NN_cpu <= self.updated_cpu))
+        
+        # the layers are considered in order of cpu requirement. Their scores don't depend on the
+        # layers already acquired, so they are computed before any layer is acquired
+        possible_layer = possible_layer[np.argsort(NN_cpu[possible_layer], kind="stable")].tolist()
+        layer_bw, layer_cpu, layer_gpu = self.item["NN_data_size"].layer_bw.tolist(), NN_cpu.tolist(), NN_gpu.tolist()
+        bids = [self.utility_function(self.updated_bw, self.updated_cpu, self.updated_gpu, layer_bw[l], layer_cpu[l], layer_gpu[l]) - self.id * 0.000000001
+                for l in possible_layer]
+        
+        for target_layer, bid in zip(possible_layer, bids):
+            if NN_cpu[target_layer] > self.updated_cpu - cpu_:
+                break
+            
+            self.layer_bid_already[self.item['job_id']][target_layer] = True  
+        
+            if bid > tmp_bid['bid'][target_layer]:  
+                gpu_ += NN_gpu[target_layer]
+                cpu_ += NN_cpu[target_layer]
+                #bw_ = self.item["NN_data_size"][best_placement]
                 
-                    if bid > tmp_bid['bid'][target_layer]:  
-                        gpu_ += self.item['NN_gpu'][target_layer]
-                        cpu_ += self.item['NN_cpu'][target_layer]
-                        #bw_ = self.item["NN_data_size"][best_placement]
-                        
-                        layer_acquired += 1
-                        
-                        tmp_bid['bid'][target_layer] = bid
-                        tmp_bid['auction_id'][target_layer]=(self.id)
-                        tmp_bid['timestamp'][target_layer] = bidtime
-                else:
-                    possible_layer = []
+                layer_acquired += 1
+                
+                tmp_bid['bid'][target_layer] = bid
+                tmp_bid['auction_id'][target_layer]=(self.id)
+                tmp_bid['timestamp'][target_layer] = bidtime
                     
+        if layer_acquired >= self.item["N_layer_min"] and layer_acquired <= self.item["N_layer_max"]:
+            self.updated_cpu -= cpu_
+            self.updated_gpu -= gpu_
+            #self.updated_bw -= bw_
+            
+            self.bid_table.restore(self.item['job_id'], tmp_bid)
+            
+            if enable_forward:
+                self.forward_to_neighbohors()
+            
+            return True
+        else:
+            return False
                 
-    
     def update_bw(self, prev_bid, deallocate=False):
         bw = 0
-                
+        
+        # bandwidth of the edges of the application graph between the layers hosted by the node
+        # and the layers hosted by other nodes
         if prev_bid is not None:
-            for i, b_id in enumerate(prev_bid):
-                if b_id == self.id:
-                    for j in range(len(self.item["NN_data_size"][i])):
-                        if i == j:
-                            continue
-                        
-                        if self.item["NN_data_size"][i][j] != 0 and prev_bid[j] != self.id:
-                            bw += self.item["NN_data_size"][i][j]
+            bw += self.item["NN_data_size"].cut_bandwidth(np.asarray(prev_bid) == self.id)
                             
         if deallocate:
             self.updated_bw += bw
             return
         
         if self.item['job_id'] in self.bids:                
-            for i, b_id in enumerate(self.bids[self.item['job_id']]['auction_id']):
-                if b_id == self.id:
-                    for j in range(len(self.item["NN_data_size"][i])):
-                        if i == j:
-                            continue
-                        
-                        if self.item["NN_data_size"][i][j] != 0 and self.bids[self.item['job_id']]['auction_id'][j] != self.id:
-                            bw -= self.item["NN_data_size"][i][j]
-                
+            auction_id = self.bid_table.auction_id_of(self.item['job_id'])
+            bw -= self.item["NN_data_size"].cut_bandwidth(auction_id == self.id)
             
         self.updated_bw += bw
                 
@@ -436,7 +339,7 @@ class node:
             avail_bw = None
         else:
             avail_bw = self.available_bw_per_task[self.item['job_id']]
-        tmp_bid = copy.deepcopy(self.bids[self.item['job_id']])
+        tmp_bid = self.bid_table.snapshot(self.item['job_id'])
         gpu_=0
         cpu_=0
         first = False
@@ -448,7 +351,7 @@ class node:
         bid_ids_fail = []
         bid_round = 0
         i = 0
-        bid_time = datetime.now()
+        bid_time = self.clock()
 
         if self.item['job_id'] in self.bids:                  
             while i < NN_len:
@@ -463,7 +366,7 @@ class node:
                     self.available_gpu_per_task[self.item['job_id']].append(min(self.available_gpu_per_task[self.item['job_id']][bid_round-1], self.updated_gpu))
 
                 res_cpu, res_gpu, res_bw = self.get_reserved_resources(self.item['job_id'], i)
-                NN_data_size = self.item['NN_data_size'][i]
+                NN_data_size = self.item['NN_data_size'].layer_bw[i]
                 
                 if i == 0:
                     if self.use_net_topology:
@@ -472,21 +375,22 @@ class node:
                     first_index = i
                 else:
                     if self.use_net_topology and not bw_with_client and not first:
-                        if tmp_bid['auction_id'][i-1] not in self.bw_with_nodes[self.item['job_id']]:                            
-                            self.bw_with_nodes[self.item['job_id']][tmp_bid['auction_id'][i-1]] = self.network_topology.get_available_bandwidth_between_nodes(self.id, tmp_bid['auction_id'][i-1])
-                        previous_winner_id = tmp_bid['auction_id'][i-1]
-                        avail_bw = self.bw_with_nodes[self.item['job_id']][tmp_bid['auction_id'][i-1]]
+                        previous_winner_id = to_node_id(tmp_bid['auction_id'][i-1])
+                        # a single query returns the bandwidth towards every node
+                        if self.bw_with_nodes[self.item['job_id']] is None:
+                            self.bw_with_nodes[self.item['job_id']] = self.network_topology.get_available_bandwidth_from_node(self.id)
+                        avail_bw = self.bw_with_nodes[self.item['job_id']][previous_winner_id]
                         res_bw = 0
                     first = True
                 
                 if  self.item['NN_gpu'][i] <= self.updated_gpu - gpu_ + res_gpu and \
                     self.item['NN_cpu'][i] <= self.updated_cpu - cpu_ + res_cpu and \
                     NN_data_size <= avail_bw + res_bw and \
-                    tmp_bid['auction_id'].count(self.id)<self.item["N_layer_max"] and \
+                    np.count_nonzero(tmp_bid['auction_id'] == self.id)<self.item["N_layer_max"] and \
                     (self.item['N_layer_bundle'] is None or (self.item['N_layer_bundle'] is not None and layers < self.item['N_layer_bundle'])) :
 
-                    if tmp_bid['auction_id'].count(self.id) == 0 or \
-                        (tmp_bid['auction_id'].count(self.id) != 0 and i != 0 and tmp_bid['auction_id'][i-1] == self.id):
+                    if np.count_nonzero(tmp_bid['auction_id'] == self.id) == 0 or \
+                        (np.count_nonzero(tmp_bid['auction_id'] == self.id) != 0 and i != 0 and tmp_bid['auction_id'][i-1] == self.id):
                         
                         bid = self.utility_function(avail_bw, self.available_cpu_per_task[self.item['job_id']][bid_round], self.available_gpu_per_task[self.item['job_id']][bid_round])
 
@@ -497,9 +401,6 @@ class node:
                             bid_on_layer = True
 
                             tmp_bid['bid'][i] = bid
-                            tmp_bid['bid_gpu'][i] = self.updated_gpu
-                            tmp_bid['bid_cpu'][i] = self.updated_cpu
-                            tmp_bid['bid_bw'][i] = avail_bw
                                 
                             gpu_ += self.item['NN_gpu'][i]
                             cpu_ += self.item['NN_cpu'][i]
@@ -536,18 +437,18 @@ class node:
                         first = False
 
             if self.id in tmp_bid['auction_id'] and \
-                (first_index is None or avail_bw - self.item['NN_data_size'][first_index] >= 0) and \
-                tmp_bid['auction_id'].count(self.id)>=self.item["N_layer_min"] and \
-                tmp_bid['auction_id'].count(self.id)<=self.item["N_layer_max"] and \
+                (first_index is None or avail_bw - self.item['NN_data_size'].layer_bw[first_index] >= 0) and \
+                np.count_nonzero(tmp_bid['auction_id'] == self.id)>=self.item["N_layer_min"] and \
+                np.count_nonzero(tmp_bid['auction_id'] == self.id)<=self.item["N_layer_max"] and \
                 self.integrity_check(tmp_bid['auction_id'], 'bid') and \
                 (self.item['N_layer_bundle'] is None or (self.item['N_layer_bundle'] is not None and layers == self.item['N_layer_bundle'])):
 
                 # logging.log(TRACE, "BID NODEID:" + str(self.id) + ", auction: " + str(tmp_bid['auction_id']))
                 success = False
                 if self.use_net_topology:
-                    if bw_with_client and self.network_topology.consume_bandwidth_node_and_client(self.id, self.item['NN_data_size'][0], self.item['job_id']):
+                    if bw_with_client and self.network_topology.consume_bandwidth_node_and_client(self.id, self.item['NN_data_size'].layer_bw[0], self.item['job_id']):
                         success = True
-                    elif not bw_with_client and self.network_topology.consume_bandwidth_between_nodes(self.id, previous_winner_id, self.item['NN_data_size'][0], self.item['job_id']):
+                    elif not bw_with_client and self.network_topology.consume_bandwidth_between_nodes(self.id, previous_winner_id, self.item['NN_data_size'].layer_bw[0], self.item['job_id']):
                         success = True
                 else:
                     success = True
@@ -555,12 +456,12 @@ class node:
                 if success:
                     if self.enable_logging:
                         self.print_node_state(f"Bid succesful {tmp_bid['auction_id']}")
-                    first_index = tmp_bid['auction_id'].index(self.id)
+                    first_index = int(np.argmax(tmp_bid['auction_id'] == self.id))
                     if not self.use_net_topology:
-                        self.updated_bw -= self.item['NN_data_size'][first_index] 
-                        # self.available_bw_per_task[self.item['job_id']] -= self.item['NN_data_size'][first_index] 
+                        self.updated_bw -= self.item['NN_data_size'].layer_bw[first_index] 
+                        # self.available_bw_per_task[self.item['job_id']] -= self.item['NN_data_size'].layer_bw[first_index] 
 
-                    self.bids[self.item['job_id']] = copy.deepcopy(tmp_bid)
+                    self.bid_table.restore(self.item['job_id'], tmp_bid)
 
                     for i in bid_ids_fail:
                         self.release_reserved_resources(self.item["job_id"], i)
@@ -582,7 +483,7 @@ class node:
                     
                     if self.use_net_topology:
                         with self.__layer_bid_lock:
-                            self.__layer_bid[self.item["job_id"]] = sum(1 for i in self.bids[self.item['job_id']]["auction_id"] if i != float('-inf'))
+                            self.__layer_bid[self.item["job_id"]] = self.bid_table.count_assigned(self.item['job_id'])
                             
                     return True
                 else:
@@ -596,13 +497,6 @@ class node:
             return False
 
 
-    def lost_bid(self, index, z_kj, tmp_local, tmp_gpu, tmp_cpu, tmp_bw):        
-        tmp_gpu +=  self.item['NN_gpu'][index]
-        tmp_cpu +=  self.item['NN_cpu'][index]
-        tmp_bw += self.item['NN_data_size'][index]
-        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-        return index, tmp_gpu, tmp_cpu, tmp_bw
-    
     def deconfliction(self):
         rebroadcast = False
         k = self.item['edge_id'] # sender
@@ -612,12 +506,9 @@ class node:
         previous_winner_id = float('-inf')
         job_id = self.item["job_id"]
         
-        tmp_local = copy.deepcopy(self.bids[self.item['job_id']])
-        prev_bet = copy.deepcopy(self.bids[self.item['job_id']])
-        index = 0
-        reset_flag = False
-        reset_ids = []
-        bid_time = datetime.now()
+        tmp_local = self.bid_table.snapshot(self.item['job_id'])
+        prev_bet = self.bid_table.snapshot(self.item['job_id'])
+        bid_time = self.clock()
         
         if self.use_net_topology:
             initial_count = 0
@@ -625,332 +516,49 @@ class node:
                 if j != float('-inf'):
                     initial_count += 1
 
-        while index < self.item["N_layer"]:
-            
-            z_kj = self.item['auction_id'][index]
-            z_ij = tmp_local['auction_id'][index]
-            y_kj = self.item['bid'][index]
-            y_ij = tmp_local['bid'][index]
-            t_kj = self.item['timestamp'][index]
-            t_ij = tmp_local['timestamp'][index]
-
-            if self.enable_logging:
-                logger_method = getattr(logging, 'debug')
-                logger_method('DECONFLICTION - NODEID(i):' + str(i) +
-                            ' sender(k):' + str(k) +
-                            ' z_kj:' + str(z_kj) +
-                            ' z_ij:' + str(z_ij) +
-                            ' y_kj:' + str(y_kj) +
-                            ' y_ij:' + str(y_ij) +
-                            ' t_kj:' + str(t_kj) +
-                            ' t_ij:' + str(t_ij)
-                            )
-            # chi mi manda il messaggio è il vincitore
-            if z_kj==k : 
-                # io penso di essere il vincitore
-                if z_ij==i:
-                    if (y_kj>y_ij): 
-                        rebroadcast = True
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #1')
-                        if index == 0:
-                            release_to_client = True
-                        elif previous_winner_id == float('-inf'):
-                            previous_winner_id = prev_bet['auction_id'][index-1]
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-
-                    elif (y_kj==y_ij and z_kj<z_ij):
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #3')
-                        rebroadcast = True
-                        if index == 0:
-                            release_to_client = True
-                        elif previous_winner_id == float('-inf'):
-                            previous_winner_id = prev_bet['auction_id'][index-1]
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-
-                    else:# (y_kj<y_ij):
-                        rebroadcast = True
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #2')
-                        index = self.update_local_val(tmp_local, index, z_ij, tmp_local['bid'][index], bid_time, self.item)
-                    
-                    # else:
-                    #     if self.enable_logging:
-                    #         logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #3else')
-                    #     index+=1
-                    #     rebroadcast = True
-
-                elif z_ij==k:
-                    if t_kj>t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#4')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                        rebroadcast = True 
-                    else:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #5 - 6')
-                        index+=1
-                
-                elif z_ij == float('-inf'):
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #12')
-                    index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                    rebroadcast = True
-
-                elif z_ij!=i and z_ij!=k:
-                    if y_kj>y_ij and t_kj>=t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #7')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                        rebroadcast = True
-                    elif y_kj<y_ij and t_kj<=t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #8')
-                        index += 1
-                        rebroadcast = True
-                    elif y_kj==y_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #9')
-                        rebroadcast = True
-                        index+=1
-                    # elif y_kj==y_ij and z_kj<z_ij:
-                        # if self.enable_logging:
-                            # logging.log(TRACE, 'NODEID:'+str(self.id) +  '#9-new')
-                        # index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])                  
-                        # rebroadcast = True
-                    elif y_kj<y_ij and t_kj>t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #10reset')
-                        # index, reset_flag = self.reset(index, tmp_local)
-                        index += 1
-                        rebroadcast = True
-                    elif y_kj>y_ij and t_kj<t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #11rest')
-                        # index, reset_flag = self.reset(index, tmp_local)
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                        rebroadcast = True  
-                    else:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #11else')
-                        index += 1  
-                        rebroadcast = True  
-                
-                else:
-                    index += 1   
-                    if self.enable_logging:
-                        logging.log(TRACE, "eccoci")    
-            
-            # chi mi manda il messaggio dice che vinco io
-            elif z_kj==i:                                
-                if z_ij==i:
-                    if t_kj>t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #13Flavio')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                        rebroadcast = True 
-                        
-                    else:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #13elseFlavio')
-                        index+=1
-                        rebroadcast = True
+        auction_id, bid, timestamp, rebroadcast_mask, reset_mask, outbid_mask = deconflict(
+            i, k,
+            self.item['auction_id'], self.item['bid'], self.item['timestamp'],
+            tmp_local['auction_id'], tmp_local['bid'], tmp_local['timestamp'],
+            bid_time)
 
-                elif z_ij==k:
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #14reset')
-                    reset_ids.append(index)
-                    # index = self.reset(index, self.bids[self.item['job_id']])
-                    index += 1
-                    reset_flag = True
-                    rebroadcast = True                        
-
-                elif z_ij == float('-inf'):
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #16')
-                    rebroadcast = True
-                    index+=1
-                
-                elif z_ij!=i and z_ij!=k:
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #15')
-                    rebroadcast = True
-                    index+=1
-                
-                else:
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #15else')
-                    rebroadcast = True
-                    index+=1                
-            
-            # chi mi manda il messaggio non mette un vincitore
-            elif z_kj == float('-inf'):
-                if z_ij==i:
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #31')
-                    rebroadcast = True
-                    index+=1
-                    
-                elif z_ij==k:
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #32')
-                    index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                    rebroadcast = True
-                    
-                elif z_ij == float('-inf'):
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #34')
-                    index+=1
-                    
-                elif z_ij!=i and z_ij!=k:
-                    if t_kj>t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #33')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                        rebroadcast = True
-                    else: 
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #33else')
-                        index+=1
-                    
-                else:
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #33elseelse')
-                    index+=1
-                    rebroadcast = True
-
-            # chi manda il messaggio dice che non vinco nè io nè lui
-            elif z_kj!=i and z_kj!=k:   
-                                    
-                if z_ij==i:
-                    if (y_kj>y_ij):
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#17')
-                        rebroadcast = True
-                        if index == 0:
-                            release_to_client = True
-                        elif previous_winner_id == float('-inf'):
-                            previous_winner_id = prev_bet['auction_id'][index-1]
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                    elif (y_kj==y_ij and z_kj<z_ij):
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#17')
-                        rebroadcast = True
-                        if index == 0:
-                            release_to_client = True
-                        elif previous_winner_id == float('-inf'):
-                            previous_winner_id = prev_bet['auction_id'][index-1]
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                    else:# (y_kj<y_ij):
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#19')
-                        rebroadcast = True
-                        index = self.update_local_val(tmp_local, index, z_ij, tmp_local['bid'][index], bid_time, self.item)
-                    # else:
-                    #     if self.enable_logging:
-                    #         logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #19else')
-                    #     index+=1
-                    #     rebroadcast = True
-
-                # io penso che vinca lui
-                elif z_ij==k:
-                    if y_kj>y_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #20Flavio')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                        rebroadcast = True 
-                    # elif (y_kj==y_ij and z_kj<z_ij):
-                    #     if self.enable_logging:
-                    #         logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #3stefano')
-                    #     rebroadcast = True
-                    #     index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                    elif t_kj>=t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#20')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                        rebroadcast = True
-                    elif t_kj<t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#21reset')
-                        # index, reset_flag = self.reset(index, tmp_local)
-                        index += 1
-                        rebroadcast = True
-
-                elif z_ij == z_kj:
-                
-                    if t_kj>t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#22')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                    else:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #23 - 24')
-                        index+=1
-                
-                elif z_ij == float('-inf'):
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  '#30')
-                    index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])
-                    rebroadcast = True
-
-                elif z_ij!=i and z_ij!=k and z_ij!=z_kj:
-                    if y_kj>=y_ij and t_kj>=t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#25')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])                   
-                        rebroadcast = True
-                    elif y_kj<y_ij and t_kj<=t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#26')
-                        rebroadcast = True
-                        index+=1
-                    # elif y_kj==y_ij:# and z_kj<z_ij:
-                    #     if self.enable_logging:
-                    #         logging.log(TRACE, 'NODEID:'+str(self.id) +  '#27')
-                    #     index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])                   
-                    #     rebroadcast = True
-                    # elif y_kj==y_ij:
-                    #     if self.enable_logging:
-                    #         logging.log(TRACE, 'NODEID:'+str(self.id) +  '#27bis')
-                    #     index+=1
-                    #     rebroadcast = True
-                    elif y_kj<y_ij and t_kj>t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#28')
-                        index = self.update_local_val(tmp_local, index, z_kj, y_kj, t_kj, self.bids[self.item['job_id']])                   
-                        rebroadcast = True
-                    elif y_kj>y_ij and t_kj<t_ij:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#29')
-                        # index, reset_flag = self.reset(index, tmp_local)
-                        index += 1
-                        rebroadcast = True
-                    else:
-                        if self.enable_logging:
-                            logging.log(TRACE, 'NODEID:'+str(self.id) +  '#29else')
-                        index+=1
-                        rebroadcast = True
-                
-                else:
-                    if self.enable_logging:
-                        logging.log(TRACE, 'NODEID:'+str(self.id) +  ' #29else2')
-                    index+=1
-            
-            else:
-                if self.enable_logging:
-                    self.print_node_state('smth wrong?', type='error')
+        if self.enable_logging:
+            logging.debug('DECONFLICTION - NODEID(i):' + str(i) +
+                        ' sender(k):' + str(k) +
+                        ' z_kj:' + str(self.item['auction_id']) +
+                        ' z_ij:' + str(tmp_local['auction_id']) +
+                        ' y_kj:' + str(self.item['bid']) +
+                        ' y_ij:' + str(tmp_local['bid']) +
+                        ' t_kj:' + str(self.item['timestamp']) +
+                        ' t_ij:' + str(tmp_local['timestamp'])
+                        )
+
+        rebroadcast = bool(rebroadcast_mask.any())
+        reset_flag = bool(reset_mask.any())
+        reset_ids = np.flatnonzero(reset_mask)
+
+        # when the node has been outbid on a layer, it has to release the bandwidth it reserved
+        # towards the client (first layer) or towards the winner of the previous layer
+        release_to_client = bool(outbid_mask[0])
+        for index in np.flatnonzero(outbid_mask[1:]):
+            previous_winner_id = to_node_id(prev_bet['auction_id'][index])
+            if previous_winner_id != float('-inf'):
+                break
+
+        tmp_local['auction_id'] = auction_id
+        tmp_local['bid'] = bid
+        tmp_local['timestamp'] = timestamp
 
         if reset_flag:
-            msg_to_resend = copy.deepcopy(tmp_local)
+            msg_to_resend = BidTable.copy_snapshot(tmp_local)
             #self.forward_to_neighbohors(tmp_local)
             for i in reset_ids:
-                _ = self.reset(i, tmp_local, bid_time - timedelta(hours=1))
+                _ = self.reset(i, tmp_local, bid_time - ONE_HOUR)
                 msg_to_resend['auction_id'][i] = self.item['auction_id'][i]
                 msg_to_resend['bid'][i] = self.item['bid'][i]
                 msg_to_resend['timestamp'][i] = self.item['timestamp'][i]
                 
-            self.bids[self.item['job_id']] = copy.deepcopy(tmp_local)
+            self.bid_table.restore(self.item['job_id'], tmp_local)
             self.forward_to_neighbohors(msg_to_resend)
             return False, False             
 
@@ -991,11 +599,11 @@ class node:
         # else:
         #     self.updated_bw += bw
 
-        self.bids[self.item['job_id']] = copy.deepcopy(tmp_local)
+        self.bid_table.restore(self.item['job_id'], tmp_local)
         
         if self.use_net_topology:
             with self.__layer_bid_lock:
-                self.__layer_bid[self.item["job_id"]] = sum(1 for i in self.bids[self.item['job_id']]["auction_id"] if i != float('-inf'))
+                self.__layer_bid[self.item["job_id"]] = self.bid_table.count_assigned(self.item['job_id'])
 
         return rebroadcast, False 
 
@@ -1057,12 +665,10 @@ class node:
         if self.item['job_id'] in self.bids:
         
             # Consensus check
-            if  self.bids[self.item['job_id']]['auction_id']==self.item['auction_id'] and \
-                self.bids[self.item['job_id']]['bid'] == self.item['bid'] and \
-                self.bids[self.item['job_id']]['timestamp'] == self.item['timestamp']:
+            if  self.bid_table.equals(self.item['job_id'], self.item):
                     
-                    if float('-inf') in self.bids[self.item['job_id']]['auction_id']:
-                        if self.id not in self.bids[self.item['job_id']]['auction_id']: 
+                    if float('-inf') in self.bid_table.auction_id_of(self.item['job_id']):
+                        if self.id not in self.bid_table.auction_id_of(self.item['job_id']): 
                             self.bid_energy()
                         else:
                             self.forward_to_neighbohors()
@@ -1079,12 +685,12 @@ class node:
 
                 success = False
 
-                if not integrity_fail and self.id not in self.bids[self.item['job_id']]['auction_id']:
+                if not integrity_fail and self.id not in self.bid_table.auction_id_of(self.item['job_id']):
                     success = self.bid_energy()
                     
                 if not success and rebroadcast:
                     self.forward_to_neighbohors()
-                elif float('-inf') in self.bids[self.item['job_id']]['auction_id']:
+                elif float('-inf') in self.bid_table.auction_id_of(self.item['job_id']):
                     self.forward_to_neighbohors()
 
 
@@ -1101,7 +707,7 @@ class node:
             if self.integrity_check(self.item['auction_id'], 'new msg'):
                 self.update_bid()
             else:
-                print('new_msg' + str(self.item) + '\n' + str(self.bids[self.item['job_id']]))
+                print('new_msg' + str(self.item) + '\n' + str(self.bid_table.auction_id_of(self.item['job_id'])))
         else:
             if self.enable_logging:
                 self.print_node_state('Value not in dict (new_msg)', type='error')
@@ -1140,28 +746,75 @@ class node:
             
     def progress_bid_rounds(self, item): 
         prev_n_bet = 0    
-        item['edge_id'] = float('-inf')
-        item['auction_id'] = [float('-inf') for _ in range(len(item["NN_gpu"]))]
-        item['bid'] = [float('-inf') for _ in range(len(item["NN_gpu"]))]
-        item['timestamp'] = [datetime.now() - timedelta(days=1) for _ in range(len(item["NN_gpu"]))]
+        self.prepare_bid_rounds_item(item)
         
         while True:
-            time.sleep(12)
-            with self.__layer_bid_lock:
-                if self.__layer_bid[item["job_id"]] == prev_n_bet:
-                    break
-                
-                prev_n_bet = self.__layer_bid[item["job_id"]]
+            # wait for the messages of the current round to be processed by all the nodes
+            self.termination.wait_in_flight(0)
+            prev_n_bet = self.progress_bid_round(item, prev_n_bet)
+            if prev_n_bet is None:
+                break
+        
+        # the bidding round can't be over while this thread is running
+        self.termination.unhold()
                 
-                if self.__layer_bid[item["job_id"]] < len(item["NN_gpu"]):
-                    self.__layer_bid_events[item["job_id"]] += 1
-                    self.q[self.id].put(item)
-                    # print(f"Push {job_id} node {self.id}")
-                else:
-                    break
+    def prepare_bid_rounds_item(self, item):
+        item['edge_id'] = float('-inf')
+        item['auction_id'] = np.full(len(item["NN_gpu"]), -np.inf)
+        item['bid'] = np.full(len(item["NN_gpu"]), -np.inf)
+        item['timestamp'] = np.full(len(item["NN_gpu"]), self.clock() - ONE_DAY)
+
+    def progress_bid_round(self, item, prev_n_bet):
+        """
+        Starts a new bidding round for the job in `item` if the previous round assigned new layers
+        and some layers are still unassigned.
+
+        Returns:
+            int: the number of layers assigned so far, or None if no more rounds are required.
+        """
+        with self.__layer_bid_lock:
+            if self.__layer_bid[item["job_id"]] == prev_n_bet:
+                return None
+            
+            prev_n_bet = self.__layer_bid[item["job_id"]]
+            
+            if self.__layer_bid[item["job_id"]] < len(item["NN_gpu"]):
+                self.__layer_bid_events[item["job_id"]] += 1
+                self.q[self.id].put(item)
+                # print(f"Push {job_id} node {self.id}")
+                return prev_n_bet
+            
+            return None
+            
+    def start_bid_rounds(self, item):
+        if self.threaded_bid_rounds:
+            self.termination.hold()
+            threading.Thread(target=self.progress_bid_rounds, args=(item,)).start()
+        else:
+            self.prepare_bid_rounds_item(item)
+            self.pending_bid_rounds[item["job_id"]] = (item, 0)
+            
+    def step_bid_rounds(self):
+        """
+        Progresses the pending bidding rounds by one step. Used by the discrete-event engine 
+        when all the messages have been processed, in place of the progress_bid_rounds thread.
+
+        Returns:
+            bool: True if at least one new bidding round has been started.
+        """
+        progressed = False
+        for job_id in list(self.pending_bid_rounds):
+            item, prev_n_bet = self.pending_bid_rounds[job_id]
+            prev_n_bet = self.progress_bid_round(item, prev_n_bet)
+            if prev_n_bet is None:
+                del self.pending_bid_rounds[job_id]
+            else:
+                self.pending_bid_rounds[job_id] = (item, prev_n_bet)
+                progressed = True
+        return progressed
 
     def check_if_hosting_job(self):
-        if self.id in self.bids[self.item['job_id']]['auction_id']:
+        if self.id in self.bid_table.auction_id_of(self.item['job_id']):
             return True
         return False
     
@@ -1169,7 +822,7 @@ class node:
         cpu = 0
         gpu = 0
         
-        for i, id in enumerate(self.bids[self.item['job_id']]['auction_id']):
+        for i, id in enumerate(self.bid_table.auction_id_of(self.item['job_id'])):
             if id == self.id:
                 cpu += self.item['NN_cpu'][i]
                 gpu += self.item['NN_gpu'][i]
@@ -1177,151 +830,213 @@ class node:
         self.updated_cpu += cpu
         self.updated_gpu += gpu
 
-    def work(self, end_processing, notify_start, progress_bid, ret_val):
-        notify_start.set()
-        if self.use_net_topology:
-            timeout = 15
+    def get_job_state(self, job_id):
+        """
+        Returns the JobState of a job, or None if the job is not known by the node.
+        """
+        if job_id in self.job_summaries:
+            return JobState.EVICTED
+        return self.job_state.get(job_id)
+    
+    def evict_job(self, job_id, completed=True):
+        """
+        Drops all the state kept for a job, compacting its bookkeeping information in a JobSummary,
+        so that the memory of the node (and the size of its reports) is bounded by the jobs still
+        active. A job is evicted when its completion is notified, or when it's released before the
+        nodes agree on its allocation (`completed=False`): such a job is submitted again later, and
+        its summary is dropped when the client message is received. All the nodes evict a job at 
+        the same time, so the delta encoding of the messages stays consistent.
+        """
+        bids = self.bids.pop(job_id, None)
+        allocation = ()
+        if job_id in self.bid_table:
+            allocation = tuple(to_node_id(a) for a in self.bid_table.auction_id_of(job_id))
+            self.bid_table.remove(job_id)
+        if bids is not None:
+            self.job_summaries[job_id] = JobSummary(allocation, bids['count'], bids['consensus_count'], bids['forward_count'], 
+                                                    bids['deconflictions'], bids['arrival_time'], bids['complete_timestamp'], completed)
         else:
-            timeout = 0.2
+            self.job_summaries[job_id] = JobSummary(allocation, 0, 0, 0, 0, None, None, completed)
+        
+        for d in (self.counter, self.job_state, self.last_sent_msg, self.layer_bid_already, self.available_cpu_per_task, 
+                  self.available_gpu_per_task, self.available_bw_per_task, self.resource_remind, self.pending_bid_rounds):
+            d.pop(job_id, None)
+        if self.use_net_topology:
+            self.bw_with_nodes.pop(job_id, None)
+            self.bw_with_client.pop(job_id, None)
+            with self.__layer_bid_lock:
+                self.__layer_bid.pop(job_id, None)
+                self.__layer_bid_events.pop(job_id, None)
+        self.message_decoder.forget(job_id)
+        
+    def report_state(self, ret_val):
+        if self.shared_state is not None:
+            self.shared_state.publish(self)
+            return
         
         ret_val["id"] = self.id
-        ret_val["bids"] = copy.deepcopy(self.bids)
-        ret_val["counter"] = self.counter
+        ret_val["bids"] = self.bid_table.copy() if self.snapshot_reports else self.bid_table
+        ret_val["counter"] = copy.deepcopy(self.counter) if self.snapshot_reports else self.counter
         ret_val["updated_cpu"] = self.updated_cpu
         ret_val["updated_gpu"] = self.updated_gpu
         ret_val["updated_bw"] = self.updated_bw
         ret_val["gpu_type"] = self.gpu_type.name
         # ret_val["cpu_consumption"] = self.performance.compute_current_power_consumption_cpu(self.initial_cpu-self.updated_cpu)
 
-        self.already_finished = True
+    def handle_message(self, item, ret_val):
+        """
+        Processes a message received from the client or from a neighbor node.
+
+        Args:
+            item (dict): the received message.
+            ret_val (dict): the dictionary where the node state is reported.
+        """
+        self.item = item
         
-        while True:
-            try: 
-                self.item = self.q[self.id].get(timeout=timeout)
-                # if "auction_id" in self.item:
-                #     print(self.item["auction_id"])
-                               
-                with self.last_bid_timestamp_lock:
-                    self.empty_queue[self.id].clear() 
-                    self.already_finished = False
-                    
-                    # if the message is a "unallocate" message, the node must release the resources
-                    # if the node is hosting the job
-                    if "unallocate" in self.item:
-                        if self.check_if_hosting_job():
-                            self.release_resources()
-                        
-                        p_bid = copy.deepcopy(self.bids[self.item['job_id']]["auction_id"])
-                        
-                        # if the bidding process didn't complete, reset the bid (it will be submitted later)
-                        if float('-inf') in self.bids[self.item['job_id']]['auction_id']:
-                            del self.bids[self.item['job_id']]
-                            del self.counter[self.item['job_id']]
-                        
-                        self.update_bw(prev_bid=p_bid, deallocate=True)
-                            
-                        ret_val["id"] = self.id
-                        ret_val["bids"] = copy.deepcopy(self.bids)
-                        ret_val["counter"] = copy.deepcopy(self.counter)
-                        ret_val["updated_cpu"] = self.updated_cpu
-                        ret_val["updated_gpu"] = self.updated_gpu
-                        ret_val["updated_bw"] = self.updated_bw
-                        ret_val["gpu_type"] = self.gpu_type.name
-                    else:   
-                        flag = False
-                        prev_bid = None
-                        if self.item['job_id'] in self.bids:
-                            prev_bid = copy.deepcopy(self.bids[self.item['job_id']]["auction_id"])
-                        
-                        if self.item['job_id'] not in self.counter:
-                            self.counter[self.item['job_id']] = 0
-                        self.counter[self.item['job_id']] += 1    
-                        
-                        # new request from client
-                        if self.item['edge_id'] is None:
-                            flag = True
+        # if the message is a "unallocate" message, the node must release the resources
+        # if the node is hosting the job
+        if "unallocate" in self.item:
+            if self.check_if_hosting_job():
+                self.release_resources()
+            
+            p_bid = self.bid_table.auction_id_of(self.item['job_id']).copy()
+            self.update_bw(prev_bid=p_bid, deallocate=True)
+            
+            # either the job has been executed, or the nodes didn't agree on its allocation and 
+            # the bidding process starts from scratch when it's submitted again
+            self.evict_job(self.item['job_id'], completed="completed" in self.item)
+                
+            self.report_state(ret_val)
+        else:   
+            summary = self.job_summaries.get(self.item['job_id'])
+            if self.item['edge_id'] is not None and summary is not None and summary.completed:
+                # late message for a job already executed
+                self.q[self.id].task_done()
+                return
+            
+            if self.item['edge_id'] is None:
+                # the job is submitted again
+                self.job_summaries.pop(self.item['job_id'], None)
+                self.message_decoder.register(self.item)
+            else:
+                self.item = self.message_decoder.decode(self.item)
+                if self.item is None:
+                    # the job description has not been received from the client yet,
+                    # the message is marked as done once it is replayed
+                    return
+            
+            flag = False
+            prev_bid = None
+            if self.item['job_id'] in self.bids:
+                prev_bid = self.bid_table.auction_id_of(self.item['job_id']).copy()
+            
+            if self.job_state.get(self.item['job_id']) == JobState.CONVERGED:
+                self.job_state[self.item['job_id']] = JobState.ACTIVE
+            
+            if self.item['job_id'] not in self.counter:
+                self.counter[self.item['job_id']] = 0
+            self.counter[self.item['job_id']] += 1    
+            
+            # new request from client
+            if self.item['edge_id'] is None:
+                flag = True
 
-                        if self.item['job_id'] not in self.bids:
-                            if self.enable_logging:
-                                self.print_node_state('IF1 q:' + str(self.q[self.id].qsize()))
+            if self.item['job_id'] not in self.bids:
+                if self.enable_logging:
+                    self.print_node_state('IF1 q:' + str(self.q[self.id].qsize()))
 
-                            self.init_null()
-                            if self.use_net_topology:    
-                                with self.__layer_bid_lock:
-                                    self.__layer_bid[self.item["job_id"]] = 0
+                self.init_null()
+                if self.use_net_topology:    
+                    with self.__layer_bid_lock:
+                        self.__layer_bid[self.item["job_id"]] = 0
 
-                                    self.__layer_bid_events[self.item["job_id"]] = 1
-                            
-                                threading.Thread(target=self.progress_bid_rounds, args=(copy.deepcopy(self.item),)).start()
-                                
-                            self.bid_energy(flag)
-
-                        if not flag:
-                            if self.enable_logging:
-                                self.print_node_state('IF2 q:' + str(self.q[self.id].qsize()))
-                            # if not self.bids[self.item['job_id']]['complete'] and \
-                            #    not self.bids[self.item['job_id']]['clock'] :
-                            if self.id not in self.item['auction_id']:
-                                self.bid_energy(False)
-
-                            self.update_bid()
-                            # else:
-                            #     print('kitemmuorten!')
-                        
-                        if self.progress_flag:
-                            if 'rebid' in self.item:
-                                self.bids[self.item['job_id']]['arrival_time'] = datetime.now()
+                        self.__layer_bid_events[self.item["job_id"]] = 1
+                
+                    self.start_bid_rounds(copy.deepcopy(self.item))
+                    
+                self.bid_energy(flag)
 
-                            self.progress_time()
+            if not flag:
+                if self.enable_logging:
+                    self.print_node_state('IF2 q:' + str(self.q[self.id].qsize()))
+                # if not self.bids[self.item['job_id']]['complete'] and \
+                #    not self.bids[self.item['job_id']]['clock'] :
+                if self.id not in self.item['auction_id']:
+                    self.bid_energy(False)
 
-                        self.bids[self.item['job_id']]['start_time'] = 0                            
-                        self.bids[self.item['job_id']]['count'] += 1
-                        
-                        self.update_bw(prev_bid)
-                        
-                        self.q[self.id].task_done()
-                    
-            except Empty:
-                # the exception is raised if the timeout in the queue.get() expires.
-                # the break statement must be executed only if the event has been set 
-                # by the main thread (i.e., no more task will be submitted)
+                self.update_bid()
+                # else:
+                #     print('kitemmuorten!')
+            
+            if self.progress_flag:
+                if 'rebid' in self.item:
+                    self.bids[self.item['job_id']]['arrival_time'] = self.clock()
 
-                self.empty_queue[self.id].set()
-                
-                all_finished = True
-                for _, e in enumerate(self.empty_queue):
-                    if not e.is_set():
-                        all_finished = False
-                        break
-                        # print(f"Waiting for node {id} to finish")
-                        
-                if all_finished and not self.already_finished: 
-                    
-                    self.already_finished = True   
-                    
-                    ret_val["id"] = self.id
-                    ret_val["bids"] = copy.deepcopy(self.bids)
-                    ret_val["counter"] = copy.deepcopy(self.counter)
-                    ret_val["updated_cpu"] = self.updated_cpu
-                    ret_val["updated_gpu"] = self.updated_gpu
-                    ret_val["updated_bw"] = self.updated_bw
-                    ret_val["gpu_type"] = self.gpu_type.name
-                        
-                    for j_key in self.resource_remind:
-                        for id in self.resource_remind[j_key]["idx"]:
-                            self.release_reserved_resources(j_key, id)
-                        
-                    with self.last_bid_timestamp_lock:
-                        if self.use_net_topology:
-                            self.updated_bw = self.network_topology.get_node_direct_link_bw(self.id)
-                        
-                    # notify the main process that the bidding process has completed and the result has been saved in the ret_val dictionary    
-                    progress_bid.set()
+                self.progress_time()
 
+            self.bids[self.item['job_id']]['start_time'] = 0                            
+            self.bids[self.item['job_id']]['count'] += 1
+            
+            self.update_bw(prev_bid)
+            
+            self.q[self.id].task_done()
+            
+            if flag:
+                for msg in self.message_decoder.pop_pending(self.item['job_id']):
+                    self.handle_message(msg, ret_val)
+            
+    def end_bid_round(self, ret_val):
+        """
+        Reports the node state once all the nodes have processed their messages 
+        and releases the resources reserved during the bidding round.
+        """
+        self.report_state(ret_val)
+            
+        for j_key in self.resource_remind:
+            for id in self.resource_remind[j_key]["idx"]:
+                self.release_reserved_resources(j_key, id)
+        
+        for job_id, state in self.job_state.items():
+            if state == JobState.ACTIVE and job_id in self.bids and float('-inf') not in self.bid_table.auction_id_of(job_id):
+                self.job_state[job_id] = JobState.CONVERGED
+                self.bids[job_id]['complete'] = True
+                self.bids[job_id]['complete_timestamp'] = self.clock()
+            
+        with self.last_bid_timestamp_lock:
+            if self.use_net_topology:
+                self.updated_bw = self.network_topology.get_node_direct_link_bw(self.id)
+
+    def work(self, end_processing, notify_start, progress_bid, ret_val):
+        notify_start.set()
+        # the timeout is only used to check periodically whether the processing must be terminated.
+        # The end of a bidding round is notified by the termination detector
+        timeout = 1
+        
+        self.report_state(ret_val)
+        
+        while True:
+            try: 
+                item = self.q[self.id].get(timeout=timeout)
+            except Empty:
                 if end_processing.is_set():    
                     if int(self.updated_cpu) > int(self.initial_cpu):
                         print(f"Node {self.id} -- Mannaggia updated={self.updated_cpu} initial={self.initial_cpu}", flush=True)
-                    break               
+                    break
+                continue
+            
+            if "round_end" in item:
+                # all the messages have been processed by all the nodes
+                self.end_bid_round(ret_val)
+                    
+                # notify the main process that the bidding process has completed and the result has been saved in the ret_val dictionary    
+                progress_bid.set()
+                continue
+                           
+            with self.last_bid_timestamp_lock:
+                self.handle_message(item, ret_val)
+            
+            # the message is released only after the messages generated while processing it have been sent
+            self.termination.release()
 
       
       
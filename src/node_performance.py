@@ -1,7 +1,24 @@
 import random
 import math
+
+import numpy as np
+
 from src.config import NodeType
 
+def interpolate(table, usage):
+    """
+    Evaluates a table sampled at every integer usage at an array of usages, interpolating between
+    the samples (outside the table the first/last segment is extended).
+    """
+    usage = np.asarray(usage, dtype=float)
+    i = np.clip(np.floor(usage).astype(np.intp), 0, len(table) - 2)
+    return table[i] + (usage - i) * (table[i+1] - table[i])
+
+
+def is_scalar(usage):
+    return isinstance(usage, (int, float, np.number))
+
+
 class NodePerformance:
     def __init__(self, num_cpu_cores, num_gpu_compute_units, node_type, seed=0):
         self.cpu_power_model = None
@@ -49,21 +66,47 @@ class NodePerformance:
         self.gpu_power_model = self.default_gpu_power_model
         self.cpu_performance_model = self.default_cpu_performance_model
         self.gpu_performance_model = self.default_gpu_performance_model
+        
+        self.build_tables()
+        
+    def build_tables(self):
+        """
+        Samples the power and performance models at every integer usage, from 0 to the number of
+        (logical) cores. The models are then evaluated by linear interpolation on the tables, which
+        is exact for the default piecewise linear models (their breakpoints are integers). The
+        tables are used for arrays of usages only, a single usage is evaluated on the model. Must
+        be called again if a model is replaced.
+        """
+        cpu_usage = range(max(self.cpu_core_logical, 1) + 1)
+        gpu_usage = range(max(self.gpu_core, 1) + 1)
+        
+        self.cpu_power_table = np.array([self.cpu_power_model(u) for u in cpu_usage], dtype=float)
+        self.cpu_performance_table = np.array([self.cpu_performance_model(u) for u in cpu_usage], dtype=float)
+        self.gpu_power_table = np.array([self.gpu_power_model(u) for u in gpu_usage], dtype=float)
+        self.gpu_performance_table = np.array([self.gpu_performance_model(u) for u in gpu_usage], dtype=float)
 
     def compute_current_power_consumption_cpu(self, cpu_usage):
-        return self.cpu_power_model(cpu_usage)
+        if is_scalar(cpu_usage):
+            return self.cpu_power_model(cpu_usage)
+        return interpolate(self.cpu_power_table, cpu_usage)
     
     def compute_current_performance_cpu(self, cpu_usage):
-        return self.cpu_performance_model(cpu_usage)
+        if is_scalar(cpu_usage):
+            return self.cpu_performance_model(cpu_usage)
+        return interpolate(self.cpu_performance_table, cpu_usage)
     
     def compute_current_efficiency_cpu(self, cpu_usage):
         return self.compute_current_performance_cpu(cpu_usage) / self.compute_current_power_consumption_cpu(cpu_usage)  
     
     def compute_current_power_consumption_gpu(self, gpu_usage):
-        return self.gpu_power_model(gpu_usage)
+        if is_scalar(gpu_usage):
+            return self.gpu_power_model(gpu_usage)
+        return interpolate(self.gpu_power_table, gpu_usage)
     
     def compute_current_performance_gpu(self, gpu_usage):
-        return self.gpu_performance_model(gpu_usage)
+        if is_scalar(gpu_usage):
+            return self.gpu_performance_model(gpu_usage)
+        return interpolate(self.gpu_performance_table, gpu_usage)
     
     def compute_current_efficiency_gpu(self, gpu_usage):
         return self.compute_current_performance_gpu(gpu_usage) / self.compute_current_power_consumption_gpu(gpu_usage)
@@ -2,6 +2,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import os
 
+from src.metrics import load_metrics, node_metric
+
 def generate_plot_folder(dirname):
     # check if the plot directory exists, if not create it
     if not os.path.exists(dirname):
@@ -18,17 +20,15 @@ def plot_node_resource_usage_box(filename, res_type, n_nodes, dir_name):
         dir_name (str): The name of the directory to save the plot file in.
     """
     # plot node resource usage using data from filename
-    df = pd.read_csv(filename + ".csv")
-    
-    # select only the columns matching the pattern node_*_updated_gpu
-    df2 = df.filter(regex=("node.*"+res_type))
+    df, gpu_types = load_metrics(filename)
+    usage = node_metric(df, "used_" + res_type) / node_metric(df, "initial_" + res_type)
     
     d = {}
     for i in range(n_nodes):
-        gpu_type = df['node_'+str(i)+'_gpu_type'].iloc[1]
+        gpu_type = gpu_types[i]
         if gpu_type not in d:
-            d[str(gpu_type)] = []
-        d[str(gpu_type)] += list(df2["node_" + str(i) + "_used_" + res_type] / df2["node_" + str(i) + "_initial_" + res_type])
+            d[gpu_type] = []
+        d[gpu_type] += list(usage[i])
     
     # use matplotlib to plot the data and save the plot to a file
     plt.boxplot(d.values())
@@ -55,15 +55,12 @@ def plot_node_resource_usage(filename, res_type, n_nodes, dir_name):
         dir_name (str): The name of the directory to save the plot file in.
     """
     # plot node resource usage using data from filename
-    df = pd.read_csv(filename + ".csv")
-    
-    # select only the columns matching the pattern node_*_updated_gpu
-    df2 = df.filter(regex=("node.*"+res_type))
+    df, gpu_types = load_metrics(filename)
+    usage = node_metric(df, "used_" + res_type) / node_metric(df, "initial_" + res_type)
     
     d = {}
     for i in range(n_nodes):
-        gpu_type = df['node_'+str(i)+'_gpu_type'].iloc[0]
-        d["node_" + str(i) + "_" + str(gpu_type)] = df2["node_" + str(i) + "_used_" + res_type] / df2["node_" + str(i) + "_initial_" + res_type]
+        d["node_" + str(i) + "_" + gpu_types[i]] = usage[i]
     
     df_2 = pd.DataFrame(d)
     
@@ -139,15 +136,12 @@ def plot_job_deadline(filename, dir_name):
     
 def plot_power_consumption(filename, res_type, n_nodes, dir_name):
     # plot node resource usage using data from filename
-    df = pd.read_csv(filename + ".csv")
-    
-    # select only the columns matching the pattern node_*_updated_gpu
-    df2 = df.filter(regex=("node.*"+res_type))
+    df, gpu_types = load_metrics(filename)
+    consumption = node_metric(df, res_type + "_consumption")
     
     d = {}
     for i in range(n_nodes):
-        gpu_type = df['node_'+str(i)+'_gpu_type'].iloc[0]
-        d["node_" + str(i) + "_" + str(gpu_type)] = df2["node_" + str(i) + "_" + res_type + "_consumption"]
+        d["node_" + str(i) + "_" + gpu_types[i]] = consumption[i]
     
     df_2 = pd.DataFrame(d)
     
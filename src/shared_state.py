@@ -0,0 +1,137 @@
+'''
+This module implements the shared-memory block where the node processes publish their state
+'''
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+CPU = 0
+GPU = 1
+BW = 2
+
+
+class SharedNodeState:
+    """
+    Fixed-layout block of shared memory written by the node processes and read by the simulator
+    without any copy. For every node it stores the available resources (cpu, gpu, bw) and, for
+    every job of the dataset, the auction vector known by the node, its number of layers (0 if
+    the node doesn't know the job) and the number of messages received for the job. A job is
+    marked as dirty when any node publishes a different auction vector for it.
+
+    With `shared=False` the same layout is allocated in the memory of the process, for the
+    nodes run by the discrete-event engine.
+    """
+    def __init__(self, n_nodes, job_ids, max_layers=5, shared=True):
+        self.n_nodes = n_nodes
+        self.max_layers = max_layers
+        self.job_index = {job_id: row for row, job_id in enumerate(job_ids)}
+
+        n_jobs = max(len(self.job_index), 1)
+        self.__shapes = (
+            ("resources", (n_nodes, 3), np.float64),
+            ("auction_id", (n_nodes, n_jobs, max_layers), np.float64),
+            ("n_layers", (n_nodes, n_jobs), np.int32),
+            ("counter", (n_nodes, n_jobs), np.int64),
+            ("dirty", (n_jobs,), np.uint8),
+        )
+        size = sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in self.__shapes)
+
+        if shared:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.buf = None
+        else:
+            self.shm = None
+            self.buf = bytearray(size)
+        self.__attach()
+        self.auction_id[:] = -np.inf
+        self.n_layers[:] = 0
+        self.counter[:] = 0
+        self.dirty[:] = 1
+
+    def __attach(self):
+        buf = self.shm.buf if self.shm is not None else self.buf
+        offset = 0
+        for name, shape, dtype in self.__shapes:
+            array = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+            setattr(self, name, array)
+            offset += array.nbytes
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name, _, _ in self.__shapes:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__attach()
+
+    def publish(self, node):
+        """
+        Writes the state of `node` in its rows of the block.
+        """
+        i = node.id
+        self.resources[i, CPU] = node.updated_cpu
+        self.resources[i, GPU] = node.updated_gpu
+        self.resources[i, BW] = node.updated_bw
+
+        table = node.bid_table
+        rows = np.array([self.job_index[job_id] for job_id in table.slots], dtype=np.intp)
+        slots = np.array(list(table.slots.values()), dtype=np.intp)
+        # the bid table may be wider or narrower than the block, but no job of the dataset
+        # has more than max_layers layers
+        width = min(table.auction_id.shape[1], self.max_layers)
+        if np.any(table.n_layers[slots] > self.max_layers):
+            raise ValueError(f"node {i} knows a job with more than {self.max_layers} layers")
+
+        known = np.zeros(self.n_layers.shape[1], dtype=bool)
+        known[rows] = True
+        changed = (self.n_layers[i, rows] != table.n_layers[slots]) | \
+            np.any(self.auction_id[i, rows, :width] != table.auction_id[slots, :width], axis=1)
+        self.dirty[(self.n_layers[i] > 0) & ~known] = 1
+        self.dirty[rows[changed]] = 1
+
+        self.n_layers[i] = 0
+        self.auction_id[i, rows, :width] = table.auction_id[slots, :width]
+        self.n_layers[i, rows] = table.n_layers[slots]
+
+        self.counter[i] = 0
+        for job_id, count in node.counter.items():
+            self.counter[i, self.job_index[job_id]] = count
+
+    def bid_view(self, node_id):
+        return SharedBidView(self, node_id)
+
+    def close(self):
+        for name, _, _ in self.__shapes:
+            delattr(self, name)
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+
+
+class SharedBidView:
+    """
+    Read-only view of the auction vectors published by a node, with the same interface used by
+    the simulator on the bid table of the node.
+    """
+    def __init__(self, state: SharedNodeState, node_id):
+        self.state = state
+        self.node_id = node_id
+
+    def __contains__(self, job_id):
+        row = self.state.job_index.get(job_id)
+        return row is not None and self.state.n_layers[self.node_id, row] > 0
+
+    def keys(self):
+        rows = np.flatnonzero(self.state.n_layers[self.node_id])
+        job_ids = list(self.state.job_index.keys())
+        return [job_ids[r] for r in rows]
+
+    def auction_id_of(self, job_id):
+        row = self.state.job_index[job_id]
+        n = self.state.n_layers[self.node_id, row]
+        if n == 0:
+            raise KeyError(job_id)
+        return self.state.auction_id[self.node_id, row, :n]
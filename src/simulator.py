@@ -1,6 +1,7 @@
 import math
-from multiprocessing.managers import SyncManager
-from multiprocessing import Process, Event, Manager, JoinableQueue
+from multiprocessing import Process, Event, JoinableQueue
+from multiprocessing.connection import wait
+from collections import deque
 import random
 import time
 import pandas as pd
@@ -14,14 +15,17 @@ from src.topology import topo as LogicalTopology
 from src.network_topology import  TopologyType
 from src.utils import generate_gpu_types, NodeSupport
 from src.node import node
-from src.config import Utility, DebugLevel, SchedulingAlgorithm, ApplicationGraphType
+from src.event_engine import DiscreteEventEngine
+from src.termination import TerminationDetector, TrackedQueue
+from src.shared_state import SharedNodeState, CPU, GPU, BW
+from src.agreement import AgreementTracker
+from src.metrics import MetricsSink
+from src.config import Utility, DebugLevel, SchedulingAlgorithm, ApplicationGraphType, SimulationEngine
 import src.jobs_handler as job
 import src.utils as utils
 import src.plot as plot
 from src.jobs_handler import message_data
 
-class MyManager(SyncManager): pass
-
 main_pid = ""
 nodes_thread = []
 
@@ -40,12 +44,8 @@ def sigterm_handler(signum, frame):
         sys.exit(0)  # Exit gracefully    
 
 class Simulator_Plebiscito:
-    def __init__(self, filename: str, n_nodes: int, node_bw: int, n_jobs: int, n_client: int, enable_logging: bool, use_net_topology: bool, progress_flag: bool, dataset: pd.DataFrame, alpha: float, utility: Utility, debug_level: DebugLevel, scheduling_algorithm: SchedulingAlgorithm, decrement_factor: float, split: bool, app_type: ApplicationGraphType) -> None:   
-        self.filename = filename + "_" + utility.name + "_" + scheduling_algorithm.name + "_" + str(decrement_factor)
-        if split:
-            self.filename = self.filename + "_split"
-        else:
-            self.filename = self.filename + "_nosplit"
+    def __init__(self, filename: str, n_nodes: int, node_bw: int, n_jobs: int, n_client: int, enable_logging: bool, use_net_topology: bool, progress_flag: bool, dataset: pd.DataFrame, alpha: float, utility: Utility, debug_level: DebugLevel, scheduling_algorithm: SchedulingAlgorithm, decrement_factor: float, split: bool, app_type: ApplicationGraphType, engine: SimulationEngine = SimulationEngine.MULTIPROCESS, dispatch_window: int = None, seed: int = 0) -> None:   
+        self.filename = Simulator_Plebiscito.build_filename(filename, utility, scheduling_algorithm, decrement_factor, split)
             
         self.n_nodes = n_nodes
         self.node_bw = node_bw
@@ -63,7 +63,23 @@ class Simulator_Plebiscito:
         self.split = split
         self.app_type = app_type
         self.utility = utility
+        # computed before the variants are forked, so that they share the same decompositions
+        # (the auction vectors published by the nodes are sized on the largest job)
+        self.max_layers = job.precompute_decompositions(self.dataset, split=self.split, app_type=self.app_type)
         self.outlier_number = 0
+        self.engine = engine
+        self.event_engine = None
+        self.termination = None
+        self.shared_state = None
+        self.agreement = None
+        self.metrics = None
+        self.t = None
+        self.network_t = None
+        # max number of messages in flight before a new job is dispatched to the nodes (multiprocess
+        # engine only): by default 4 per node, 0 to dispatch the jobs without waiting
+        self.dispatch_window = 4 * n_nodes if dispatch_window is None else dispatch_window
+        # seed of the choice of the outliers and of the RANDOM utility of the nodes
+        self.seed = seed
         
         self.job_count = {}
         
@@ -73,26 +89,125 @@ class Simulator_Plebiscito:
         # Set up the environment
         self.setup_environment()
         
-    def startup_nodes(self):
-         # create a suitable network topology for multiprocessing 
-        MyManager.register('NetworkTopology', NetworkTopology)
-        self.manager = MyManager()
-        self.manager.start()
-        
-         #Build Topolgy
+    @staticmethod
+    def build_filename(filename, utility, scheduling_algorithm, decrement_factor, split):
+        filename = filename + "_" + utility.name + "_" + scheduling_algorithm.name + "_" + str(decrement_factor)
+        if split:
+            return filename + "_split"
+        return filename + "_nosplit"
+    
+    def build_topology(self, shared):
+        """
+        Builds the logical and the network topology. With the discrete-event engine all the nodes 
+        live in this process, while the node processes get their own copy of the network topology, 
+        with the bandwidth state in shared memory (`shared=True`).
+        """
         self.t = LogicalTopology(func_name='ring_graph', max_bandwidth=self.node_bw, min_bandwidth=self.node_bw/2,num_clients=self.n_client, num_edges=self.n_nodes)
-        self.network_t = self.manager.NetworkTopology(self.n_nodes, self.node_bw, self.node_bw, group_number=4, seed=4, topology_type=TopologyType.FAT_TREE)
+        self.network_t = NetworkTopology(self.n_nodes, self.node_bw, self.node_bw, group_number=4, seed=4, topology_type=TopologyType.FAT_TREE, 
+                                         job_ids=self.dataset["job_id"], shared=shared)
+    
+    def startup_nodes(self):
+        #Build Topolgy (unless already built by run_variants)
+        if self.network_t is None:
+            self.build_topology(shared=self.engine != SimulationEngine.DISCRETE_EVENT)
         
-        outlier_nodes = random.choices([i for i in range(self.n_nodes)], k=self.outlier_number)
+        self.nodes = []
+        outlier_nodes = random.Random(self.seed).choices([i for i in range(self.n_nodes)], k=self.outlier_number)
         for i in range(self.n_nodes):
             if i in outlier_nodes:
-                self.nodes.append(node(i, self.network_t, self.gpu_types[i], Utility.RANDOM, self.alpha, self.enable_logging, self.t, self.n_nodes, self.progress_flag, use_net_topology=self.use_net_topology, decrement_factor=self.decrement_factor))
+                self.nodes.append(node(i, self.network_t, self.gpu_types[i], Utility.RANDOM, self.alpha, self.enable_logging, self.t, self.n_nodes, self.progress_flag, use_net_topology=self.use_net_topology, decrement_factor=self.decrement_factor, seed=self.seed))
             else:
-                self.nodes.append(node(i, self.network_t, self.gpu_types[i], self.utility, self.alpha, self.enable_logging, self.t, self.n_nodes, self.progress_flag, use_net_topology=self.use_net_topology, decrement_factor=self.decrement_factor))
+                self.nodes.append(node(i, self.network_t, self.gpu_types[i], self.utility, self.alpha, self.enable_logging, self.t, self.n_nodes, self.progress_flag, use_net_topology=self.use_net_topology, decrement_factor=self.decrement_factor, seed=self.seed))
             
     def set_outlier_number(self, outlier_number):
         self.outlier_number = outlier_number
         
+    def run_variants(self, variants, workers=None, keep=None):
+        """
+        Runs several variants of the simulation at the same time, each in its own process. The 
+        variants share the dataset and the network topology, which are built once by this process
+        (only the bandwidth state of the topology is allocated per variant).
+
+        Args:
+            variants (list): the parameters of each variant, as a dict with any of the keys 
+                "outliers", "utility" and "alpha", which replace the ones of this simulator, and
+                "filename", the prefix of its output files (by default the number of outliers, 
+                followed by alpha if the variant sets it).
+            workers (int): max number of variants running at the same time (all if None).
+            keep (int): index of the variant that runs in this process instead, once all the 
+                others have been started, so that its nodes can be read with get_nodes when it's 
+                over (None to run every variant in its own process).
+
+        Returns:
+            list: for each variant, a dict with its parameters, the name of its output files 
+                ("filename"), its exit code ("exitcode") and its jobs report ("jobs_report", None
+                if the variant failed).
+        """
+        if self.network_t is None:
+            self.build_topology(shared=False)
+        
+        if workers is None:
+            workers = len(variants)
+        # the variant kept in this process takes one of the workers
+        slots = workers if keep is None else max(workers - 1, 1)
+        
+        # the kept variant changes the parameters of this simulator
+        filenames = [self.variant_filename(v) for v in variants]
+            
+        results = []
+        running = {}
+        pending = deque(i for i in range(len(variants)) if i != keep)
+        
+        while len(pending) > 0 or len(running) > 0 or keep is not None:
+            while len(pending) > 0 and len(running) < slots:
+                index = pending.popleft()
+                p = Process(target=self.run_variant, args=(variants[index],))
+                p.start()
+                running[p.sentinel] = (p, index)
+                
+            if len(pending) == 0 and keep is not None:
+                self.run_variant(variants[keep])
+                results.append((keep, 0))
+                keep = None
+                continue
+                
+            for sentinel in wait(list(running.keys())):
+                p, index = running.pop(sentinel)
+                p.join()
+                results.append((index, p.exitcode))
+                
+        ret = []
+        for index, exitcode in sorted(results):
+            report = filenames[index] + "_jobs_report.csv"
+            ret.append({**variants[index], "filename": filenames[index], "exitcode": exitcode, 
+                        "jobs_report": pd.read_csv(report) if exitcode == 0 and os.path.exists(report) else None})
+        return ret
+    
+    def variant_filename(self, variant):
+        prefix = variant.get("filename", str(variant.get("outliers", self.outlier_number)))
+        if "filename" not in variant and "alpha" in variant:
+            prefix = prefix + "_" + str(variant["alpha"])
+        return Simulator_Plebiscito.build_filename(prefix, variant.get("utility", self.utility), self.scheduling_algorithm, self.decrement_factor, self.split)
+        
+    def run_variant(self, variant):
+        """
+        Runs a variant of the simulation (see run_variants), in a process forked from the one that
+        configured the simulator.
+        """
+        self.filename = self.variant_filename(variant)
+        self.set_outlier_number(variant.get("outliers", self.outlier_number))
+        self.utility = variant.get("utility", self.utility)
+        self.alpha = variant.get("alpha", self.alpha)
+        
+        global main_pid
+        main_pid = os.getpid()
+        logging.basicConfig(filename=self.filename + '_debug.log', level=self.debug_level.value, format='%(message)s', filemode='w', force=True)
+        
+        # same paths of the topology of the parent, but its own bandwidth state
+        self.network_t = self.network_t.clone(shared=self.engine != SimulationEngine.DISCRETE_EVENT)
+        self.startup_nodes()
+        self.run()
+        
     def get_nodes(self):
         return self.nodes
             
@@ -114,42 +229,50 @@ class Simulator_Plebiscito:
         logging.debug('Edges number: ' + str(self.n_nodes))
         logging.debug('Requests number: ' + str(self.n_jobs))
         
-    def setup_nodes(self, terminate_processing_events, start_events, use_queue, manager, return_val, queues, progress_bid_events):
+    def setup_nodes(self, terminate_processing_events, start_events, queues, progress_bid_events):
         """
         Sets up the nodes for processing. Generates threads for each node and starts them.
         
         Args:
         terminate_processing_events (list): A list of events to terminate processing for each node.
         start_events (list): A list of events to start processing for each node.
-        use_queue (list): A list of events to indicate if a queue is being used by a node.
-        manager (multiprocessing.Manager): A multiprocessing manager object.
-        return_val (list): A list of return values for each node.
         queues (list): A list of queues for each node.
         progress_bid_events (list): A list of events to indicate progress of bid processing for each node.
         """
         global nodes_thread
         
-        for i in range(self.n_nodes):
-            q = JoinableQueue()
-            e = Event() 
+        if self.engine == SimulationEngine.DISCRETE_EVENT:
+            # the nodes publish their state as in the multiprocess case, in the memory of this process
+            self.shared_state = SharedNodeState(self.n_nodes, self.dataset["job_id"], max_layers=self.max_layers, shared=False)
+            self.agreement = AgreementTracker(self.shared_state)
+            for n in self.nodes:
+                n.shared_state = self.shared_state
             
-            queues.append(q)
-            use_queue.append(e)
-            
-            e.set()
+            self.event_engine = DiscreteEventEngine(self.nodes)
+            queues += self.event_engine.inboxes
+            return
+        
+        raw_queues = [JoinableQueue() for _ in range(self.n_nodes)]
+        self.termination = TerminationDetector(raw_queues)
+        
+        for q in raw_queues:
+            queues.append(TrackedQueue(q, self.termination))
+        
+        # the node processes publish their state in shared memory, read in place by the simulator
+        self.shared_state = SharedNodeState(self.n_nodes, self.dataset["job_id"], max_layers=self.max_layers)
+        self.agreement = AgreementTracker(self.shared_state)
 
         #Generate threads for each node
         for i in range(self.n_nodes):
             e = Event() 
             e2 = Event()
             e3 = Event()
-            return_dict = manager.dict()
             
-            self.nodes[i].set_queues(queues, use_queue)
+            self.nodes[i].set_queues(queues, self.termination)
+            self.nodes[i].shared_state = self.shared_state
             
-            p = Process(target=self.nodes[i].work, args=(e, e2, e3, return_dict))
+            p = Process(target=self.nodes[i].work, args=(e, e2, e3, None))
             nodes_thread.append(p)
-            return_val.append(return_dict)
             terminate_processing_events.append(e)
             start_events.append(e2)
             e3.clear()
@@ -157,15 +280,17 @@ class Simulator_Plebiscito:
             
             p.start()
             
+            # from now on the simulator only reads the state published by the node
+            self.nodes[i].bid_table = self.shared_state.bid_view(i)
+            
         for e in start_events:
             e.wait()
     
-    def collect_node_results(self, return_val, jobs: pd.DataFrame, exec_time, time_instant, save_on_file):
+    def collect_node_results(self, jobs: pd.DataFrame, exec_time, time_instant, save_on_file):
         """
         Collects the results from the nodes and updates the corresponding data structures.
         
         Args:
-        - return_val: list of dictionaries containing the results from each node
         - jobs: list of job objects
         - exec_time: float representing the execution time of the jobs
         - time_instant: int representing the current time instant
@@ -176,26 +301,45 @@ class Simulator_Plebiscito:
         # self.counter = 0
         # self.job_count = {}
         
+        state = self.shared_state
+        
         if time_instant != 0:
-            for v in return_val: 
-                nodeId = v["id"]
-                for _, j in jobs.iterrows():
-                    # if j["job_id"] not in self.nodes[nodeId].bids:
-                    self.nodes[nodeId].bids[j["job_id"]] = v["bids"][j["job_id"]]
-                    if j["job_id"] not in self.job_count:
-                        self.job_count[j["job_id"]] = 0
-                    self.job_count[j["job_id"]] = v["counter"][j["job_id"]]
-                # for key in v["counter"]:
-                #     if key not in self.job_count:
-                #         self.job_count[key] = 0
-                #     self.job_count[key] += v["counter"][key]
-                #     self.counter += v["counter"][key]
-                self.nodes[nodeId].updated_cpu = v["updated_cpu"]
-                self.nodes[nodeId].updated_gpu = v["updated_gpu"]
-                self.nodes[nodeId].updated_bw = v["updated_bw"]
-                self.nodes[nodeId].gpu_type = v["gpu_type"]
-        
-        return utils.calculate_utility(self.nodes, self.n_nodes, self.counter, exec_time, self.n_jobs, jobs, self.alpha, time_instant, self.use_net_topology, self.filename, self.network_t, self.gpu_types, save_on_file)
+            # with the discrete-event engine self.nodes are the nodes that run the protocol, 
+            # so their state is already up to date. Otherwise their bid tables are views of the
+            # shared memory, and only the resources have to be updated
+            if self.event_engine is None:
+                for nodeId in range(self.n_nodes):
+                    self.nodes[nodeId].updated_cpu = state.resources[nodeId, CPU]
+                    self.nodes[nodeId].updated_gpu = state.resources[nodeId, GPU]
+                    self.nodes[nodeId].updated_bw = state.resources[nodeId, BW]
+            
+            # the count reported by the last node is kept
+            for job_id in jobs.get("job_id", []):
+                self.job_count[job_id] = int(state.counter[self.n_nodes-1, state.job_index[job_id]])
+        
+        return utils.calculate_utility(self.nodes, self.n_nodes, self.counter, exec_time, self.n_jobs, jobs, self.alpha, time_instant, self.use_net_topology, self.metrics, self.network_t, self.gpu_types, save_on_file, self.agreement)
+    
+    def start_bid_round(self):
+        """
+        Must be called before submitting messages to the nodes, so that the bidding round 
+        can't be considered over until all the messages have been submitted.
+        """
+        if self.termination is not None:
+            self.termination.hold()
+    
+    def wait_bid_round(self, progress_bid_events):
+        """
+        Blocks until all the nodes have processed the submitted messages and reported their state.
+        """
+        if self.event_engine is not None:
+            self.event_engine.run_until_idle()
+            return
+        
+        self.termination.unhold()
+        
+        for e in progress_bid_events:
+            e.wait()
+            e.clear()
     
     def terminate_node_processing(self, events):
         global nodes_thread
@@ -206,6 +350,10 @@ class Simulator_Plebiscito:
         # Block until all tasks are done.
         for nt in nodes_thread:
             nt.join()
+        
+        if self.shared_state is not None:
+            self.shared_state.close()
+            self.shared_state = None
             
     def clear_screen(self):
         # Function to clear the terminal screen
@@ -237,7 +385,7 @@ class Simulator_Plebiscito:
             if count == NODES_PER_LINE:
                 count = 0
                 print()
-            print("Node{0} ({1}):\t{2:3.0f}%\t".format(n.id, n.gpu_type,(n.initial_cpu - n.updated_cpu)/n.initial_cpu*100), end=" |   ")
+            print("Node{0} ({1}):\t{2:3.0f}%\t".format(n.id, n.gpu_type.name,(n.initial_cpu - n.updated_cpu)/n.initial_cpu*100), end=" |   ")
             count += 1
             #print(f"Node{n.id} ({n.gpu_type}):\t{(n.initial_gpu - n.updated_gpu)/n.initial_gpu*100}%   ", end=" | ")
         print()
@@ -253,8 +401,9 @@ class Simulator_Plebiscito:
         self.clear_screen()
         self.print_simulation_values(time_instant, job_processed, queued_jobs, running_jobs, batch_size) 
         
-    def deallocate_jobs(self, progress_bid_events, queues, jobs_to_unallocate):
+    def deallocate_jobs(self, progress_bid_events, queues, jobs_to_unallocate, completed=False):
         if len(jobs_to_unallocate) > 0:
+            self.start_bid_round()
             for _, j in jobs_to_unallocate.iterrows():
                 data = message_data(
                             j['job_id'],
@@ -266,14 +415,13 @@ class Simulator_Plebiscito:
                             j['gpu_type'],
                             deallocate=True,
                             split=self.split,
-                            app_type=self.app_type
+                            app_type=self.app_type,
+                            completed=completed
                         )
                 for q in queues:
                     q.put(data)
 
-            for e in progress_bid_events:
-                e.wait()
-                e.clear()       
+            self.wait_bid_round(progress_bid_events)
 
     def skip_deconfliction(self, jobs): # :)
         if jobs.empty:
@@ -315,21 +463,21 @@ class Simulator_Plebiscito:
         terminate_processing_events = []
         start_events = []
         progress_bid_events = []
-        use_queue = []
-        manager = Manager()
-        return_val = []
         queues = []
-        self.setup_nodes(terminate_processing_events, start_events, use_queue, manager, return_val, queues, progress_bid_events)
+        self.setup_nodes(terminate_processing_events, start_events, queues, progress_bid_events)
+        self.metrics = MetricsSink(self.filename, self.n_nodes)
 
         # Initialize job-related variables
         self.job_ids=[]
+        job_store = job.JobStore(self.dataset)
         jobs = pd.DataFrame()
-        running_jobs = pd.DataFrame()
-        processed_jobs = pd.DataFrame()
+        running_jobs = job.RunningJobs()
+        processed_jobs = []
+        n_processed_jobs = 0
 
         # Collect node results
         start_time = time.time()
-        self.collect_node_results(return_val, pd.DataFrame(), time.time()-start_time, 0, save_on_file=True)
+        self.collect_node_results(pd.DataFrame(), time.time()-start_time, 0, save_on_file=True)
         
         time_instant = 1
         batch_size = 5
@@ -337,26 +485,25 @@ class Simulator_Plebiscito:
         unassigned_jobs = pd.DataFrame()
         assigned_jobs = pd.DataFrame()
         prev_job_list = pd.DataFrame()
-        prev_running_jobs = pd.DataFrame()
         
         while True:
             start_time = time.time()
             
             # Extract completed jobs
-            prev_running_jobs = running_jobs.copy(deep=True)
-            jobs_to_unallocate, running_jobs = job.extract_completed_jobs(running_jobs, time_instant)
+            jobs_to_unallocate = running_jobs.extract_completed_jobs(time_instant)
             
             # Deallocate completed jobs
-            self.deallocate_jobs(progress_bid_events, queues, jobs_to_unallocate)
-            self.collect_node_results(return_val, pd.DataFrame(), time.time()-start_time, time_instant, save_on_file=False)
+            self.deallocate_jobs(progress_bid_events, queues, jobs_to_unallocate, completed=True)
+            self.collect_node_results(pd.DataFrame(), time.time()-start_time, time_instant, save_on_file=False)
             
-            #self.collect_node_results(return_val, pd.DataFrame(), time.time()-start_time, time_instant, save_on_file=False)
+            #self.collect_node_results(pd.DataFrame(), time.time()-start_time, time_instant, save_on_file=False)
             
             if time_instant%25 == 0:
+                self.metrics.flush()
                 plot.plot_all(self.n_nodes, self.filename, self.job_count, "plot")
             
             # Select jobs for the current time instant
-            new_jobs = job.select_jobs(self.dataset, time_instant)
+            new_jobs = job_store.select_jobs(time_instant)
             
             # Add new jobs to the job queue
             prev_job_list = jobs.copy(deep=True)
@@ -366,7 +513,7 @@ class Simulator_Plebiscito:
             jobs = job.schedule_jobs(jobs, self.scheduling_algorithm)
             
             n_jobs = len(jobs)
-            if prev_job_list.equals(jobs) and prev_running_jobs.equals(running_jobs):
+            if prev_job_list.equals(jobs) and len(jobs_to_unallocate) == 0:
                 n_jobs = 0
             
             jobs_to_submit = job.create_job_batch(jobs, n_jobs)
@@ -381,16 +528,15 @@ class Simulator_Plebiscito:
                     subset = jobs_to_submit.iloc[start_id:start_id+batch_size]
 
                     if self.skip_deconfliction(subset) == False:
-                        job.dispatch_job(subset, queues, self.use_net_topology, self.split)
+                        self.start_bid_round()
+                        job.dispatch_job(subset, queues, self.use_net_topology, self.split, timeout=0 if self.event_engine is not None else None, termination=self.termination, max_in_flight=self.dispatch_window)
 
-                        for e in progress_bid_events:
-                            e.wait()
-                            e.clear() 
+                        self.wait_bid_round(progress_bid_events)
                             
                         exec_time = time.time() - start_time
                     
                         # Collect node results
-                        a_jobs, u_jobs = self.collect_node_results(return_val, subset, exec_time, time_instant, save_on_file=False)
+                        a_jobs, u_jobs = self.collect_node_results(subset, exec_time, time_instant, save_on_file=False)
                         assigned_jobs = pd.concat([assigned_jobs, a_jobs])
                         unassigned_jobs = pd.concat([unassigned_jobs, u_jobs])
                     
@@ -407,12 +553,13 @@ class Simulator_Plebiscito:
             
             # Add unassigned jobs to the job queue
             jobs = pd.concat([jobs, unassigned_jobs], sort=False)  
-            running_jobs = pd.concat([running_jobs, assigned_jobs], sort=False)
-            processed_jobs = pd.concat([processed_jobs,assigned_jobs], sort=False)
+            running_jobs.add(assigned_jobs)
+            processed_jobs.append(assigned_jobs)
+            n_processed_jobs += len(assigned_jobs)
                     
-            self.collect_node_results(return_val, pd.DataFrame(), time.time()-start_time, time_instant, save_on_file=True)
+            self.collect_node_results(pd.DataFrame(), time.time()-start_time, time_instant, save_on_file=True)
             
-            self.print_simulation_progress(time_instant, len(processed_jobs), jobs, len(running_jobs), batch_size)
+            self.print_simulation_progress(time_instant, n_processed_jobs, jobs, len(running_jobs), batch_size)
             time_instant += 1
 
             # if len(assigned_jobs) == 0 and len(unassigned_jobs) != 0 and batch_size > 3:
@@ -421,23 +568,25 @@ class Simulator_Plebiscito:
             #     batch_size += 1
 
             # Check if all jobs have been processed
-            if len(processed_jobs) == len(self.dataset) and len(running_jobs) == 0 and len(jobs) == 0: # add to include also the final deallocation
+            if n_processed_jobs == len(self.dataset) and len(running_jobs) == 0 and len(jobs) == 0: # add to include also the final deallocation
                 break
         
         # Collect final node results
-        self.collect_node_results(return_val, pd.DataFrame(), time.time()-start_time, time_instant+1, save_on_file=True)
+        self.collect_node_results(pd.DataFrame(), time.time()-start_time, time_instant+1, save_on_file=True)
         
-        self.print_simulation_progress(time_instant, len(processed_jobs), jobs, len(running_jobs), batch_size)
+        self.print_simulation_progress(time_instant, n_processed_jobs, jobs, len(running_jobs), batch_size)
         
         # Terminate node processing
         self.terminate_node_processing(terminate_processing_events)
 
-        # Save processed jobs to CSV
-        processed_jobs.to_csv(self.filename + "_jobs_report.csv")
+        # Save processed jobs and metrics to CSV
+        pd.concat(processed_jobs, sort=False).to_csv(self.filename + "_jobs_report.csv")
+        self.metrics.close()
 
         # Plot results
         if self.use_net_topology:
             self.network_t.dump_to_file(self.filename, self.alpha)
+        self.network_t.close()
 
         plot.plot_all(self.n_nodes, self.filename, self.job_count, "plot")
 
@@ -0,0 +1,90 @@
+'''
+This module implements the detection of the end of a bidding round among the node processes
+'''
+
+from multiprocessing import Array, Condition
+
+# message broadcast to every node when the bidding round is over
+ROUND_END = {"round_end": True}
+
+MESSAGES = 0
+HOLDERS = 1
+
+
+class TerminationDetector:
+    """
+    Counts the messages in flight among the nodes. A message is in flight from the moment
+    it is put on a queue until the receiving node has completely processed it, so the messages
+    generated while processing it are counted before it is released. The simulator (while
+    submitting jobs) and the threads that progress the bidding rounds hold the round open as well.
+
+    When no message is in flight and nobody holds the round, no node can generate new messages:
+    the bidding round is over and ROUND_END is broadcast to all the nodes.
+
+    Since every processed message is acknowledged through the detector, the number of messages
+    in flight can also be used to apply back-pressure to whoever submits new messages.
+    """
+    def __init__(self, queues):
+        self.__counters = Array('i', 2)
+        self.__changed = Condition(self.__counters.get_lock())
+        self.__queues = queues
+
+    def acquire(self):
+        self.__increment(MESSAGES)
+
+    def release(self):
+        return self.__decrement(MESSAGES)
+
+    def hold(self):
+        self.__increment(HOLDERS)
+
+    def unhold(self):
+        return self.__decrement(HOLDERS)
+
+    def in_flight(self):
+        return self.__counters[MESSAGES]
+
+    def wait_in_flight(self, max_in_flight=0):
+        """
+        Blocks until at most `max_in_flight` messages are in flight.
+        """
+        with self.__changed:
+            self.__changed.wait_for(lambda: self.__counters[MESSAGES] <= max_in_flight)
+
+    def __increment(self, counter):
+        with self.__changed:
+            self.__counters[counter] += 1
+
+    def __decrement(self, counter):
+        with self.__changed:
+            self.__counters[counter] -= 1
+            last = self.__counters[MESSAGES] == 0 and self.__counters[HOLDERS] == 0
+            self.__changed.notify_all()
+
+        if last:
+            for q in self.__queues:
+                q.put(ROUND_END)
+
+        return last
+
+
+class TrackedQueue:
+    """
+    Wraps a node queue so that every message put on it is counted by the termination detector.
+    """
+    def __init__(self, queue, detector: TerminationDetector):
+        self.queue = queue
+        self.detector = detector
+
+    def put(self, msg):
+        self.detector.acquire()
+        self.queue.put(msg)
+
+    def get(self, block=True, timeout=None):
+        return self.queue.get(block, timeout)
+
+    def qsize(self):
+        return self.queue.qsize()
+
+    def task_done(self):
+        self.queue.task_done()
@@ -0,0 +1,116 @@
+'''
+This module implements the registry of the utility functions used by the nodes to bid on the layers
+'''
+
+import math
+
+from src.config import Utility, NodeSupport
+
+# utility function of each Utility, see `register`
+UTILITIES = {}
+
+
+def register(utility: Utility):
+    """
+    Registers the decorated function as the utility function of `utility`. The function is called
+    as f(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job), with the resources 
+    available on the node and the ones required by a single layer (`*_job`), and returns the 
+    score of the layer.
+    """
+    def decorator(f):
+        UTILITIES[utility] = f
+        return f
+    return decorator
+
+
+def utility_score(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    """
+    Returns the score of a layer on `node` with the utility function of the node.
+    """
+    if isinstance(avail_bw, float) and avail_bw == float('inf'):
+        avail_bw = node.initial_bw
+
+    return UTILITIES[node.utility](node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job)
+
+
+def gaussian(x, alpha, beta):
+    if beta == 0 and x == 0:
+        return 1
+
+    # shouldn't happen
+    if beta == 0 and x != 0:
+        return 0
+
+    # if beta != 0 and x == 0 is not necessary
+    return math.exp(-((alpha/100) * (x - beta))**2)
+
+
+def gpu_share(node, avail_gpu):
+    # a node without GPUs (the default for every node type) gets no score from the GPU term
+    if node.initial_gpu == 0:
+        return 0
+    return avail_gpu/node.initial_gpu
+
+
+# we assume that every job/node has always at least one CPU
+@register(Utility.STEFANO)
+def stefano(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    x = 0
+    if node.item['NN_gpu'][0] != 0:
+        x = node.item['NN_cpu'][0]/node.item['NN_gpu'][0]
+
+    beta = 0
+    if avail_gpu != 0:
+        beta = avail_cpu/avail_gpu
+
+    return gaussian(x, 0.01 if node.alpha == 0 else node.alpha, beta)
+
+
+@register(Utility.ALPHA_BW_CPU)
+def alpha_bw_cpu(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    return (node.alpha*(avail_bw/node.initial_bw))+((1-node.alpha)*(avail_cpu/node.initial_cpu))
+
+
+@register(Utility.ALPHA_GPU_CPU)
+def alpha_gpu_cpu(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    return (node.alpha*gpu_share(node, avail_gpu))+((1-node.alpha)*(avail_cpu/node.initial_cpu))
+
+
+@register(Utility.ALPHA_GPU_BW)
+def alpha_gpu_bw(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    return (node.alpha*gpu_share(node, avail_gpu))+((1-node.alpha)*(avail_bw/node.initial_bw))
+
+
+@register(Utility.ALPHA_BW_GPU)
+def alpha_bw_gpu(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    return (node.alpha*(avail_bw/node.initial_bw))+((1-node.alpha)*gpu_share(node, avail_gpu))
+
+
+@register(Utility.LGF)
+def lgf(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    corrective_factor = NodeSupport.get_GPU_corrective_factor(node.gpu_type, NodeSupport.get_node_type(node.item['gpu_type']), decrement=node.decrement_factor)
+    return avail_cpu * corrective_factor
+
+
+@register(Utility.SGF)
+def sgf(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    corrective_factor = NodeSupport.get_GPU_corrective_factor(node.gpu_type, NodeSupport.get_node_type(node.item['gpu_type']), decrement=node.decrement_factor)
+    return (node.initial_gpu - avail_gpu) * corrective_factor
+
+
+@register(Utility.UTIL)
+def util(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    return node.util_rate()
+
+
+@register(Utility.POWER)
+def power(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    # inverse of the increase of consumption of the CPUs of the node
+    p_before = node.performance.compute_current_power_consumption_cpu(node.initial_cpu - avail_cpu)
+    p_after = node.performance.compute_current_power_consumption_cpu(node.initial_cpu - (avail_cpu - cpu_job))
+    return 1/(p_after - p_before) if p_after != p_before else float('inf')
+
+
+@register(Utility.RANDOM)
+def random_utility(node, avail_bw, avail_cpu, avail_gpu, bw_job, cpu_job, gpu_job):
+    return node.rng.random()
@@ -1,13 +1,15 @@
 """
 This module contains utils functions to calculate all necessary stats
 """
-from csv import DictWriter
 import os
 import logging
 import time
 import pandas as pd
 import numpy as np
 from src.config import *
+from src.bid_table import to_allocation
+from src.agreement import AgreementTracker, UNKNOWN, BROKEN, PARTIAL, ASSIGNED
+from src.metrics import MetricsSink, NODE_METRICS
 
 
 import math
@@ -29,31 +31,31 @@ def wrong_bids_calc(nodes, job, num_edges, use_net_topology):
     wrong_ids=[]
     equal_values=True
     for curr_node in range(0, num_edges):
-        if nodes[curr_node].bids[j]['auction_id'] not in wrong_bids:
+        if nodes[curr_node].bid_table.auction_id_of(j) not in wrong_bids:
             for i in range(1, num_edges):
-                if nodes[i].bids[j]['auction_id'] != nodes[i-1].bids[j]['auction_id']:
+                if not np.array_equal(nodes[i].bid_table.auction_id_of(j), nodes[i-1].bid_table.auction_id_of(j)):
                     equal_values = False
                     break
             if not equal_values:
                 pass
 
     for curr_node in range(0, num_edges):
-        if nodes[curr_node].bids[j]['auction_id'] not in wrong_bids:
-            if all(x == float('-inf') for x in nodes[curr_node].bids[j]['auction_id']):
+        if nodes[curr_node].bid_table.auction_id_of(j) not in wrong_bids:
+            if all(x == float('-inf') for x in nodes[curr_node].bid_table.auction_id_of(j)):
                 continue
             else:
 
-                if curr_node in nodes[curr_node].bids[j]['auction_id'] and curr_node not in wrong_ids:
+                if curr_node in nodes[curr_node].bid_table.auction_id_of(j) and curr_node not in wrong_ids:
                     
                     wrong_ids.append(curr_node)
                     # first_time = True
                     # index=0
-                    # while index<len(nodes[curr_node].bids[j]['auction_id']):
-                    #     if nodes[curr_node].bids[j]['auction_id'][index] == curr_node and id != float('-inf'):
-                    #         nodes[curr_node].updated_cpu += float(job['num_cpu']) / float(len(nodes[curr_node].bids[j]['auction_id']))
-                    #         nodes[curr_node].updated_gpu += float(job['num_gpu']) / float(len(nodes[curr_node].bids[j]['auction_id']))
+                    # while index<len(nodes[curr_node].bid_table.auction_id_of(j)):
+                    #     if nodes[curr_node].bid_table.auction_id_of(j)[index] == curr_node and id != float('-inf'):
+                    #         nodes[curr_node].updated_cpu += float(job['num_cpu']) / float(len(nodes[curr_node].bid_table.auction_id_of(j)))
+                    #         nodes[curr_node].updated_gpu += float(job['num_gpu']) / float(len(nodes[curr_node].bid_table.auction_id_of(j)))
                     #         if first_time:
-                    #             nodes[curr_node].updated_bw += float(job['bw']) / float(len(nodes[curr_node].bids[j]['auction_id']))
+                    #             nodes[curr_node].updated_bw += float(job['bw']) / float(len(nodes[curr_node].bid_table.auction_id_of(j)))
                     #             first_time = False
                     #     index += 1
         else:
@@ -62,18 +64,18 @@ def wrong_bids_calc(nodes, job, num_edges, use_net_topology):
     if use_net_topology:
         # release network resources between client and node        
         for curr_node in range(0, num_edges):
-            for i, n_id in enumerate(nodes[curr_node].bids[j]['auction_id']):
+            for i, n_id in enumerate(nodes[curr_node].bid_table.auction_id_of(j)):
                 if i == 0 and n_id == curr_node:
-                    network_t.release_bandwidth_node_and_client(curr_node, float(job['bw']) / float(len(nodes[curr_node].bids[j]['auction_id'])), j)
+                    network_t.release_bandwidth_node_and_client(curr_node, float(job['bw']) / float(len(nodes[curr_node].bid_table.auction_id_of(j))), j)
                     
         # release network resources between nodes        
         for curr_node in range(0, num_edges):
-            prev_val = nodes[curr_node].bids[j]['auction_id'][0]
-            for i, n_id in enumerate(nodes[curr_node].bids[j]['auction_id']):
+            prev_val = nodes[curr_node].bid_table.auction_id_of(j)[0]
+            for i, n_id in enumerate(nodes[curr_node].bid_table.auction_id_of(j)):
                 if i != 0:
                     if prev_val != n_id and n_id == curr_node:
-                        network_t.release_bandwidth_between_nodes(curr_node, prev_val, float(job['bw']) / float(len(nodes[curr_node].bids[j]['auction_id'])), j)
-                    prev_val = nodes[curr_node].bids[j]['auction_id'][i]
+                        network_t.release_bandwidth_between_nodes(curr_node, prev_val, float(job['bw']) / float(len(nodes[curr_node].bid_table.auction_id_of(j))), j)
+                    prev_val = nodes[curr_node].bid_table.auction_id_of(j)[i]
 
 def allocation_to_gpu_type(allocation, gpu_types):
         ret = []
@@ -81,205 +83,77 @@ def allocation_to_gpu_type(allocation, gpu_types):
             ret.append(gpu_types[a].name)
         return ret
 
-def calculate_utility(nodes, num_edges, msg_count, simulation_time, n_req, jobs, alpha, time_instant, use_net_topology, filename, net_topology, gpu_types, save_on_file):
-    stats = {}
-    stats['nodes'] = {}
-    stats['tot_utility'] = 0
-    
-    field_names = ['n_nodes', 'n_req', 'exec_time', 'alpha']
-    dictionary = {'n_nodes': num_edges, 'n_req' : n_req, 'exec_time': simulation_time, 'alpha': alpha}
-
+def calculate_utility(nodes, num_edges, msg_count, simulation_time, n_req, jobs, alpha, time_instant, use_net_topology, metrics: MetricsSink, net_topology, gpu_types, save_on_file, agreement: AgreementTracker):
     # ---------------------------------------------------------
     # calculate assigned jobs, update resources if job not assigned
     # ---------------------------------------------------------
 
-    count_assigned = 0
-    count_unassigned = 0
-    assigned_sum_cpu = 0
-    assigned_sum_gpu = 0
-    assigned_sum_bw = 0
-    unassigned_sum_cpu = 0
-    unassigned_sum_gpu = 0
-    unassigned_sum_bw = 0
+    # the agreement status is recomputed only for the jobs whose bids changed since the last check
+    job_ids = jobs["job_id"].to_numpy() if len(jobs) > 0 else np.zeros(0, dtype=int)
+    status = agreement.status(job_ids)
 
-    count = 0 
-    count_broken = 0 
-    assigned_jobs = []
-    unassigned_jobs = []
-    assigned_jobs_id = []
-    unassigned_job_id = []
-    valid_bids = {}
-    count_success = 0
-    found_failure = False
-    
-    for _, job in jobs.iterrows():
-        count += 1
-        flag = True
-        j = job['job_id']
-        # Check correctness of all bids
-        equal_values = True         
+    for j in job_ids[status == UNKNOWN]:
+        print("bingo", j)
 
-        i = 0
-        try:
-            for i in range(1, num_edges):
-                #print(nodes[i].bids)
-                if nodes[i].bids[j]['auction_id'] != nodes[i-1].bids[j]['auction_id']:
-                    count_broken += 1
-                    print('BROKEN BID id: ' + str(j))
-                    for k in range(0, num_edges):
-                        print(nodes[k].bids[j]['auction_id'])
-                    equal_values = False
-                    break
-        except Exception as e :
-            print("bingo", e, nodes[i].bids.keys())        
-        if equal_values: # matching auction
+    for j in job_ids[status == BROKEN]:
+        print('BROKEN BID id: ' + str(j))
+        for k in range(0, num_edges):
+            print(nodes[k].bid_table.auction_id_of(j))
 
-                if all(x == float('-inf') for x in nodes[i].bids[j]['auction_id']):
-                    #print('Unassigned')
-                    found_failure = True
-                    flag = False # all unassigned
-                elif float('-inf') in nodes[i].bids[j]['auction_id']: #check if there is a value not assigned 
-                    flag = False
-                    found_failure = True
-                    wrong_bids_calc(nodes, job, num_edges, use_net_topology)
-                else:
-                    #print('MATCH')
-                    if not found_failure:
-                        count_success += 1
-                    valid_bids[j] = nodes[i].bids[j]['auction_id']
-                    logging.info(f"Job {j} assignment {nodes[0].bids[j]['auction_id']}")
+    # release the resources of the jobs on which the nodes didn't reach an agreement
+    for index in np.flatnonzero((status == BROKEN) | (status == PARTIAL)):
+        wrong_bids_calc(nodes, jobs.iloc[index], num_edges, use_net_topology)
 
-        else: # unmatching auctions
-            flag = False
-            found_failure = True
-            wrong_bids_calc(nodes, job, num_edges, use_net_topology)
+    assigned = np.flatnonzero(status == ASSIGNED)
+    unassigned = np.flatnonzero(status != ASSIGNED)
+    assigned_jobs = jobs.iloc[assigned].copy()
+    unassigned_jobs = jobs.iloc[unassigned].copy()
+    count_assigned = len(assigned)
+    count_unassigned = len(unassigned)
 
+    valid_bids = {}
+    for j in job_ids[assigned]:
+        valid_bids[j] = to_allocation(agreement.allocation(j))
+        logging.info(f"Job {j} assignment {valid_bids[j]}")
 
-        if flag:
-            job["final_node_allocation"] = nodes[0].bids[j]['auction_id']
-            job["final_gpu_allocation"] = allocation_to_gpu_type(nodes[0].bids[j]['auction_id'], gpu_types=gpu_types)
-            assigned_jobs.append(job)
-            assigned_jobs_id.append(j)
-            
-            count_assigned += 1
-            assigned_sum_cpu += float(job['num_cpu'])
-            assigned_sum_gpu += float(job['num_gpu'])
-            assigned_sum_bw += float(job['bw']) 
-        else:
-            unassigned_jobs.append(job)
-            # for k in range(num_edges):
-            #     print(nodes[k].bids[j]['auction_id'])
-            unassigned_job_id.append(j)
-            count_unassigned += 1
-            unassigned_sum_cpu += float(job['num_cpu'])
-            unassigned_sum_gpu += float(job['num_gpu'])
-            unassigned_sum_bw += float(job['bw']) 
+    final_node_allocation = [valid_bids[j] for j in job_ids[assigned]]
+    assigned_jobs["final_node_allocation"] = pd.Series(final_node_allocation, index=assigned_jobs.index, dtype=object)
+    assigned_jobs["final_gpu_allocation"] = pd.Series([allocation_to_gpu_type(a, gpu_types=gpu_types) for a in final_node_allocation], index=assigned_jobs.index, dtype=object)
             
     if use_net_topology:
         print()
         net_topology.check_network_consistency(valid_bids)
             
     #print(f"Count assigned {count_assigned} count unassigned {count_unassigned}")    
-    field_names.append('count_assigned')
-    field_names.append('count_unassigned')
-    field_names.append('time_instant')
-    dictionary['count_assigned'] = round(count_assigned,2)
-    dictionary['count_unassigned'] = round(count_unassigned,2)
-    dictionary['time_instant'] = time_instant
-
-    tot_used_bw = 0
-    tot_used_cpu = 0
-    tot_used_gpu = 0
-    tot_gpu_nodes = 0
-    tot_cpu_nodes = 0
-    tot_bw_nodes = 0
-
-    # ---------------------------------------------------------
-    # calculate node utility, assigned jobs and used res
-    # ---------------------------------------------------------
-    for i in range(num_edges):
-        # field_names.append('node_'+str(i)+'_jobs')
-        # field_names.append('node_'+str(i)+'_utility')
-        field_names.append('node_'+str(i)+'_initial_gpu')
-        field_names.append('node_'+str(i)+'_updated_gpu')
-        field_names.append('node_'+str(i)+'_used_gpu')
-        field_names.append('node_'+str(i)+'_initial_cpu')
-        field_names.append('node_'+str(i)+'_updated_cpu')
-        field_names.append('node_'+str(i)+'_used_cpu')
-        field_names.append('node_'+str(i)+'_initial_bw')
-        field_names.append('node_'+str(i)+'_updated_bw')
-        field_names.append('node_'+str(i)+'_used_bw')
-        field_names.append('node_'+str(i)+'_gpu_type')
-        field_names.append('node_'+str(i)+'_cpu_consumption')
-        field_names.append('node_'+str(i)+'_gpu_consumption')
-
-        tot_gpu_nodes += round(nodes[i].initial_gpu,2)
-        dictionary['node_'+str(i)+'_initial_gpu'] = round(nodes[i].initial_gpu,2)
-        dictionary['node_'+str(i)+'_updated_gpu'] = round(nodes[i].updated_gpu,2)
-        dictionary['node_'+str(i)+'_used_gpu'] = 0 if math.isclose(nodes[i].initial_gpu - nodes[i].updated_gpu, 0.0, abs_tol=1e-1) else round(nodes[i].initial_gpu - nodes[i].updated_gpu, 2)
-
-        tot_used_gpu += dictionary['node_'+str(i)+'_used_gpu']
-
-        tot_cpu_nodes += round(nodes[i].initial_cpu,2)
-        dictionary['node_'+str(i)+'_initial_cpu'] = round(nodes[i].initial_cpu,2)
-        dictionary['node_'+str(i)+'_updated_cpu'] = round(nodes[i].updated_cpu,2)
-        dictionary['node_'+str(i)+'_used_cpu'] = 0 if math.isclose(nodes[i].initial_cpu - nodes[i].updated_cpu, 0.0, abs_tol=1e-1) else round(nodes[i].initial_cpu - nodes[i].updated_cpu,2)
-
-        tot_used_cpu += dictionary['node_'+str(i)+'_used_cpu']
-
-        tot_bw_nodes += round(nodes[i].initial_bw,2)
-        dictionary['node_'+str(i)+'_initial_bw'] = round(nodes[i].initial_bw,2)
-        dictionary['node_'+str(i)+'_updated_bw'] = round(nodes[i].updated_bw,2)
-        dictionary['node_'+str(i)+'_used_bw'] = 0 if math.isclose(nodes[i].initial_bw - nodes[i].updated_bw, 0.0, abs_tol=1e-1) else round(nodes[i].initial_bw - nodes[i].updated_bw,2)
-
-        tot_used_bw += dictionary['node_'+str(i)+'_used_bw']
-        dictionary['node_'+str(i)+'_gpu_type'] = nodes[i].gpu_type
-        
-        dictionary['node_'+str(i)+'_cpu_consumption'] = round(nodes[i].performance.compute_current_power_consumption_cpu(nodes[i].initial_cpu-nodes[i].updated_cpu), 2)
-        dictionary['node_'+str(i)+'_gpu_consumption'] = round(nodes[i].performance.compute_current_power_consumption_gpu(nodes[i].initial_gpu-nodes[i].updated_gpu), 2)
-
-        #calculate node assigned count and utility
-        # for j, job_id in enumerate(nodes[i].bids):
-            
-        #     if job_id in assigned_jobs_id and nodes[i].id in nodes[i].bids[job_id]['auction_id']:
-        #         stats['nodes'][nodes[i].id]['assigned_count'] += 1
-
-        #     # print(nodes[i].bids[job_id])
-        #     for k, auctioner in enumerate(nodes[i].bids[job_id]['auction_id']):
-        #         # print(nodes[i].id)
-        #         if job_id in assigned_jobs_id and auctioner== nodes[i].id:
-        #             # print(nodes[i].bids[job_id]['bid'])
-        #             stats['nodes'][nodes[i].id]['utility'] += nodes[i].bids[job_id]['bid'][k]
-
-        #print('node: ' + str(nodes[i].id) + ' utility: ' + str(stats['nodes'][nodes[i].id]['utility']))
-        # dictionary['node_'+str(i)+'_utility'] = round(stats['nodes'][nodes[i].id]['utility'],2)
-        # stats["tot_utility"] += stats['nodes'][nodes[i].id]['utility']
-
-    # for i in stats['nodes']:
-
-    #     #print('node: '+ str(i) + ' assigned jobs count: ' + str(stats['nodes'][i]['assigned_count']))
-    #     dictionary['node_'+str(i)+'_jobs'] = round(stats['nodes'][i]['assigned_count'],2)
-
-    if save_on_file:        
-        write_data(field_names, dictionary, filename)
-    
-    return pd.DataFrame(assigned_jobs), pd.DataFrame(unassigned_jobs)
-
-
-def write_data(field_names, dictionary, filename):
-    filename = str(filename)+'.csv'
-
-    file_exists = os.path.isfile(filename)
-
-    with open(filename, 'a', newline='') as f: 
-        writer = DictWriter(f, fieldnames=field_names)
+    if save_on_file:
+        global_values = {'n_nodes': num_edges, 'n_req' : n_req, 'exec_time': simulation_time, 'alpha': alpha}
+        global_values['count_assigned'] = round(count_assigned,2)
+        global_values['count_unassigned'] = round(count_unassigned,2)
+        global_values['time_instant'] = time_instant
+
+        # ---------------------------------------------------------
+        # calculate node used res and power consumption
+        # ---------------------------------------------------------
+        node_values = {m: [] for m in NODE_METRICS}
+        for i in range(num_edges):
+            node_values['initial_gpu'].append(round(nodes[i].initial_gpu,2))
+            node_values['updated_gpu'].append(round(nodes[i].updated_gpu,2))
+            node_values['used_gpu'].append(0 if math.isclose(nodes[i].initial_gpu - nodes[i].updated_gpu, 0.0, abs_tol=1e-1) else round(nodes[i].initial_gpu - nodes[i].updated_gpu, 2))
+
+            node_values['initial_cpu'].append(round(nodes[i].initial_cpu,2))
+            node_values['updated_cpu'].append(round(nodes[i].updated_cpu,2))
+            node_values['used_cpu'].append(0 if math.isclose(nodes[i].initial_cpu - nodes[i].updated_cpu, 0.0, abs_tol=1e-1) else round(nodes[i].initial_cpu - nodes[i].updated_cpu,2))
+
+            node_values['initial_bw'].append(round(nodes[i].initial_bw,2))
+            node_values['updated_bw'].append(round(nodes[i].updated_bw,2))
+            node_values['used_bw'].append(0 if math.isclose(nodes[i].initial_bw - nodes[i].updated_bw, 0.0, abs_tol=1e-1) else round(nodes[i].initial_bw - nodes[i].updated_bw,2))
+
+            node_values['cpu_consumption'].append(round(nodes[i].performance.compute_current_power_consumption_cpu(nodes[i].initial_cpu-nodes[i].updated_cpu), 2))
+            node_values['gpu_consumption'].append(round(nodes[i].performance.compute_current_power_consumption_gpu(nodes[i].initial_gpu-nodes[i].updated_gpu), 2))
+
+        metrics.record(time_instant, global_values, node_values, [nodes[i].gpu_type for i in range(num_edges)])
     
-        # Pass the dictionary as an argument to the Writerow()
-        if not file_exists:
-            writer.writeheader()  # write the column headers if the file doesn't exist
-    
-        writer.writerow(dictionary)    
-
+    return assigned_jobs, unassigned_jobs
 
 
 def jaini_index(dictionary, num_nodes):
@@ -0,0 +1,202 @@
+'''
+Runs a sweep of Plebiscito simulations over a grid of parameters. Every cell of the grid runs in
+its own process, in its own directory, and at most `--workers` cells run at the same time. A cell
+that fails or doesn't complete within `--timeout` seconds is killed (together with its node
+processes) and retried up to `--retries` times.
+
+Example:
+
+python sweep.py --utility POWER LGF SGF --alpha 0 0.5 1 --nodes 10 --jobs 100 --reps 30
+'''
+import argparse
+import itertools
+import os
+import random
+import shutil
+import signal
+import sys
+import time
+from collections import deque
+from multiprocessing import Process, resource_tracker
+from multiprocessing.connection import wait
+
+import numpy as np
+import pandas as pd
+
+from src.simulator import Simulator_Plebiscito
+from src.config import Utility, DebugLevel, SchedulingAlgorithm, ApplicationGraphType, SimulationEngine
+from src.dataset_builder import generate_dataset
+
+GRID_KEYS = ("utility", "alpha", "nodes", "jobs", "outliers", "seed")
+
+
+def build_cells(grid):
+    """
+    Returns the list of the cells of the grid, i.e., one dict for each combination of the values
+    of the parameters in GRID_KEYS.
+    """
+    return [dict(zip(GRID_KEYS, values)) for values in itertools.product(*(grid[k] for k in GRID_KEYS))]
+
+
+def cell_dir(out, cell):
+    return os.path.join(out, cell["utility"].name, f"alpha_{cell['alpha']}",
+                        f"nodes_{cell['nodes']}_jobs_{cell['jobs']}_outliers_{cell['outliers']}", f"seed_{cell['seed']}")
+
+
+def run_cell(cell, directory, engine, dataset=None):
+    """
+    Runs the simulation of a cell, writing all its outputs in `directory`. Executed in the process
+    of the cell.
+    """
+    # the node processes of the cell are killed with it on timeout
+    os.setpgrp()
+    os.chdir(directory)
+    log = open("stdout.log", "w", buffering=1)
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+    sys.stdout = log
+    sys.stderr = log
+
+    if dataset is None:
+        dataset = generate_dataset(entries_num=cell["jobs"])
+    else:
+        dataset = dataset.head(cell["jobs"]).copy()
+
+    # after the dataset, as generate_dataset reseeds the generators (the cells share the jobs)
+    random.seed(cell["seed"])
+    np.random.seed(cell["seed"])
+
+    simulator = Simulator_Plebiscito(filename=str(cell["outliers"]),
+                        n_nodes=cell["nodes"],
+                        node_bw=1000000000,
+                        n_jobs=cell["jobs"],
+                        n_client=3,
+                        enable_logging=False,
+                        use_net_topology=False,
+                        progress_flag=False,
+                        dataset=dataset,
+                        alpha=cell["alpha"],
+                        utility=cell["utility"],
+                        debug_level=DebugLevel.INFO,
+                        scheduling_algorithm=SchedulingAlgorithm.FIFO,
+                        decrement_factor=0,
+                        split=True,
+                        app_type=ApplicationGraphType.LINEAR,
+                        engine=engine,
+                        seed=cell["seed"])
+    simulator.set_outlier_number(cell["outliers"])
+    simulator.startup_nodes()
+    simulator.run()
+
+
+def kill_cell(p):
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    p.join()
+
+
+def run_sweep(grid, out, workers=None, timeout=300, retries=3, engine=SimulationEngine.DISCRETE_EVENT, dataset=None):
+    """
+    Runs all the cells of the grid.
+
+    Args:
+        grid (dict): the list of values of each parameter in GRID_KEYS.
+        out (str): directory of the results, with one subdirectory per cell.
+        workers (int): max number of cells running at the same time (number of cores if None).
+        timeout (float): max duration of a cell, in seconds.
+        retries (int): max number of new attempts of a cell that failed or timed out.
+        engine (SimulationEngine): engine of the simulations. With the multiprocess engine every
+            cell uses a process per node, so the number of workers should be reduced accordingly.
+        dataset (pd.DataFrame): jobs of the simulations (the first `jobs` are used). If None, each
+            cell generates its own dataset.
+
+    Returns:
+        pd.DataFrame: the outcome of each cell, also written in `<out>/sweep.csv`.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+
+    # the cells share the resource tracker of this process, which outlives a killed cell and 
+    # releases the shared memory it leaked
+    resource_tracker.ensure_running()
+
+    cells = build_cells(grid)
+    pending = deque((index, 0) for index in range(len(cells)))
+    running = {}
+    results = []
+
+    while len(pending) > 0 or len(running) > 0:
+        while len(pending) > 0 and len(running) < workers:
+            index, attempt = pending.popleft()
+            directory = cell_dir(out, cells[index])
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory)
+
+            p = Process(target=run_cell, args=(cells[index], directory, engine, dataset))
+            p.start()
+            running[p.sentinel] = (p, index, attempt, time.time())
+
+        # wake up when a cell terminates or the first running cell times out
+        deadline = min(start for _, _, _, start in running.values()) + timeout
+        wait(list(running.keys()), timeout=max(0, deadline - time.time()))
+
+        now = time.time()
+        for sentinel, (p, index, attempt, start) in list(running.items()):
+            if p.is_alive() and now - start < timeout:
+                continue
+
+            if p.is_alive():
+                kill_cell(p)
+                status = "timeout"
+            else:
+                p.join()
+                status = "done" if p.exitcode == 0 else "failed"
+            del running[sentinel]
+
+            cell = cells[index]
+            directory = cell_dir(out, cell)
+            print(f"{status}: {directory} (attempt {attempt+1}, {round(now-start, 1)} s)", flush=True)
+
+            if status != "done":
+                # keep the outputs of the failed attempt for inspection
+                failed = f"{directory}_FAIL_{attempt}"
+                shutil.rmtree(failed, ignore_errors=True)
+                os.rename(directory, failed)
+                if attempt < retries:
+                    pending.append((index, attempt + 1))
+                    continue
+
+            results.append({**cell, "utility": cell["utility"].name, "status": status, "attempts": attempt + 1, "elapsed": now - start})
+
+    results = pd.DataFrame(results, columns=list(GRID_KEYS) + ["status", "attempts", "elapsed"])
+    results.to_csv(os.path.join(out, "sweep.csv"), index=False)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Runs a sweep of Plebiscito simulations over a grid of parameters.")
+    parser.add_argument("--utility", nargs="+", default=["POWER"], choices=[u.name for u in Utility])
+    parser.add_argument("--alpha", nargs="+", type=float, default=[1])
+    parser.add_argument("--nodes", nargs="+", type=int, default=[10])
+    parser.add_argument("--jobs", nargs="+", type=int, default=[100])
+    parser.add_argument("--outliers", nargs="+", type=int, default=[0])
+    parser.add_argument("--reps", type=int, default=1, help="number of repetitions (seeds 0 .. reps-1) of each cell")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--engine", default="DISCRETE_EVENT", choices=[e.name for e in SimulationEngine])
+    parser.add_argument("--out", default="res")
+    args = parser.parse_args()
+
+    grid = {
+        "utility": [Utility[u] for u in args.utility],
+        "alpha": args.alpha,
+        "nodes": args.nodes,
+        "jobs": args.jobs,
+        "outliers": args.outliers,
+        "seed": list(range(args.reps)),
+    }
+    results = run_sweep(grid, args.out, workers=args.workers, timeout=args.timeout, retries=args.retries, engine=SimulationEngine[args.engine])
+    print(results["status"].value_counts().to_string())
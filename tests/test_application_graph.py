@@ -0,0 +1,61 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from src.application_graph import ApplicationGraph
+from src.config import ApplicationGraphType
+from src.jobs_handler import generate_application_graph
+
+
+def dense_graph(layer_number, app_type, bandwidth):
+    # dense generator of the application graph, drawing from the global generator
+    graph = np.zeros((layer_number, layer_number))
+    prob = {ApplicationGraphType.GRAPH20: 0.2, ApplicationGraphType.GRAPH40: 0.4, ApplicationGraphType.GRAPH60: 0.6}.get(app_type, 0)
+    for i in range(layer_number):
+        for j in range(i):
+            if app_type == ApplicationGraphType.LINEAR:
+                if j == i-1:
+                    graph[i][j] = graph[j][i] = bandwidth
+            else:
+                graph[i][j] = graph[j][i] = np.random.choice([0, 1], p=[1-prob, prob])*bandwidth
+    return graph
+
+
+def dense_cut_bandwidth(graph, hosted):
+    bw = 0
+    for i in range(len(graph)):
+        for j in range(i):
+            if hosted[i] != hosted[j]:
+                bw += graph[i][j]
+    return bw
+
+
+@pytest.mark.parametrize("app_type", list(ApplicationGraphType))
+def test_sparse_graph_matches_dense_graph(app_type):
+    rng = np.random.default_rng(app_type.value)
+    for seed in range(30):
+        layer_number = seed % 12 + 1
+        np.random.seed(seed)
+        dense = dense_graph(layer_number, app_type, 1000000)
+        graph = generate_application_graph(layer_number, app_type, 1000000, rng=np.random.RandomState(seed))
+
+        assert graph.n_layers == layer_number
+        assert np.all(graph.src < graph.dst)
+        np.testing.assert_array_equal(graph.to_dense(), dense)
+        np.testing.assert_array_equal(graph.layer_bw, dense.sum(axis=1))
+
+        for _ in range(5):
+            hosted = rng.random(layer_number) < 0.5
+            assert graph.cut_bandwidth(hosted) == dense_cut_bandwidth(dense, hosted)
+
+
+def test_pickle_round_trip():
+    graph = ApplicationGraph(5, [0, 1, 0], [1, 2, 4], [1.0, 2.0, 3.0])
+    copy = pickle.loads(pickle.dumps(graph))
+    assert copy.n_layers == graph.n_layers
+    for a in ("src", "dst", "bw", "layer_bw"):
+        np.testing.assert_array_equal(getattr(copy, a), getattr(graph, a))
+        assert getattr(copy, a).dtype == getattr(graph, a).dtype
+        assert not getattr(copy, a).flags.writeable
+    np.testing.assert_array_equal(copy.layer_bw, [4.0, 3.0, 2.0, 0.0, 3.0])
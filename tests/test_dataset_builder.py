@@ -0,0 +1,31 @@
+import hashlib
+import os
+
+import src.dataset_builder as dataset_builder
+
+
+def test_trace_digest_is_reused_until_the_trace_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_builder, "cache_dir", str(tmp_path / "cache"))
+    trace = tmp_path / "trace.csv"
+    trace.write_bytes(b"job_id,num_cpu\n1,2\n")
+
+    digest = dataset_builder.trace_digest(str(trace))
+    assert digest == hashlib.sha1(b"job_id,num_cpu\n1,2\n").hexdigest()
+
+    # same path, size and mtime: the stored digest is returned without reading the trace
+    stat = os.stat(trace)
+    trace.write_bytes(b"job_id,num_cpu\n1,3\n")
+    os.utime(trace, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert dataset_builder.trace_digest(str(trace)) == digest
+
+    os.utime(trace, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert dataset_builder.trace_digest(str(trace)) == hashlib.sha1(b"job_id,num_cpu\n1,3\n").hexdigest()
+
+
+def test_cache_key_depends_on_the_parameters(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_builder, "cache_dir", str(tmp_path / "cache"))
+    trace = tmp_path / "trace.csv"
+    trace.write_bytes(b"job_id,num_cpu\n1,2\n")
+
+    assert dataset_builder.cache_key(str(trace), 10) == dataset_builder.cache_key(str(trace), 10)
+    assert dataset_builder.cache_key(str(trace), 10) != dataset_builder.cache_key(str(trace), 20)
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from src.deconfliction import deconflict
+
+I, K, OTHERS = 0, 1, (2, 3)
+
+
+def rule_table(i, k, z_kj, y_kj, t_kj, z_ij, y_ij, t_ij, bid_time):
+    """
+    Reference: the rule table written as boolean masks over all the layers.
+    """
+    # who the sender thinks is the winner
+    s_k = z_kj == k
+    s_i = z_kj == i
+    s_none = z_kj == -np.inf
+    s_m = ~(s_k | s_i | s_none)
+
+    # who the receiver thinks is the winner
+    l_i = z_ij == i
+    l_k = z_ij == k
+    l_none = z_ij == -np.inf
+    l_m = ~(l_i | l_k | l_none)
+    l_same = z_ij == z_kj
+
+    y_gt = y_kj > y_ij
+    y_ge = y_kj >= y_ij
+    y_lt = y_kj < y_ij
+    t_gt = t_kj > t_ij
+    t_ge = t_kj >= t_ij
+    t_lt = t_kj < t_ij
+
+    # rules #1, #2, #3, #17 and #19: i thinks it is the winner, but k or another node bid more
+    own = (s_k | s_m) & l_i
+    outbid_rule = y_gt | ((y_kj == y_ij) & (z_kj < z_ij))
+    outbid = own & outbid_rule
+    renew = own & ~outbid_rule
+
+    update = outbid \
+        | (s_k & l_k & t_gt) \
+        | ((s_k | s_m) & l_none) \
+        | (s_k & l_m & ((y_gt & t_ge) | (y_gt & t_lt))) \
+        | (s_i & l_i & t_gt) \
+        | (s_none & l_k) \
+        | (s_none & l_m & t_gt) \
+        | (s_m & l_k & (y_gt | t_ge)) \
+        | (s_m & l_m & l_same & t_gt) \
+        | (s_m & l_m & ~l_same & ((y_ge & t_ge) | (y_lt & t_gt)))
+
+    reset = s_i & l_k
+
+    rebroadcast = own \
+        | (s_k & ((l_k & t_gt) | l_none | l_m)) \
+        | s_i \
+        | (s_none & (l_i | l_k | (l_m & t_gt))) \
+        | (s_m & (l_k | l_none | (l_m & ~l_same)))
+
+    auction_id = np.where(update, z_kj, z_ij)
+    bid = np.where(update, y_kj, y_ij)
+    timestamp = np.where(update, t_kj, np.where(renew, bid_time, t_ij))
+
+    return auction_id, bid, timestamp, rebroadcast, reset, outbid
+
+
+def random_auction(rng, n):
+    # few distinct ids, bids and timestamps, so that every rule and every tie is exercised
+    ids = np.array([I, K, *OTHERS, -np.inf])
+    return rng.choice(ids, n), rng.integers(0, 3, n).astype(float), rng.integers(0, 3, n).astype(float)
+
+
+@pytest.mark.parametrize("n", [1, 2, 5, 20, 200])
+def test_deconflict_matches_rule_table(n):
+    rng = np.random.default_rng(n)
+    for _ in range(300):
+        args = (I, K, *random_auction(rng, n), *random_auction(rng, n), 5.0)
+        for expected, result in zip(rule_table(*args), deconflict(*args)):
+            assert expected.dtype == result.dtype
+            np.testing.assert_array_equal(expected, result)
+
+
+def test_renewed_layers_take_the_bid_time():
+    z = np.array([I, I])
+    y = np.array([1.0, 2.0])
+    t = np.array([0.0, 0.0])
+    z_k = np.array([K, K])
+    y_k = np.array([2.0, 1.0])
+
+    auction_id, bid, timestamp, rebroadcast, reset, outbid = deconflict(I, K, z_k, y_k, t, z, y, t, 7.0)
+    np.testing.assert_array_equal(auction_id, [K, I])
+    np.testing.assert_array_equal(bid, [2.0, 2.0])
+    np.testing.assert_array_equal(timestamp, [0.0, 7.0])
+    np.testing.assert_array_equal(outbid, [True, False])
+    assert rebroadcast.all() and not reset.any()
@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.config import ApplicationGraphType
+from src import jobs_handler
+from src.jobs_handler import job_decomposition, message_data
+from test_application_graph import dense_graph
+
+
+def reference_decomposition(job_id, num_gpu, num_cpu, split, app_type):
+    # the generators were reseeded with the job id at every message
+    random.seed(job_id)
+    np.random.seed(int(job_id))
+    layer_number = random.choice([1, 2, 3, 4, 5]) if split else 1
+    NN_gpu = np.random.dirichlet(np.ones(layer_number), size=1)[0] * num_gpu
+    NN_cpu = np.random.dirichlet(np.ones(layer_number), size=1)[0] * num_cpu
+    return layer_number, NN_gpu, NN_cpu, dense_graph(layer_number, app_type, 1000000)
+
+
+@pytest.mark.parametrize("app_type", list(ApplicationGraphType))
+@pytest.mark.parametrize("split", [True, False])
+def test_decomposition_matches_reseeded_generators(app_type, split):
+    jobs_handler.decompositions.clear()
+    for job_id in range(40):
+        num_gpu, num_cpu = job_id % 3, 1 + job_id % 7
+        layer_number, NN_gpu, NN_cpu, graph = reference_decomposition(job_id, num_gpu, num_cpu, split, app_type)
+
+        random.seed(123)
+        np.random.seed(123)
+        data = message_data(job_id, 0, num_gpu, num_cpu, 10, 1000000, "SERVER", split=split, app_type=app_type)
+        # the global generators are not used
+        assert random.random() == random.Random(123).random()
+        assert np.random.random() == np.random.RandomState(123).random()
+
+        assert data["N_layer"] == layer_number
+        np.testing.assert_array_equal(data["NN_gpu"], NN_gpu)
+        np.testing.assert_array_equal(data["NN_cpu"], NN_cpu)
+        np.testing.assert_array_equal(data["NN_data_size"].to_dense(), graph)
+
+
+def test_decomposition_is_shared_and_read_only():
+    jobs_handler.decompositions.clear()
+    first = message_data(7, 0, 2, 4, 10, 1000000, "SERVER")
+    second = message_data(7, 1, 2, 4, 20, 1000000, "SERVER")
+    assert first["NN_cpu"] is second["NN_cpu"]
+    assert first["NN_data_size"] is second["NN_data_size"]
+    assert job_decomposition(7, 2, 4)["NN_cpu"] is first["NN_cpu"]
+    with pytest.raises(ValueError):
+        first["NN_cpu"][0] = 0
@@ -0,0 +1,65 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from src.config import NodeType, NodeSupport
+from src.node_performance import NodePerformance
+from tst.cluster_state import ClusterState
+from tst.placement import is_valid_allocation, optimal_power
+
+
+def random_cluster(rng, n_nodes, identical=False):
+    types = [NodeType.DESKTOP, NodeType.SERVER, NodeType.RASPBERRY]
+    nodes = []
+    for i in range(n_nodes):
+        seed = 0 if identical else i
+        node_type = types[0] if identical else types[rng.integers(len(types))]
+        cpu, gpu = NodeSupport.get_compute_resources(node_type, seed)
+        nodes.append((cpu, gpu, NodePerformance(cpu, gpu, node_type, seed)))
+
+    cluster = ClusterState([n[0] for n in nodes], [n[1] for n in nodes], [1e9 for _ in nodes], [n[2] for n in nodes])
+    if not identical:
+        cluster.allocate(np.arange(n_nodes), rng.uniform(0, 0.8) * cluster.initial_cpu, np.zeros(n_nodes))
+    return cluster
+
+
+def random_job(rng, split=True):
+    n_layers = int(rng.integers(1, 6))
+    # equal layers make ties between the allocations likely
+    if rng.random() < 0.3:
+        cpu = np.full(n_layers, float(rng.integers(1, 4)))
+    else:
+        cpu = rng.dirichlet(np.ones(n_layers)) * rng.uniform(1, 16)
+    return {"N_layer": n_layers, "N_layer_min": 1 if split else n_layers, "N_layer_max": n_layers,
+            "NN_cpu": cpu, "NN_gpu": np.zeros(n_layers)}
+
+
+def exhaustive_power(cluster, job):
+    """
+    Reference: evaluates all the allocations in lexicographic order and keeps the first one
+    with the minimum consumption.
+    """
+    best, best_power = None, float('inf')
+    for allocation in itertools.product(range(len(cluster)), repeat=job["N_layer"]):
+        if not is_valid_allocation(allocation, job, len(cluster)):
+            continue
+        power = cluster.power_consumption(np.array(allocation), job)
+        if power < best_power:
+            best, best_power = allocation, power
+    return None if best is None else np.array(best)
+
+
+@pytest.mark.parametrize("n_nodes", [1, 2, 3, 4])
+@pytest.mark.parametrize("identical", [False, True])
+def test_optimal_power_matches_exhaustive_search(n_nodes, identical):
+    rng = np.random.default_rng(10 * n_nodes + identical)
+    for _ in range(15):
+        cluster = random_cluster(rng, n_nodes, identical)
+        job = random_job(rng, split=rng.random() < 0.8)
+        expected = exhaustive_power(cluster, job)
+        result = optimal_power(cluster, job)
+        if expected is None:
+            assert result is None
+        else:
+            np.testing.assert_array_equal(result, expected)
@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.bid_table import BidTable
+from src.shared_state import SharedNodeState
+
+
+def node_with_jobs(layers):
+    node = SimpleNamespace(id=1, updated_cpu=4.0, updated_gpu=0.0, updated_bw=10.0, bid_table=BidTable(), counter={})
+    for job_id, n_layers in layers.items():
+        node.bid_table.add(job_id, n_layers)
+        node.bid_table.auction_id[node.bid_table.slots[job_id], :n_layers] = np.arange(n_layers)
+        node.counter[job_id] = n_layers
+    return node
+
+
+@pytest.mark.parametrize("layers", [{10: 1, 11: 1}, {10: 3, 11: 5}, {10: 8, 11: 2}])
+def test_publish_bid_tables_of_any_width(layers):
+    state = SharedNodeState(2, list(layers), max_layers=max(layers.values()), shared=False)
+    state.publish(node_with_jobs(layers))
+
+    view = state.bid_view(1)
+    for job_id, n_layers in layers.items():
+        np.testing.assert_array_equal(view.auction_id_of(job_id), np.arange(n_layers))
+        assert state.counter[1, state.job_index[job_id]] == n_layers
+    assert state.dirty.all()
+
+
+def test_publish_rejects_jobs_longer_than_the_block():
+    state = SharedNodeState(2, [10], max_layers=3, shared=False)
+    with pytest.raises(ValueError):
+        state.publish(node_with_jobs({10: 4}))
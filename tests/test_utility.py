@@ -0,0 +1,41 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.config import Utility, NodeType
+from src.node_performance import NodePerformance
+from src.utility import utility_score
+
+
+def cpu_only_node(utility, alpha=0.3):
+    return SimpleNamespace(utility=utility, alpha=alpha, initial_cpu=8, initial_gpu=0, initial_bw=100)
+
+
+@pytest.mark.parametrize("utility, expected", [
+    (Utility.ALPHA_BW_CPU, 0.3 * 50/100 + 0.7 * 4/8),
+    (Utility.ALPHA_GPU_CPU, 0.7 * 4/8),
+    (Utility.ALPHA_GPU_BW, 0.7 * 50/100),
+    (Utility.ALPHA_BW_GPU, 0.3 * 50/100),
+])
+def test_alpha_utilities_on_nodes_without_gpus(utility, expected):
+    assert utility_score(cpu_only_node(utility), 50, 4, 0, 1, 1, 0) == pytest.approx(expected)
+
+
+def test_infinite_bandwidth_is_the_bandwidth_of_the_node():
+    node = cpu_only_node(Utility.ALPHA_BW_CPU)
+    assert utility_score(node, float('inf'), 4, 0, 1, 1, 0) == utility_score(node, 100, 4, 0, 1, 1, 0)
+
+
+def test_power_is_the_inverse_of_the_increase_of_consumption():
+    performance = NodePerformance(28, 0, NodeType.SERVER, 1)
+    node = SimpleNamespace(utility=Utility.POWER, initial_cpu=28, initial_bw=100, performance=performance)
+    expected = 1 / (performance.compute_current_power_consumption_cpu(28 - 20 + 3) - performance.compute_current_power_consumption_cpu(28 - 20))
+    assert utility_score(node, 50, 20, 0, 1, 3, 0) == pytest.approx(expected)
+
+
+def test_random_draws_from_the_generator_of_the_node():
+    node = SimpleNamespace(utility=Utility.RANDOM, initial_bw=100, rng=random.Random(1))
+    scores = [utility_score(node, 50, 20, 0, 1, 1, 0) for _ in range(3)]
+    expected = random.Random(1)
+    assert scores == [expected.random() for _ in range(3)]
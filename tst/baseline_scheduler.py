@@ -0,0 +1,169 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from tst.cluster_state import ClusterState
+from src.jobs_handler import message_data, precompute_decompositions
+
+class BaselineScheduler:
+    """
+    Core of the baseline schedulers. At each time instant the completed jobs release their
+    resources and the jobs submitted so far (and not placed yet) are placed, in order of
+    submission, by the placement policy (see tst/placement.py). A job that can't be placed is
+    retried at the next time instant.
+
+    The resources of the nodes are kept in a ClusterState and the running jobs in a heap ordered
+    by completion time, so each time instant costs O(events log n). The state of the nodes at 
+    each time instant is buffered in an array of `chunk_size` rows, appended to the 
+    `<filename>.csv` file when full and at the end of the run.
+    """
+    def __init__(self, nodes, dataset, filename, application_graph_type, split, policy, chunk_size=4096):
+        self.dataset = dataset.sort_values(by=["submit_time"])
+        self.submit_time = self.dataset["submit_time"].to_numpy()
+        self.cursor = 0
+        self.pending = []
+        self.cluster = ClusterState.from_nodes(nodes)
+        self.filename = filename
+        self.application_type = application_graph_type
+        self.split = split
+        self.policy = policy
+        self.running = []
+        self.seq = 0
+        
+        self.columns = []
+        for i in range(len(self.cluster)):
+            self.columns += ["node_" + str(i) + "_cpu", "node_" + str(i) + "_gpu", "node_" + str(i) + "_bw", 
+                             "node_" + str(i) + "_cpu_consumption", "node_" + str(i) + "_gpu_consumption"]
+        self.node_state = np.empty((chunk_size, len(self.columns)))
+        self.buffered = 0
+        self.flushed = False
+        precompute_decompositions(self.dataset, split=self.split, app_type=self.application_type)
+
+        print(f"{type(self).__name__} initialized")
+
+    def save_node_state(self):
+        # one row per time instant, with the columns of each node in a row of the view
+        state = self.node_state[self.buffered].reshape(len(self.cluster), 5)
+        state[:, 0] = self.cluster.used_cpu
+        state[:, 1] = self.cluster.used_gpu
+        state[:, 2] = self.cluster.used_bw
+        state[:, 3] = self.cluster.cpu_power(self.cluster.used_cpu)
+        state[:, 4] = self.cluster.gpu_power(self.cluster.used_gpu)
+        self.buffered += 1
+        
+        if self.buffered == len(self.node_state):
+            self.flush_node_state()
+            
+    def flush_node_state(self):
+        if self.buffered == 0:
+            return
+        
+        # the file of a previous run with the same name is overwritten by the first chunk
+        df = pd.DataFrame(self.node_state[:self.buffered], columns=self.columns)
+        df.to_csv(self.filename + ".csv", mode='a' if self.flushed else 'w', header=not self.flushed, index=False)
+        self.flushed = True
+        self.buffered = 0
+
+    def waiting_jobs(self):
+        return len(self.dataset) - self.cursor + len(self.pending)
+
+    def select_jobs(self, time_instant):
+        """
+        Returns the jobs submitted up to `time_instant` and not placed yet: first the new ones,
+        then the ones that couldn't be placed before.
+        """
+        end = self.cursor + np.searchsorted(self.submit_time[self.cursor:], time_instant, side="right")
+        jobs = [job for _, job in self.dataset.iloc[self.cursor:end].iterrows()] + self.pending
+        self.cursor = end
+        self.pending = []
+        return jobs
+
+    def run(self):
+        time_instant = 1
+
+        print(f"{type(self).__name__} started")
+
+        self.save_node_state()
+
+        while self.waiting_jobs() > 0:
+
+            self.deallocate(time_instant)
+
+            self.allocate_batch(self.select_jobs(time_instant), time_instant)
+
+            self.save_node_state()
+            time_instant += 1
+
+        while len(self.running) > 0:
+            self.deallocate(time_instant)
+            self.save_node_state()
+            time_instant += 1
+
+        self.save_node_state()
+        self.flush_node_state()
+
+    def deallocate(self, time_instant):
+        """
+        Releases the resources of the jobs completed before `time_instant`, in the order in which
+        they have been allocated.
+        """
+        completed = []
+        while len(self.running) > 0 and self.running[0][0] < time_instant:
+            completed.append(heapq.heappop(self.running))
+
+        completed.sort(key=lambda c: c[1])
+        for _, _, j in completed:
+            self.cluster.deallocate(j["nodes"], j["cpu_per_node"], j["gpu_per_node"])
+            print(f"Deallocated job {j['job_id']}")
+
+    def allocate_batch(self, jobs, time_instant):
+        """
+        Places the jobs in order. The jobs that can't be placed are retried at the next time instant.
+        """
+        for job in jobs:
+            if not self.allocate(job, time_instant):
+                self.pending.append(job)
+
+    def allocate(self, job, time_instant):
+        data = message_data(
+                    job['job_id'],
+                    job['user'],
+                    job['num_gpu'],
+                    job['num_cpu'],
+                    job['duration'],
+                    job['bw'],
+                    job['gpu_type'],
+                    deallocate=False,
+                    split=self.split,
+                    app_type=self.application_type
+                )
+
+        best_allocation = self.compute_allocation(data)
+
+        if best_allocation is None:
+            #print(f"Failed to allocate job {job['job_id']}")
+            return False
+
+        print(f"Allocated job {job['job_id']}")
+        #print(best_allocation)
+        nodes, cpu_per_node, gpu_per_node = self.cluster.requirement_per_node(best_allocation, data)
+        self.cluster.allocate(nodes, cpu_per_node, gpu_per_node)
+
+        j = {}
+        j['job_id'] = job['job_id']
+        j['submit_time'] = job['submit_time']
+        j['duration'] = job['duration']
+        j['nodes'] = nodes
+        j['cpu_per_node'] = cpu_per_node
+        j['gpu_per_node'] = gpu_per_node
+        j['exec_time'] = time_instant
+        heapq.heappush(self.running, (j['exec_time'] + j['duration'], self.seq, j))
+        self.seq += 1
+        return True
+
+    def compute_allocation(self, job):
+        return self.policy(self.cluster, job)
+
+    def compute_power_consumption(self, allocation, job):
+        return self.cluster.power_consumption(allocation, job)
@@ -0,0 +1,100 @@
+import numpy as np
+
+def pad_tables(tables):
+    """
+    Stacks the tables of the nodes (see NodePerformance) in a matrix, padding the shorter ones
+    with their last value. Returns the matrix and the index of the last segment of each table.
+    """
+    width = max(len(t) for t in tables)
+    matrix = np.array([np.pad(t, (0, width - len(t)), mode="edge") for t in tables], dtype=float)
+    return matrix, np.array([len(t) - 2 for t in tables], dtype=np.intp)
+
+def interpolate_rows(matrix, last, usage):
+    """
+    Evaluates the table of each node at its usage, as `interpolate` does for a single table.
+    """
+    usage = np.asarray(usage, dtype=float)
+    rows = np.arange(len(matrix))
+    i = np.clip(np.floor(usage).astype(np.intp), 0, last)
+    return matrix[rows, i] + (usage - i) * (matrix[rows, i+1] - matrix[rows, i])
+
+class ClusterState:
+    """
+    Resources of the nodes of the cluster stored in NumPy arrays (one entry per node), so that
+    the baseline schedulers can check and score all the nodes with a single operation. The power
+    tables of the nodes are stacked as well, to compute the consumption of all the nodes at once.
+    """
+    def __init__(self, initial_cpu, initial_gpu, initial_bw, performance):
+        self.initial_cpu = np.asarray(initial_cpu, dtype=float)
+        self.initial_gpu = np.asarray(initial_gpu, dtype=float)
+        self.initial_bw = np.asarray(initial_bw, dtype=float)
+        self.used_cpu = np.zeros(len(self.initial_cpu))
+        self.used_gpu = np.zeros(len(self.initial_gpu))
+        self.used_bw = np.zeros(len(self.initial_bw))
+        self.performance = list(performance)
+        
+        self.cpu_power_table, self.cpu_power_last = pad_tables([p.cpu_power_table for p in self.performance])
+        self.gpu_power_table, self.gpu_power_last = pad_tables([p.gpu_power_table for p in self.performance])
+
+    @staticmethod
+    def from_nodes(nodes):
+        return ClusterState([n.initial_cpu for n in nodes], [n.initial_gpu for n in nodes], [n.initial_bw for n in nodes], [n.performance for n in nodes])
+
+    def __len__(self):
+        return len(self.initial_cpu)
+
+    def free_cpu(self):
+        return self.initial_cpu - self.used_cpu
+
+    def can_host(self, cpu):
+        """
+        Returns the mask of the nodes that can host `cpu` more CPUs (a scalar or one value per node).
+        """
+        return self.used_cpu + cpu <= self.initial_cpu
+
+    def cpu_power(self, cpu):
+        """
+        Returns the power consumption of the CPUs of each node when `cpu` CPUs are used.
+        """
+        return interpolate_rows(self.cpu_power_table, self.cpu_power_last, cpu)
+
+    def gpu_power(self, gpu):
+        return interpolate_rows(self.gpu_power_table, self.gpu_power_last, gpu)
+
+    def power_consumption(self, allocation, job):
+        """
+        Returns the total consumption of the nodes if `job` is allocated as in `allocation`, or
+        inf if a node can't host its layers.
+        """
+        nodes, cpu, gpu = self.requirement_per_node(allocation, job)
+        cpu_per_node = np.zeros(len(self))
+        gpu_per_node = np.zeros(len(self))
+        cpu_per_node[nodes] = cpu
+        gpu_per_node[nodes] = gpu
+        
+        if not np.all(self.can_host(cpu_per_node)):
+            return float('inf')
+        
+        power = self.cpu_power(self.used_cpu + cpu_per_node) + self.gpu_power(self.used_gpu + gpu_per_node)
+        # summed in order of node, as a sequence of additions
+        return float(np.cumsum(power)[-1])
+
+    def requirement_per_node(self, allocation, job):
+        """
+        Returns the nodes used by `allocation` (the node of each layer of `job`) and the CPUs and
+        GPUs required on each of them.
+        """
+        nodes, layer_node = np.unique(allocation, return_inverse=True)
+        cpu = np.zeros(len(nodes))
+        gpu = np.zeros(len(nodes))
+        np.add.at(cpu, layer_node, job["NN_cpu"])
+        np.add.at(gpu, layer_node, job["NN_gpu"])
+        return nodes, cpu, gpu
+
+    def allocate(self, nodes, cpu, gpu):
+        self.used_cpu[nodes] += cpu
+        self.used_gpu[nodes] += gpu
+
+    def deallocate(self, nodes, cpu, gpu):
+        self.used_cpu[nodes] -= cpu
+        self.used_gpu[nodes] -= gpu
@@ -0,0 +1,175 @@
+'''
+Placement policies of the baseline schedulers. A policy is a function (cluster, job) that returns
+the node of each layer of the job (an array of node ids) or None if the job can't be placed on the
+current state of the ClusterState.
+'''
+import math
+
+import numpy as np
+
+def is_valid_allocation(allocation, job, n_nodes):
+    min_ = job["N_layer_min"]
+    max_ = job["N_layer_max"]
+    counter = [0 for i in range(n_nodes)]
+
+    for id in allocation:
+        counter[id] += 1
+
+    for c in allocation:
+        if counter[c] < min_ or counter[c] > max_:
+            return False
+
+    return True
+
+def min_slope(table, low, high=None):
+    """
+    Returns the minimum slope of a table sampled at every integer usage (see NodePerformance)
+    for usages between `low` and `high` (up to any usage if None).
+    """
+    slopes = np.diff(table)
+    first = min(max(math.floor(low), 0), len(slopes) - 1)
+    last = len(slopes) - 1 if high is None else min(max(math.ceil(high) - 1, first), len(slopes) - 1)
+    return float(slopes[first:last+1].min())
+
+def greedy(cluster, job, score):
+    """
+    Places the layers in order, each on the node with the highest score (the first one on ties)
+    among those that can host it together with the layers of the job already placed there.
+
+    Args:
+        score: function (cluster, additional_cpu, additional_gpu, cpu, gpu) returning the score of
+            every node for a layer that requires `cpu` and `gpu`, when `additional_cpu` and
+            `additional_gpu` are already used by the job on each node.
+    """
+    allocation = np.full(len(job["NN_cpu"]), -1)
+    additional_cpu = np.zeros(len(cluster))
+    additional_gpu = np.zeros(len(cluster))
+
+    for i, (cpu, gpu) in enumerate(zip(job["NN_cpu"], job["NN_gpu"])):
+        scores = np.where(cluster.can_host(cpu + additional_cpu), score(cluster, additional_cpu, additional_gpu, cpu, gpu), -np.inf)
+        best_location = int(np.argmax(scores))
+
+        if scores[best_location] == -np.inf:
+            return None
+
+        allocation[i] = best_location
+        additional_cpu[best_location] += cpu
+        additional_gpu[best_location] += gpu
+
+    return allocation
+
+def worst_fit(cluster, job):
+    """
+    Places each layer on the node with the most free CPUs (the default policy of Kubernetes).
+    """
+    return greedy(cluster, job, lambda c, additional_cpu, additional_gpu, cpu, gpu: c.free_cpu())
+
+def best_fit(cluster, job):
+    """
+    Places each layer on the node with the fewest CPUs left free by the layer.
+    """
+    return greedy(cluster, job, lambda c, additional_cpu, additional_gpu, cpu, gpu: additional_cpu + cpu - c.free_cpu())
+
+def power_greedy(cluster, job):
+    """
+    Places each layer on the node whose consumption increases the least.
+    """
+    def score(c, additional_cpu, additional_gpu, cpu, gpu):
+        used_cpu = c.used_cpu + additional_cpu
+        used_gpu = c.used_gpu + additional_gpu
+        before = c.cpu_power(used_cpu) + c.gpu_power(used_gpu)
+        after = c.cpu_power(used_cpu + cpu) + c.gpu_power(used_gpu + gpu)
+        return before - after
+
+    return greedy(cluster, job, score)
+
+def optimal_power(cluster, job):
+    """
+    Finds the allocation of the layers of the job with the minimum power consumption with a
+    branch-and-bound search. The layers are assigned in order, trying first the nodes with the
+    smallest increase of consumption. A partial allocation is discarded as soon as a node can't
+    host its layers or it has too many layers, or when its consumption plus a lower bound of the
+    consumption of the remaining layers (their resources times the minimum slope of the power
+    models) exceeds the best allocation found so far.
+
+    The complete allocations are evaluated with `ClusterState.power_consumption` and, among the
+    ones with the same consumption, the first in lexicographic order is kept, so that the result
+    is the same of the exhaustive enumeration of all the allocations.
+    """
+    n_nodes = len(cluster)
+    n_layers = job['N_layer']
+    min_ = job["N_layer_min"]
+    max_ = job["N_layer_max"]
+    cpu = [float(c) for c in job["NN_cpu"]]
+    gpu = [float(g) for g in job["NN_gpu"]]
+    used_cpu = cluster.used_cpu.tolist()
+    used_gpu = cluster.used_gpu.tolist()
+    initial_cpu = cluster.initial_cpu.tolist()
+
+    power = [p.compute_current_power_consumption for p in cluster.performance]
+    base_power = [power[i](used_cpu[i], used_gpu[i]) for i in range(n_nodes)]
+    base_total = sum(base_power)
+
+    # lower bound of the increase of consumption per unit of cpu and gpu, on any node
+    cpu_slope = min(min_slope(p.cpu_power_table, used_cpu[i], initial_cpu[i]) for i, p in enumerate(cluster.performance))
+    gpu_slope = min(min_slope(p.gpu_power_table, used_gpu[i]) for i, p in enumerate(cluster.performance))
+    bound = [sum(cpu[k:]) * cpu_slope + sum(gpu[k:]) * gpu_slope for k in range(n_layers + 1)]
+
+    allocation = [-1 for _ in range(n_layers)]
+    cpu_per_node = [0 for _ in range(n_nodes)]
+    gpu_per_node = [0 for _ in range(n_nodes)]
+    layers_per_node = [0 for _ in range(n_nodes)]
+    increase = [0 for _ in range(n_nodes)]
+    best = {"power": float('inf'), "allocation": None}
+
+    def margin():
+        # the consumption is tracked incrementally, keep a margin for the rounding errors
+        return 1e-9 * max(1, abs(best["power"]))
+
+    def visit(k, total_increase, missing):
+        if k == n_layers:
+            if not is_valid_allocation(allocation, job, n_nodes) or base_total + total_increase > best["power"] + margin():
+                return
+            power_consumption = cluster.power_consumption(allocation, job)
+            if power_consumption < best["power"] or (power_consumption == best["power"] and allocation < best["allocation"]):
+                best["power"] = power_consumption
+                best["allocation"] = list(allocation)
+            return
+
+        candidates = []
+        for i in range(n_nodes):
+            if layers_per_node[i] == max_:
+                continue
+            node_cpu = cpu_per_node[i] + cpu[k]
+            if used_cpu[i] + node_cpu > initial_cpu[i]:
+                continue
+            node_increase = power[i](used_cpu[i] + node_cpu, used_gpu[i] + gpu_per_node[i] + gpu[k]) - base_power[i]
+            candidates.append((node_increase - increase[i], i, node_cpu, node_increase))
+        candidates.sort()
+
+        for delta, i, node_cpu, node_increase in candidates:
+            if base_total + total_increase + delta + bound[k+1] > best["power"] + margin():
+                break
+
+            # number of layers still needed by the nodes with less than N_layer_min layers
+            node_missing = missing + (max(0, min_ - 1) if layers_per_node[i] == 0 else -1 if layers_per_node[i] < min_ else 0)
+            if node_missing > n_layers - k - 1:
+                continue
+
+            previous = (cpu_per_node[i], gpu_per_node[i], increase[i])
+            allocation[k] = i
+            cpu_per_node[i] = node_cpu
+            gpu_per_node[i] = gpu_per_node[i] + gpu[k]
+            increase[i] = node_increase
+            layers_per_node[i] += 1
+
+            visit(k + 1, total_increase + delta, node_missing)
+
+            cpu_per_node[i], gpu_per_node[i], increase[i] = previous
+            layers_per_node[i] -= 1
+            allocation[k] = -1
+
+    visit(0, 0, 0)
+    if best["allocation"] is None:
+        return None
+    return np.array(best["allocation"])